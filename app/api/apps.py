@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Connect the receivers invalidating cached responses and tokens,
+        # and register the jobs writing coalesced toggles
+        from api import authentication, cache, toggles  # noqa: F401
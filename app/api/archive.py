@@ -0,0 +1,155 @@
+'''
+Fallback reads of the archive of old posts, see `core.archive`.
+The listings of posts and comments merge the rows of the hot tables and
+of the archive. Posts commented since the cutoff stay in the hot tables
+while newer ones are archived, so archived rows aren't all older than
+those left there: every page reads at most a page of each past the
+cursor and keeps the newest, and streamed listings merge both the same
+way. Clients page through both as through a single listing, or through
+the archived rows only with `?archived=true`. A post which isn't found
+is looked up in the archive too, and so are its comments.
+Archived rows are always represented with `api.representations`, and
+their responses aren't cached.
+'''
+import heapq
+from itertools import islice
+from typing import Iterator
+from django.conf import settings
+from django.db.models import Value
+from django.http import Http404
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from core import archive
+from api import profiling
+from api.pagination import position_key
+from api.representations import ARCHIVED
+from api.serializers import get_listing, get_representation
+from api.streaming import STREAM_RENDERERS
+
+
+class ArchiveListMixin:
+    '''
+    Viewset mixin listing the rows of `archive_model` merged with the rows
+    of the hot table, both filtered with `filter_listing`
+    '''
+    archive_model = None
+
+    def filter_listing(self, queryset):
+        '''Keep the rows created within the time range of the listing'''
+        listing = get_listing(self.request)
+        if listing.get('since') is not None:
+            queryset = queryset.filter(created_at__gte=listing['since'])
+        if listing.get('until') is not None:
+            queryset = queryset.filter(created_at__lt=listing['until'])
+        return queryset
+
+    def get_archive_queryset(self):
+        return self.filter_listing(self.archive_model.objects.all())
+
+    def list(self, request, *args, **kwargs):
+        streamed = isinstance(request.accepted_renderer, STREAM_RENDERERS)
+        if not archive.enabled() or streamed:
+            return super().list(request, *args, **kwargs)
+        if get_listing(request)['archived']:
+            return self.list_archive()
+        representation = get_representation(request)
+        page = self.paginator.paginate_querysets(
+            [self.get_hot_rows(self.filter_queryset(self.get_queryset()),
+                               representation),
+             self.get_archived_rows(self.get_archive_queryset(),
+                                    representation)],
+            request, view=self)
+        return self.get_paginated_response(
+            self.represent_rows(page, representation))
+
+    def get_hot_rows(self, queryset, representation):
+        '''Rows of the hot `queryset`, as values when they're compiled'''
+        compiled = self.get_compiled()
+        if compiled is None:
+            return queryset
+        return self.compiled_rows(queryset, compiled, representation)
+
+    def get_archived_rows(self, queryset, representation):
+        '''Values of the archived rows of `queryset`, marked as such'''
+        return self.compiled_rows(
+            queryset, ARCHIVED[self.get_serializer_class()],
+            representation).annotate(archived=Value(True))
+
+    def represent_rows(self, rows: list, representation) -> list:
+        '''Represent merged hot and archived rows in their order'''
+        archived = [
+            isinstance(row, dict) and row.get('archived', False)
+            for row in rows
+        ]
+        hot_rows = [row for row, old in zip(rows, archived) if not old]
+        archived_rows = [row for row, old in zip(rows, archived) if old]
+        compiled = self.get_compiled()
+        with profiling.serializing(self.request):
+            if compiled is None:
+                hot = self.get_serializer(hot_rows, many=True).data
+            else:
+                hot = compiled.represent(hot_rows, representation)
+            old = ARCHIVED[self.get_serializer_class()].represent(
+                archived_rows, representation)
+        hot, old = iter(hot), iter(old)
+        return [next(old if is_old else hot) for is_old in archived]
+
+    def list_archive(self) -> Response:
+        '''Respond with the page of archived rows asked by the request'''
+        response = self.list_queryset(
+            self.get_archive_queryset(),
+            ARCHIVED[self.get_serializer_class()])
+        # Pages of archived rows link to each other
+        for name in ('next', 'previous'):
+            if response.data[name] is not None:
+                response.data[name] = replace_query_param(
+                    response.data[name], 'archived', 'true')
+        return response
+
+    def serialize_chunks(self, queryset) -> Iterator[list]:
+        '''Stream the rows of the hot table and of the archive merged'''
+        if not archive.enabled():
+            yield from super().serialize_chunks(queryset)
+            return
+        representation = get_representation(self.request)
+        size = getattr(settings, 'STREAM_CHUNK_SIZE', 500)
+        rows = heapq.merge(
+            self.get_hot_rows(queryset, representation).iterator(
+                chunk_size=size),
+            self.get_archived_rows(
+                self.get_archive_queryset(), representation).order_by(
+                *self.paginator.ordering).iterator(chunk_size=size),
+            key=position_key, reverse=True)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield self.represent_rows(chunk, representation)
+
+
+class ArchiveRetrieveMixin:
+    '''Viewset mixin retrieving from `archive_model` what isn't found'''
+    archive_model = None
+
+    def get_archived_object(self, queryset=None):
+        '''Get the archived row asked by the request, or raise Http404'''
+        if not archive.enabled():
+            raise Http404
+        if queryset is None:
+            queryset = self.archive_model.objects.all()
+        return get_object_or_404(
+            queryset,
+            pk=self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not archive.enabled():
+                raise
+        compiled = ARCHIVED[self.get_serializer_class()]
+        representation = get_representation(request)
+        row = self.get_archived_object(self.archive_model.objects.values(
+            *compiled.columns(representation)))
+        return Response(compiled.represent([row], representation)[0])
@@ -0,0 +1,298 @@
+'''
+Async views of the read paths of the API, for ASGI deployments.
+They return the same representations and pages as the viewsets, loading
+the related objects themselves instead of with `prefetch_related`:
+Django runs the queries of a request one at a time on its own thread, so
+independent lookups, such as the follows and followers of a profile, are
+evaluated concurrently on worker threads with their own connections.
+Pages are read and represented together on the thread of the request
+with the precompiled representations, as the viewsets list them, which
+keeps the CPU bound work off the event loop.
+Requests are authenticated and negotiated as by the viewsets, so the
+viewer and the `Accept` header are represented the same, and errors are
+answered in JSON as the viewsets answer them.
+'''
+import asyncio
+import functools
+from collections import defaultdict
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions, status
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from api.pagination import CreatedAtPagination
+from api.renderers import FastJSONRenderer
+from api.representations import COMPILED, Compiled
+from api.serializers import (
+    ProfileDetailSerializer,
+    PostSerializer,
+    CommentSerializer,
+    get_representation,
+)
+from api.views import is_summary
+from core.models import (
+    Profile,
+    Follow,
+    Post,
+    Reaction,
+    Comment,
+)
+
+# The async views only read
+ALLOWED_METHODS = ('GET', 'HEAD')
+
+
+def fetch(queryset) -> list:
+    '''Evaluate `queryset` on the connection of a worker thread'''
+    try:
+        return list(queryset)
+    finally:
+        close_old_connections()
+
+
+async def gather(*querysets) -> list:
+    '''Evaluate `querysets` concurrently'''
+    return await asyncio.gather(*(
+        sync_to_async(fetch, thread_sensitive=False)(queryset)
+        for queryset in querysets
+    ))
+
+
+def cache_related(instance, name: str, objects: list) -> None:
+    '''Store `objects` as the `name` relation of `instance` was prefetched'''
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache[name] = queryset
+
+
+async def load_follow_graph(profiles: list) -> None:
+    '''Load the follows and followers of `profiles` along with their users'''
+    if not profiles:
+        return
+    ids = {profile.id for profile in profiles}
+    follows, followers = await gather(
+        Follow.objects.filter(from_profile__in=ids).select_related(
+            'to_profile__user').order_by('to_profile'),
+        Follow.objects.filter(to_profile__in=ids).select_related(
+            'from_profile__user').order_by('from_profile'),
+    )
+    follows_of, followers_of = defaultdict(list), defaultdict(list)
+    for follow in follows:
+        follows_of[follow.from_profile_id].append(follow.to_profile)
+    for follow in followers:
+        followers_of[follow.to_profile_id].append(follow.from_profile)
+    for profile in profiles:
+        cache_related(profile, 'follows', follows_of[profile.id])
+        cache_related(profile, 'following', followers_of[profile.id])
+
+
+async def load_reactions(posts: list, summary: bool) -> list:
+    '''Load the reactions of `posts` and return them'''
+    reactions = Reaction.objects.filter(
+        post__in={post.id for post in posts}).order_by('profile_id')
+    if summary:
+        reactions = reactions.only('post_id', 'profile_id', 'kind')
+    else:
+        reactions = reactions.select_related('profile__user')
+    reactions_of = defaultdict(list)
+    async for reaction in reactions:
+        reactions_of[reaction.post_id].append(reaction)
+    for post in posts:
+        cache_related(post, 'reactions', reactions_of[post.id])
+    return [reaction for post_reactions in reactions_of.values()
+            for reaction in post_reactions]
+
+
+async def load_viewer(posts: list, viewer: Optional[int]) -> None:
+    '''
+    Load the reactions of the user `viewer` to `posts` and its follows of
+    their authors, as `PostQuerySet.with_viewer` prefetches them
+    '''
+    if viewer is None or not posts:
+        return
+    reactions, follows = await gather(
+        Reaction.objects.filter(
+            profile__user=viewer,
+            post__in={post.id for post in posts}).only('post_id', 'kind'),
+        Follow.objects.filter(
+            from_profile__user=viewer,
+            to_profile__in={post.profile_id for post in posts}),
+    )
+    reactions_of, follows_of = defaultdict(list), defaultdict(list)
+    for reaction in reactions:
+        reactions_of[reaction.post_id].append(reaction)
+    for follow in follows:
+        follows_of[follow.to_profile_id].append(follow)
+    for post in posts:
+        post.viewer_reactions = reactions_of[post.id]
+        post.profile.viewer_follows = follows_of[post.profile_id]
+
+
+async def load_posts(posts: list, summary: bool,
+                     viewer: Optional[int] = None) -> None:
+    '''Load what the representation of `posts` embeds'''
+    if summary:
+        await asyncio.gather(
+            load_reactions(posts, summary), load_viewer(posts, viewer))
+        return
+    reactions, _, _ = await asyncio.gather(
+        load_reactions(posts, summary),
+        load_follow_graph([post.profile for post in posts]),
+        load_viewer(posts, viewer),
+    )
+    await load_follow_graph([reaction.profile for reaction in reactions])
+
+
+def represent_page(request: Request, paginator: CreatedAtPagination,
+                   queryset, compiled: Compiled) -> dict:
+    '''Represent the page of `queryset` with its `compiled` representation'''
+    representation = get_representation(request)
+    columns = dict.fromkeys(compiled.columns(representation) + [
+        field.lstrip('-') for field in paginator.ordering])
+    page = paginator.paginate_queryset(
+        queryset.prefetch_related(None).values(*columns), request)
+    data = compiled.represent(page, representation)
+    return paginator.get_paginated_response(data).data
+
+
+def serialize(serializer_class, page: list, request: Request) -> dict:
+    '''Represent the loaded `page` with `serializer_class`'''
+    return serializer_class(
+        page, many=True, context={'request': request}).data
+
+
+async def paginate(request: Request, queryset, serializer_class,
+                   load) -> HttpResponse:
+    '''Respond with the page of `queryset` asked by `request`'''
+    paginator = CreatedAtPagination()
+    compiled = COMPILED.get(serializer_class)
+    if compiled is not None and getattr(
+            settings, 'COMPILED_REPRESENTATIONS', True):
+        return render(await sync_to_async(represent_page)(
+            request, paginator, queryset, compiled))
+    page = await sync_to_async(paginator.paginate_queryset)(
+        queryset, request)
+    await load(page)
+    data = await sync_to_async(serialize)(serializer_class, page, request)
+    return render(paginator.get_paginated_response(data).data)
+
+
+def render(data, status: int = 200) -> HttpResponse:
+    '''Respond with `data` rendered as the viewsets do'''
+    return HttpResponse(
+        FastJSONRenderer().render(data), content_type='application/json',
+        status=status)
+
+
+def handle_exception(request: Request,
+                     exc: exceptions.APIException) -> HttpResponse:
+    '''Answer `exc` as `APIView.handle_exception` does'''
+    if isinstance(exc.detail, (list, dict)):
+        response = render(exc.detail, exc.status_code)
+    else:
+        response = render({'detail': exc.detail}, exc.status_code)
+    if isinstance(exc, exceptions.MethodNotAllowed):
+        response['Allow'] = ', '.join(ALLOWED_METHODS)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        header = request.authenticators[0].authenticate_header(request)
+        if header:
+            response['WWW-Authenticate'] = header
+        else:
+            response.status_code = status.HTTP_403_FORBIDDEN
+    return response
+
+
+def api_request(view):
+    '''
+    Decorator of async views passing them the request as a REST framework
+    request, authenticated with the configured authenticators and
+    negotiated, and answering errors as the viewsets do
+    '''
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request = Request(
+            request,
+            authenticators=[
+                authenticator() for authenticator in
+                api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            negotiator=api_settings.DEFAULT_CONTENT_NEGOTIATION_CLASS())
+        try:
+            if request.method not in ALLOWED_METHODS:
+                raise exceptions.MethodNotAllowed(request.method)
+            request.accepted_renderer, request.accepted_media_type = \
+                request.negotiator.select_renderer(
+                    request, [FastJSONRenderer()])
+            # Authenticators query the database
+            await sync_to_async(getattr)(request, 'user')
+            return await view(request, *args, **kwargs)
+        except Http404:
+            return handle_exception(request, exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return handle_exception(request, exc)
+    return wrapper
+
+
+@api_request
+async def profile_detail(request, pk):
+    '''Retrieve a profile with its follows and followers'''
+    try:
+        profile = await Profile.objects.select_related('user').aget(pk=pk)
+    except Profile.DoesNotExist:
+        raise Http404
+    await load_follow_graph([profile])
+    return render(ProfileDetailSerializer(
+        profile, context={'request': request}).data)
+
+
+@api_request
+async def post_list(request):
+    '''List the posts, optionally filtered by `?profile=`'''
+    summary = is_summary(request)
+    viewer = get_representation(request).viewer
+    queryset = Post.objects.select_related('profile__user')
+    profile = request.query_params.get('profile')
+    if profile is not None:
+        queryset = queryset.filter(profile=profile)
+    return await paginate(
+        request, queryset, PostSerializer,
+        lambda posts: load_posts(posts, summary, viewer))
+
+
+@api_request
+async def post_detail(request, pk):
+    '''Retrieve a post with its author, likers and dislikers'''
+    try:
+        post = await Post.objects.select_related('profile__user').aget(pk=pk)
+    except Post.DoesNotExist:
+        raise Http404
+    await load_posts(
+        [post], is_summary(request), get_representation(request).viewer)
+    return render(PostSerializer(post, context={'request': request}).data)
+
+
+@api_request
+async def comment_list(request):
+    '''List the comments with their authors and posts'''
+    summary = is_summary(request)
+    viewer = get_representation(request).viewer
+    queryset = Comment.objects.select_related('profile__user')
+    if not summary:
+        queryset = queryset.select_related('post__profile__user')
+
+    async def load(comments: list) -> None:
+        if summary:
+            return
+        await asyncio.gather(
+            load_posts(
+                [comment.post for comment in comments], summary, viewer),
+            load_follow_graph([comment.profile for comment in comments]),
+        )
+
+    return await paginate(request, queryset, CommentSerializer, load)
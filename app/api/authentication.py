@@ -0,0 +1,149 @@
+'''
+Token authentication resolving tokens from a cache.
+A token is resolved to its user, with the profile of the user attached,
+by one query the first time it's seen and from the cache afterwards, for
+`TOKEN_CACHE_TTL` seconds. Tokens are cached in a bounded LRU of each
+process, or in the cache `TOKEN_CACHE_ALIAS` shared by the processes
+when it's set.
+Deleting a token or saving its user, e.g. to deactivate it, forgets the
+token in the shared cache and in the LRU of the process making the
+change; the LRU of the other processes forgets it when it expires.
+The attached profile is meant for identifying the user: its counters may
+be as old as the cached token.
+'''
+import copy
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token, TokenProxy
+
+
+class LRUCache:
+    '''Thread-safe least recently used cache of expiring entries'''
+    def __init__(self) -> None:
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: str):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, timeout: float, size: int) -> None:
+        '''Cache `value`, evicting the least recently used past `size`'''
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+TOKENS = LRUCache()
+
+
+def get_shared_cache():
+    '''Cache backend shared by the processes, if one is configured'''
+    alias = getattr(settings, 'TOKEN_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def cache_key(key: str) -> str:
+    # Tokens are secrets, so the shared cache only sees their digest
+    return 'api:token:%s' % hashlib.sha256(key.encode()).hexdigest()
+
+
+def detach(token: Token) -> Token:
+    '''Copy a cached token, its user and profile for a single request'''
+    token = copy.copy(token)
+    token.user = copy.copy(token.user)
+    token.user.profile = copy.copy(token.user.profile)
+    return token
+
+
+def get_token(key: str) -> Optional[Token]:
+    '''Get the cached token of `key`'''
+    shared = get_shared_cache()
+    if shared is not None:
+        return shared.get(cache_key(key))
+    token = TOKENS.get(key)
+    return None if token is None else detach(token)
+
+
+def cache_token(token: Token) -> None:
+    timeout = getattr(settings, 'TOKEN_CACHE_TTL', 60)
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.set(cache_key(token.key), token, timeout=timeout)
+    else:
+        TOKENS.set(
+            token.key, detach(token), timeout,
+            getattr(settings, 'TOKEN_CACHE_SIZE', 10000))
+
+
+def forget(*keys: str) -> None:
+    '''Forget the cached tokens of `keys`'''
+    shared = get_shared_cache()
+    if shared is not None:
+        shared.delete_many([cache_key(key) for key in keys])
+    for key in keys:
+        TOKENS.delete(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''
+    Token authentication resolving tokens from the cache, and attaching
+    the profile to the authenticated user
+    '''
+    def authenticate_credentials(self, key):
+        token = get_token(key)
+        if token is None:
+            try:
+                token = self.get_model().objects.select_related(
+                    'user__profile').get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if token.user.is_active:
+                cache_token(token)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token)
+@receiver(post_delete, sender=TokenProxy)
+def forget_deleted_token(instance, **kwargs) -> None:
+    forget(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_tokens(instance, created, **kwargs) -> None:
+    '''Forget the tokens of a saved user, e.g. when it's deactivated'''
+    if not created:
+        forget(*Token.objects.filter(user=instance).values_list(
+            'key', flat=True))
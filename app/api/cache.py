@@ -0,0 +1,175 @@
+'''
+Per-object cache of API responses.
+A cached response remembers the generation of every object it was built
+from. Writes invalidate an object by giving it a new generation, which
+makes every response depending on it stale without having to know their
+keys. Checking a cached response only reads the cache, never the database.
+'''
+import hashlib
+import json
+from uuid import uuid4
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import status
+from rest_framework.response import Response
+from core import counters
+from core.models import (
+    Profile,
+    Post,
+    Comment,
+    deleted_with_post,
+)
+from api.serializers import get_representation
+
+# Bump when the serialized representation of the objects changes
+VERSION = 2
+
+
+def get_cache():
+    '''Cache backend of the responses'''
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def generation_key(kind: str, pk) -> str:
+    return f'api:generation:{kind}:{pk}'
+
+
+def invalidate(kind: str, *pks) -> None:
+    '''Make the cached responses built from the given objects stale'''
+    get_cache().set_many(
+        {generation_key(kind, pk): uuid4().hex for pk in pks}, timeout=None)
+
+
+def get_generations(cache, keys: list) -> dict:
+    '''Get the current generation of the objects, creating missing ones'''
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, uuid4().hex, timeout=None)
+            generations[key] = cache.get(key)
+    return generations
+
+
+def get_etag(data) -> str:
+    content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+    return '"%s"' % hashlib.md5(content.encode()).hexdigest()
+
+
+def etag_matches(request, etag: str) -> bool:
+    '''Check the `If-None-Match` header of a request against an ETag'''
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return etag in etags or '*' in etags
+
+
+class CachedRetrieveMixin:
+    '''
+    Viewset mixin caching the responses of `retrieve`.
+    Responses are cached per object and representation, viewer included,
+    and carry an ETag so clients holding an unchanged response get a
+    `304 Not Modified`.
+    '''
+    cache_kind = None
+
+    def get_cache_dependencies(self, instance) -> list:
+        '''Get the (kind, pk) of the objects the response is built from'''
+        return [(self.cache_kind, instance.pk)]
+
+    def get_cache_key(self) -> str:
+        representation = get_representation(self.request)
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+        return 'api:response:%s:%s:%s:%d:%s:%s' % (
+            VERSION, self.cache_kind, lookup,
+            representation.summary, ','.join(sorted(representation.expand)),
+            representation.viewer or '')
+
+    def retrieve(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.get_cache_key()
+        entry = cache.get(key)
+        # Generations are read before the objects are loaded, so a write
+        # landing in between leaves the entry stale instead of caching
+        # what it replaced under its new generation. Those of the related
+        # objects are only known from a previous entry, otherwise they're
+        # read once the object is loaded.
+        keys = [generation_key(
+            self.cache_kind,
+            self.kwargs[self.lookup_url_kwarg or self.lookup_field])]
+        if entry is not None:
+            keys = list(entry['generations'])
+            generations = cache.get_many(keys)
+            if generations != entry['generations']:
+                entry = None
+        if entry is None:
+            generations = get_generations(cache, keys)
+            instance = self.get_object()
+            generations.update(get_generations(cache, [
+                generation_key(kind, pk)
+                for kind, pk in self.get_cache_dependencies(instance)
+                if generation_key(kind, pk) not in generations
+            ]))
+            data = self.get_serializer(instance).data
+            entry = {
+                'data': data,
+                'etag': get_etag(data),
+                'generations': generations,
+            }
+            cache.set(key, entry, getattr(
+                settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+
+        headers = {'ETag': entry['etag']}
+        if etag_matches(request, entry['etag']):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+        return Response(entry['data'], headers=headers)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_profile(sender, instance, **kwargs) -> None:
+    '''
+    Invalidate edited and deleted objects, and new ones in case their id
+    was used before
+    '''
+    invalidate(sender._meta.model_name, instance.pk)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_profile(instance, created, update_fields,
+                            **kwargs) -> None:
+    '''Invalidate the profile embedding an edited user'''
+    if created or update_fields == frozenset(['last_login']):
+        return
+    invalidate('profile', *Profile.objects.filter(
+        user=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_commented_post(instance, origin=None, **kwargs) -> None:
+    '''
+    Invalidate the comment count of the commented post, unless the post
+    is deleted and invalidated by itself
+    '''
+    if not deleted_with_post(origin):
+        invalidate('post', instance.post_id)
+
+
+@receiver(m2m_changed, sender=Profile.follows.through)
+def invalidate_follows(instance, action, pk_set, **kwargs) -> None:
+    '''Invalidate the follow lists of both sides of a follow'''
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate('profile', instance.pk, *(pk_set or ()))
+
+
+@receiver(counters.rolled_up)
+def invalidate_rolled_up_post(post_id, **kwargs) -> None:
+    '''Invalidate the counters of a hot post once its shards are rolled up'''
+    invalidate('post', post_id)
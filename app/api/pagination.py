@@ -0,0 +1,128 @@
+import heapq
+from itertools import islice
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+
+class CursorPagination(pagination.CursorPagination):
+    '''
+    Keyset pagination ordered by newest first.
+    Pages are fetched with `WHERE id < cursor ORDER BY id DESC LIMIT n`,
+    so a page costs the same at any depth of the listing.
+    '''
+    ordering = '-id'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+def position_key(row) -> tuple:
+    '''Creation time and id of a model instance or of a dict of values'''
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.id
+
+
+class CreatedAtPagination(CursorPagination):
+    '''
+    Keyset pagination of posts and comments ordered by newest first, of
+    their creation times then of their ids.
+    REST framework keeps only the first field of the ordering in the
+    cursor and skips the rows tied on it with an offset, capped at
+    `offset_cutoff`. The cursor holds both the creation time and the id
+    instead, so rows created at the same time, like the rows stamped by
+    a migration, are paged through with
+    `WHERE created_at < t OR (created_at = t AND id < i)`.
+    '''
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request, view)
+
+    def paginate_querysets(self, querysets: list, request, view=None):
+        '''
+        Paginate the rows of `querysets` merged into a single listing, e.g.
+        the rows of a table and of its archive. Each queryset reads at most
+        a page past the cursor, and the rows may be model instances or
+        dicts of values.
+        '''
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, querysets[0], view)
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        rows = []
+        for queryset in querysets:
+            if reverse:
+                queryset = queryset.order_by(
+                    *pagination._reverse_ordering(self.ordering))
+            else:
+                queryset = queryset.order_by(*self.ordering)
+            if current_position is not None:
+                queryset = queryset.filter(
+                    self.after(current_position, older=not reverse))
+            rows.append(list(queryset[:offset + self.page_size + 1]))
+        results = list(islice(
+            heapq.merge(*rows, key=position_key, reverse=not reverse),
+            offset, offset + self.page_size + 1))
+        self.page = results[:self.page_size]
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following_position
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and \
+                self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, position: str, older: bool) -> Q:
+        '''Filter of the rows older or newer than a cursor position'''
+        created_at, _, pk = position.rpartition('|')
+        try:
+            created_at, pk = parse_datetime(created_at), int(pk)
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'lt' if older else 'gt'
+        return Q(**{f'created_at__{lookup}': created_at}) | Q(
+            created_at=created_at, **{f'id__{lookup}': pk})
+
+    def _get_position_from_instance(self, instance, ordering):
+        created_at, pk = position_key(instance)
+        return f'{created_at.isoformat()}|{pk}'
+
+
+class TimelinePagination(CursorPagination):
+    '''Keyset pagination of a home timeline, ordered by its entries'''
+    ordering = '-timeline_post'
+
+
+class SearchPagination(pagination.PageNumberPagination):
+    '''
+    Page number pagination of the ranked hits of a search.
+    The hits are capped by `SEARCH_MAX_RESULTS`, so any page is cheap.
+    '''
+    page_size_query_param = 'page_size'
+    max_page_size = 100
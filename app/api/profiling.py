@@ -0,0 +1,143 @@
+'''
+Sampled profiling of the API requests.
+A sampled request records its queries, database time, duplicate queries
+and serialization time, which are sent back in a `Server-Timing` header
+and logged to `api.profiling` along with the viewset action which served
+the request, e.g. `PostViewSet.like`.
+Profiling is off unless `PROFILING_SAMPLE_RATE` is above 0, and only the
+sampled fraction of the requests pays for it.
+'''
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfile:
+    '''Measurements of a single request'''
+    def __init__(self) -> None:
+        self.action = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serialize_time = 0.0
+        self.statements = Counter()
+
+    @property
+    def duplicates(self) -> int:
+        '''Number of queries repeating an earlier one with the same params'''
+        return sum(count - 1 for count in self.statements.values())
+
+    def __call__(self, execute, sql, params, many, context):
+        '''Database execute wrapper timing the queries'''
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.statements[(sql, repr(params))] += 1
+
+
+class ProfilingMiddleware:
+    '''Middleware profiling a sample of the requests'''
+    def __init__(self, get_response) -> None:
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        if self.sample_rate <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        profile = request.profiling = RequestProfile()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(profile))
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+
+        action = profile.action
+        if action is None and request.resolver_match is not None:
+            action = request.resolver_match.view_name
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.2f;desc="%d queries, %d duplicates"' % (
+                profile.db_time * 1000, profile.queries,
+                profile.duplicates),
+            'serialize;dur=%.2f' % (profile.serialize_time * 1000),
+            'total;dur=%.2f;desc="%s"' % (total * 1000, action),
+        ])
+        fields = {
+            'action': action,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(profile.db_time * 1000, 2),
+            'queries': profile.queries,
+            'duplicate_queries': profile.duplicates,
+            'serialize_ms': round(profile.serialize_time * 1000, 2),
+        }
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'profiling': fields})
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        '''Name the viewset action serving a profiled request'''
+        profile = getattr(request, 'profiling', None)
+        cls = getattr(view_func, 'cls', None)
+        actions = getattr(view_func, 'actions', None) or {}
+        if profile is not None and cls is not None:
+            action = actions.get(request.method.lower(), request.method)
+            profile.action = f'{cls.__name__}.{action}'
+
+
+_timed_classes = {}
+
+
+def timed(serializer_class):
+    '''Return a subclass of `serializer_class` timing its `data`'''
+    if serializer_class not in _timed_classes:
+        def data(self):
+            profile = getattr(self.context.get('request'), 'profiling', None)
+            start = time.perf_counter()
+            try:
+                return super(timed_class, self).data
+            finally:
+                if profile is not None:
+                    profile.serialize_time += time.perf_counter() - start
+
+        timed_class = type(serializer_class.__name__, (serializer_class,), {
+            'data': property(data),
+            '__module__': serializer_class.__module__,
+        })
+        _timed_classes[serializer_class] = timed_class
+    return _timed_classes[serializer_class]
+
+
+@contextmanager
+def serializing(request):
+    '''Time a serialization done without a serializer'''
+    profile = getattr(request, 'profiling', None)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.serialize_time += time.perf_counter() - start
+
+
+class ProfilingMixin:
+    '''Viewset mixin timing the serialization of profiled requests'''
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if getattr(self.request, 'profiling', None) is not None:
+            serializer.__class__ = timed(type(serializer))
+        return serializer
@@ -0,0 +1,55 @@
+'''
+JSON renderer and parser encoding and decoding with orjson when it's
+installed, and with the standard library otherwise.
+They produce and accept the same JSON as the renderer and parser of
+REST framework: compact, UTF-8, with the types orjson doesn't know
+encoded by the encoder of REST framework.
+Views pick them with `renderer_classes` and `parser_classes`, and they
+are the defaults of `REST_FRAMEWORK`.
+'''
+from rest_framework import renderers, parsers
+from rest_framework.exceptions import ParseError
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Datetimes are left to the encoder of REST framework, which writes
+    # them differently
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+class FastJSONRenderer(renderers.JSONRenderer):
+    '''JSON renderer encoding with orjson when it's installed'''
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        # Only the compact UTF-8 encoding is done by orjson
+        if indent or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        content = orjson.dumps(
+            data, default=encoders.JSONEncoder().default, option=OPTIONS)
+        # Escaped by REST framework for the sake of JavaScript
+        return content.replace(
+            b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+
+class FastJSONParser(parsers.JSONParser):
+    '''JSON parser decoding with orjson when it's installed'''
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        try:
+            content = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                content = content.decode(encoding)
+            return orjson.loads(content)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
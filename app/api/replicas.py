@@ -0,0 +1,85 @@
+'''
+Routing of the reads of the API to read replicas.
+The reads of safe requests to the viewsets go to one of the
+`DATABASE_REPLICAS`, picked per request, and everything else goes to
+`default`. A user who sent a write reads from `default` for the next
+`REPLICA_STICKY_SECONDS`, so they see their own writes while the
+replicas catch up. Users are remembered in the default cache, which is
+shared by the processes when it's Redis.
+Responses which are streamed read from `default`, as they are read once
+the view has returned.
+'''
+import random
+from contextvars import ContextVar
+from typing import Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Replica the reads of the current request go to
+REPLICA: ContextVar[Optional[str]] = ContextVar('replica', default=None)
+
+
+def get_replicas() -> list:
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def sticky_key(user) -> str:
+    return f'api:replica:sticky:{user.pk}'
+
+
+class ReplicaRouter:
+    '''
+    Database router sending the reads of the requests marked by
+    `ReplicaReadMixin` to their replica, and everything else to `default`
+    '''
+    def db_for_read(self, model, **hints):
+        return REPLICA.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as `default`
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are migrated by the replication of `default`
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    '''
+    Viewset mixin reading from a replica for safe requests, unless the
+    user wrote recently, and making the user read from `default` for a
+    while after writes
+    '''
+    def dispatch(self, request, *args, **kwargs):
+        token = REPLICA.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            REPLICA.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        replicas = get_replicas()
+        if not replicas or request.method not in SAFE_METHODS:
+            return
+        user = request.user
+        if user.is_authenticated and cache.get(sticky_key(user)):
+            return
+        REPLICA.set(random.choice(replicas))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        user = getattr(request, 'user', None)
+        if (get_replicas() and user is not None and user.is_authenticated
+                and request.method not in SAFE_METHODS):
+            cache.set(sticky_key(user), True,
+                      timeout=getattr(settings, 'REPLICA_STICKY_SECONDS', 10))
+        return response
@@ -0,0 +1,347 @@
+'''
+Precompiled representations of the hot serializers for the list endpoints.
+The listed rows are read with `.values()` and turned into the same dicts
+as `PostSerializer`, `CommentSerializer` and `PostCommentSerializer` with
+their nested profile and user serializers, without creating model
+instances, serializers or fields for every row. Related profiles are
+listed by id, as the prefetches of the serializers order them.
+`api/tests/test_representations.py` checks that both render the same
+bytes, so a field added to a serializer must be added here too.
+'''
+from collections import defaultdict, namedtuple
+from typing import Dict, Iterable, List
+from django.conf import settings
+from django.db.models import Q
+from rest_framework import serializers
+from rest_framework.response import Response
+from core.models import (
+    Profile,
+    Follow,
+    Reaction,
+    Post,
+    ArchivedPost,
+)
+from api import profiling
+from api.serializers import (
+    UserSerializer,
+    PostSerializer,
+    CommentSerializer,
+    PostCommentSerializer,
+    Representation,
+    REACTION_NAMES,
+    get_representation,
+)
+
+USER_FIELDS = tuple(UserSerializer.Meta.fields)
+USER_COLUMNS = tuple(f'user__{name}' for name in USER_FIELDS)
+# Creation times are represented as the serializers do
+DATETIME = serializers.DateTimeField()
+
+# Columns of the listed rows, and the function representing them
+Compiled = namedtuple('Compiled', ['columns', 'represent'])
+
+
+def expanded(representation: Representation, name: str) -> bool:
+    '''Check whether the nested field `name` is represented in full'''
+    return not representation.summary or name in representation.expand
+
+
+def represent_profiles(ids: Iterable[int],
+                       representation: Representation) -> Dict[int, dict]:
+    '''Represent the profiles of `ids` as `ProfileSerializer`, by id'''
+    ids = set(ids)
+    if not ids:
+        return {}
+    follows, following = defaultdict(list), defaultdict(list)
+    for from_id, to_id in Follow.objects.filter(
+            Q(from_profile__in=ids) | Q(to_profile__in=ids)).values_list(
+            'from_profile_id', 'to_profile_id'):
+        if from_id in ids:
+            follows[from_id].append(to_id)
+        if to_id in ids:
+            following[to_id].append(from_id)
+    full_follows = expanded(representation, 'follows')
+    full_following = expanded(representation, 'following')
+    needed = set(ids)
+    if full_follows:
+        needed.update(*follows.values())
+    if full_following:
+        needed.update(*following.values())
+    rows = Profile.objects.filter(pk__in=needed).values_list(
+        'id', 'follows_count', 'following_count', *USER_COLUMNS)
+    users, counts = {}, {}
+    for row in rows:
+        users[row[0]] = dict(zip(USER_FIELDS, row[3:]))
+        counts[row[0]] = row[1:3]
+
+    def related(pks: list, full: bool) -> list:
+        pks.sort()
+        if full:
+            return [{'user': users[pk]} for pk in pks]
+        return pks
+
+    return {
+        pk: {
+            'user': users[pk],
+            'follows': related(follows[pk], full_follows),
+            'following': related(following[pk], full_following),
+            'follows_count': counts[pk][0],
+            'following_count': counts[pk][1],
+        }
+        for pk in ids if pk in users
+    }
+
+
+def post_columns(representation: Representation) -> list:
+    columns = [
+        'id', 'profile_id', 'post',
+        'like_count', 'dislike_count', 'comment_count', 'created_at',
+    ]
+    if not expanded(representation, 'profile'):
+        columns.append('profile__user__username')
+    return columns
+
+
+def represent_posts(rows: List[dict], representation: Representation,
+                    reactions: dict = None,
+                    viewer_reactions: dict = None) -> List[dict]:
+    '''
+    Represent post rows as `PostSerializer`, with the ids of the profiles
+    which reacted to them by kind from `reactions` or from their reactions,
+    and the reaction of the viewer to each post from `viewer_reactions`
+    or from its reactions
+    '''
+    viewer = representation.viewer
+    followed = set()
+    if viewer is not None and rows:
+        if viewer_reactions is None:
+            viewer_reactions = dict(Reaction.objects.filter(
+                profile__user=viewer,
+                post__in=[row['id'] for row in rows]).values_list(
+                'post_id', 'kind'))
+        followed = set(Follow.objects.filter(
+            from_profile__user=viewer,
+            to_profile__in={row['profile_id'] for row in rows}).values_list(
+            'to_profile_id', flat=True))
+    viewer_reactions = viewer_reactions or {}
+    if reactions is None:
+        reactions = defaultdict(
+            lambda: {Reaction.LIKE: [], Reaction.DISLIKE: []})
+        for post_id, profile_id, kind in Reaction.objects.filter(
+                post__in=[row['id'] for row in rows]).order_by(
+                'profile_id').values_list('post_id', 'profile_id', 'kind'):
+            reactions[post_id][kind].append(profile_id)
+    full_profile = expanded(representation, 'profile')
+    full_likes = expanded(representation, 'likes')
+    full_dislikes = expanded(representation, 'dislikes')
+    profile_ids = set()
+    if full_profile:
+        profile_ids.update(row['profile_id'] for row in rows)
+    for post_reactions in reactions.values():
+        if full_likes:
+            profile_ids.update(post_reactions[Reaction.LIKE])
+        if full_dislikes:
+            profile_ids.update(post_reactions[Reaction.DISLIKE])
+    profiles = represent_profiles(profile_ids, representation)
+
+    def reactors(pks: list, full: bool) -> list:
+        if full:
+            return [profiles[pk] for pk in pks]
+        return pks
+
+    data = []
+    for row in rows:
+        post_reactions = reactions[row['id']]
+        if full_profile:
+            profile = profiles[row['profile_id']]
+        else:
+            profile = {
+                'id': row['profile_id'],
+                'username': row['profile__user__username'],
+            }
+        data.append({
+            'id': row['id'],
+            'profile': profile,
+            'post': row['post'],
+            'likes': reactors(post_reactions[Reaction.LIKE], full_likes),
+            'dislikes': reactors(
+                post_reactions[Reaction.DISLIKE], full_dislikes),
+            'like_count': row['like_count'],
+            'dislike_count': row['dislike_count'],
+            'comment_count': row['comment_count'],
+            'created_at': DATETIME.to_representation(row['created_at']),
+            'viewer_reaction': REACTION_NAMES.get(
+                viewer_reactions.get(row['id'])),
+            'viewer_follows_author': row['profile_id'] in followed,
+        })
+    return data
+
+
+def comment_columns(representation: Representation) -> list:
+    columns = ['id', 'profile_id', 'post_id', 'comment', 'created_at']
+    if not expanded(representation, 'profile'):
+        columns.append('profile__user__username')
+    return columns
+
+
+def represent_comments(rows: List[dict], representation: Representation,
+                       archived: bool = False) -> List[dict]:
+    '''
+    Represent comment rows as `CommentSerializer`, with their posts read
+    from the archive when they are `archived`
+    '''
+    full_profile = expanded(representation, 'profile')
+    full_post = expanded(representation, 'post')
+    profiles, posts = {}, {}
+    if full_profile:
+        profiles = represent_profiles(
+            [row['profile_id'] for row in rows], representation)
+    if full_post:
+        compiled = ARCHIVED[PostSerializer] if archived else \
+            COMPILED[PostSerializer]
+        model = ArchivedPost if archived else Post
+        post_rows = model.objects.filter(
+            pk__in={row['post_id'] for row in rows}).values(
+            *compiled.columns(representation))
+        posts = {
+            post['id']: post
+            for post in compiled.represent(list(post_rows), representation)
+        }
+    data = []
+    for row in rows:
+        if full_profile:
+            profile = profiles[row['profile_id']]
+        else:
+            profile = {
+                'id': row['profile_id'],
+                'username': row['profile__user__username'],
+            }
+        data.append({
+            'id': row['id'],
+            'profile': profile,
+            'post': posts[row['post_id']] if full_post else row['post_id'],
+            'comment': row['comment'],
+            'created_at': DATETIME.to_representation(row['created_at']),
+        })
+    return data
+
+
+def post_comment_columns(representation: Representation) -> list:
+    return ['id', 'profile_id', 'profile__user__username', 'comment',
+            'created_at']
+
+
+def represent_post_comments(rows: List[dict],
+                            representation: Representation) -> List[dict]:
+    '''Represent comment rows as `PostCommentSerializer`'''
+    return [
+        {
+            'id': row['id'],
+            'profile': {
+                'id': row['profile_id'],
+                'username': row['profile__user__username'],
+            },
+            'comment': row['comment'],
+            'created_at': DATETIME.to_representation(row['created_at']),
+        }
+        for row in rows
+    ]
+
+
+def archived_post_columns(representation: Representation) -> list:
+    return post_columns(representation) + ['likes', 'dislikes']
+
+
+def represent_archived_posts(rows: List[dict],
+                             representation: Representation) -> List[dict]:
+    '''Represent archived post rows as `PostSerializer`'''
+    reactions = {
+        row['id']: {
+            Reaction.LIKE: row['likes'],
+            Reaction.DISLIKE: row['dislikes'],
+        }
+        for row in rows
+    }
+    viewer_reactions = None
+    if representation.viewer is not None and rows:
+        # Archived reactions are kept by profile
+        profile_id = Profile.objects.filter(
+            user=representation.viewer).values_list('id', flat=True).first()
+        viewer_reactions = {
+            post_id: kind
+            for post_id, post_reactions in reactions.items()
+            for kind, profile_ids in post_reactions.items()
+            if profile_id in profile_ids
+        }
+    return represent_posts(
+        rows, representation, reactions, viewer_reactions)
+
+
+def represent_archived_comments(
+        rows: List[dict], representation: Representation) -> List[dict]:
+    '''Represent archived comment rows as `CommentSerializer`'''
+    return represent_comments(rows, representation, archived=True)
+
+
+COMPILED = {
+    PostSerializer: Compiled(post_columns, represent_posts),
+    CommentSerializer: Compiled(comment_columns, represent_comments),
+    PostCommentSerializer: Compiled(
+        post_comment_columns, represent_post_comments),
+}
+
+# Representations of the archived rows, which have no serializers
+ARCHIVED = {
+    PostSerializer: Compiled(archived_post_columns, represent_archived_posts),
+    CommentSerializer: Compiled(comment_columns, represent_archived_comments),
+    PostCommentSerializer: Compiled(
+        post_comment_columns, represent_post_comments),
+}
+
+
+class CompiledPageMixin:
+    '''
+    Viewset mixin paginating with the precompiled representation of its
+    serializer class, when there is one and `COMPILED_REPRESENTATIONS`
+    is on.
+    '''
+    def get_compiled(self):
+        if not getattr(settings, 'COMPILED_REPRESENTATIONS', True):
+            return None
+        return COMPILED.get(self.get_serializer_class())
+
+    def compiled_rows(self, queryset, compiled: Compiled,
+                      representation: Representation):
+        '''Values of the rows of `queryset` which `compiled` represents'''
+        # The cursor is taken from the ordering fields of the rows
+        ordering = self.paginator.ordering
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        columns = dict.fromkeys(compiled.columns(representation) + [
+            field.lstrip('-') for field in ordering])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def list_queryset(self, queryset, compiled: Compiled = None) -> Response:
+        '''
+        Respond with the page of `queryset` asked by the request, with the
+        `compiled` representation if it's given
+        '''
+        compiled = compiled or self.get_compiled()
+        if compiled is None:
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        representation = get_representation(self.request)
+        page = self.paginate_queryset(
+            self.compiled_rows(queryset, compiled, representation))
+        with profiling.serializing(self.request):
+            data = compiled.represent(page, representation)
+        return self.get_paginated_response(data)
+
+
+class CompiledListMixin(CompiledPageMixin):
+    '''Viewset mixin listing with the precompiled representation'''
+    def list(self, request, *args, **kwargs):
+        if self.get_compiled() is None:
+            return super().list(request, *args, **kwargs)
+        return self.list_queryset(self.filter_queryset(self.get_queryset()))
@@ -1,13 +1,162 @@
 import sys
+from collections import namedtuple
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
+from core import feed, search
 from core.models import (
     Profile,
     Post,
+    Reaction,
     Comment,
 )
 
 
+Representation = namedtuple(
+    'Representation', ['summary', 'expand', 'viewer'], defaults=[None])
+
+# Names of the reactions of the viewer to a post
+REACTION_NAMES = {
+    Reaction.LIKE: 'like',
+    Reaction.DISLIKE: 'dislike',
+}
+
+
+def get_representation(request) -> Representation:
+    '''
+    Get the representation asked by the client.
+    The summary is asked with `?view=summary` or with the `view=summary`
+    parameter of the `Accept` header, e.g. `application/json; view=summary`.
+    Nested fields are kept in full with `?expand=likes,dislikes`.
+    The viewer is the id of the authenticated user, whose reactions and
+    follows are represented with the posts.
+    '''
+    if request is None:
+        return Representation(False, frozenset())
+    view = request.query_params.get('view')
+    if view is None:
+        media_type = getattr(request, 'accepted_media_type', None) or ''
+        params = dict(
+            param.strip().split('=', 1)
+            for param in media_type.split(';')[1:] if '=' in param)
+        view = params.get('view')
+    expand = request.query_params.get('expand', '')
+    user = getattr(request, 'user', None)
+    return Representation(
+        view == 'summary',
+        frozenset(name for name in expand.split(',') if name),
+        user.pk if user is not None and user.is_authenticated else None)
+
+
+def get_listing(request) -> dict:
+    '''
+    Get the validated parameters of a listing of posts or comments, see
+    `ListingSerializer`
+    '''
+    serializer = ListingSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+class SummaryMixin:
+    '''
+    Serializer mixin for the summary representation.
+    The fields returned by `get_summary_fields` replace the nested fields
+    when the summary is asked, unless the client expands them.
+    '''
+    def get_summary_fields(self) -> dict:
+        return {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        representation = get_representation(self.context.get('request'))
+        if representation.summary:
+            for name, field in self.get_summary_fields().items():
+                if name in fields and name not in representation.expand:
+                    fields[name] = field
+        return fields
+
+
+class ReactionsField(serializers.Field):
+    '''
+    Read only field for the profiles which reacted to a post with `kind`.
+    The profiles are taken from the reactions of the post, so prefetching
+    `Post.reactions` serializes a page of posts without extra queries.
+    They are serialized with `child`, or as ids when it's omitted.
+    '''
+    def __init__(self, kind: int, child=None, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.kind = kind
+        self.child = child
+        if child is not None:
+            child.bind(field_name='', parent=self)
+
+    def get_attribute(self, instance):
+        if not isinstance(instance, Post):
+            return super().get_attribute(instance)
+        reactions = [
+            reaction for reaction in instance.reactions.all()
+            if reaction.kind == self.kind
+        ]
+        if self.child is None:
+            return [reaction.profile_id for reaction in reactions]
+        return [reaction.profile for reaction in reactions]
+
+    def to_representation(self, value):
+        if self.child is None:
+            return value
+        return self.child.to_representation(value)
+
+
+class ViewerReactionField(serializers.Field):
+    '''
+    Read only field for the reaction of the viewer to a post, `like` or
+    `dislike`, null when it didn't react or isn't authenticated.
+    Prefetching it with `PostQuerySet.with_viewer` serializes a page of
+    posts without a query per post.
+    '''
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        viewer = get_representation(self.context.get('request')).viewer
+        if viewer is None:
+            return None
+        if hasattr(instance, 'viewer_reactions'):
+            reactions = instance.viewer_reactions
+        else:
+            reactions = instance.reactions.filter(profile__user=viewer)
+        for reaction in reactions:
+            return reaction.kind
+        return None
+
+    def to_representation(self, value):
+        return REACTION_NAMES[value]
+
+
+class ViewerFollowsField(serializers.BooleanField):
+    '''
+    Read only field for whether the viewer follows the author of a post,
+    false when it isn't authenticated.
+    Prefetching it with `PostQuerySet.with_viewer` serializes a page of
+    posts without a query per post.
+    '''
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        viewer = get_representation(self.context.get('request')).viewer
+        if viewer is None:
+            return False
+        if hasattr(instance.profile, 'viewer_follows'):
+            return bool(instance.profile.viewer_follows)
+        return instance.profile.following.filter(user=viewer).exists()
+
+
 class UserSerializer(serializers.ModelSerializer):
     '''User model serializer'''
     class Meta:
@@ -25,7 +174,16 @@ class FollowSerializer(serializers.ModelSerializer):
         fields = ['user']
 
 
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileStubSerializer(serializers.ModelSerializer):
+    '''Compact profile serializer used by the summary representation'''
+    username = serializers.CharField(source='user.username', read_only=True)
+
+    class Meta:
+        model = Profile
+        fields = ['id', 'username']
+
+
+class ProfileSerializer(SummaryMixin, serializers.ModelSerializer):
     '''Profile model serializer'''
     user = UserSerializer(read_only=True)
     follows = FollowSerializer(many=True, read_only=True)
@@ -33,52 +191,130 @@ class ProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Profile
-        fields = ['user', 'follows', 'following']
+        fields = [
+            'user', 'follows', 'following', 'follows_count', 'following_count']
+        read_only_fields = ['follows_count', 'following_count']
+
+    def get_summary_fields(self) -> dict:
+        return {
+            'follows': serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True),
+            'following': serializers.PrimaryKeyRelatedField(
+                many=True, read_only=True),
+        }
 
 
-class PostSerializer(serializers.ModelSerializer):
+class PostSerializer(SummaryMixin, serializers.ModelSerializer):
     '''Post model serializer'''
     profile = ProfileSerializer(read_only=True)
-    likes = ProfileSerializer(many=True, read_only=True)
-    dislikes = ProfileSerializer(many=True, read_only=True)
+    likes = ReactionsField(Reaction.LIKE, ProfileSerializer(many=True))
+    dislikes = ReactionsField(Reaction.DISLIKE, ProfileSerializer(many=True))
+    viewer_reaction = ViewerReactionField()
+    viewer_follows_author = ViewerFollowsField()
 
     class Meta:
         model = Post
-        fields = ['id', 'profile', 'post', 'likes', 'dislikes']
+        fields = [
+            'id', 'profile', 'post', 'likes', 'dislikes',
+            'like_count', 'dislike_count', 'comment_count', 'created_at',
+            'viewer_reaction', 'viewer_follows_author',
+        ]
+        read_only_fields = [
+            'like_count', 'dislike_count', 'comment_count', 'created_at']
+
+    def get_summary_fields(self) -> dict:
+        return {
+            'profile': ProfileStubSerializer(read_only=True),
+            'likes': ReactionsField(Reaction.LIKE),
+            'dislikes': ReactionsField(Reaction.DISLIKE),
+        }
 
     def create(self, validated_data):
-        return Post.objects.create(
-            profile=self.context['request'].user.profile,
-            post=validated_data['post'],
-        )
+        with transaction.atomic():
+            post = Post.objects.create(
+                profile=self.context['request'].user.profile,
+                post=validated_data['post'],
+            )
+            feed.publish(post)
+        return post
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SummaryMixin, serializers.ModelSerializer):
     '''Comment serializer'''
     profile = ProfileSerializer(read_only=True)
     post = PostSerializer(read_only=True)
+    post_id = serializers.PrimaryKeyRelatedField(
+        queryset=Post.objects.all(), source='post', write_only=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'profile', 'post', 'comment']
+        fields = ['id', 'profile', 'post', 'post_id', 'comment', 'created_at']
+        read_only_fields = ['created_at']
+
+    def get_summary_fields(self) -> dict:
+        return {
+            'profile': ProfileStubSerializer(read_only=True),
+            'post': serializers.PrimaryKeyRelatedField(read_only=True),
+        }
 
     def create(self, validated_data):
-        post_id = self.context['request'].data.get('post_id', None)
-        post = Post.objects.get(id=post_id)
         return Comment.objects.create(
             profile=self.context['request'].user.profile,
-            post=post,
+            post=validated_data['post'],
             comment=validated_data['comment']
         )
 
 
-class ProfileDetailSerializer(serializers.ModelSerializer):
-    '''Profile detail serializer'''
-    user = UserSerializer(read_only=True)
-    follows = FollowSerializer(many=True, read_only=True)
-    following = FollowSerializer(many=True, read_only=True)
-    posts = PostSerializer(many=True, read_only=True)
+class PostCommentSerializer(serializers.ModelSerializer):
+    '''
+    Serializer of the comments listed under their post, which is left out
+    '''
+    profile = ProfileStubSerializer(read_only=True)
 
     class Meta:
-        model = Profile
-        fields = ['user', 'follows', 'following', 'posts']
\ No newline at end of file
+        model = Comment
+        fields = ['id', 'profile', 'comment', 'created_at']
+        read_only_fields = ['created_at']
+
+
+class ProfileDetailSerializer(ProfileSerializer):
+    '''Profile detail serializer, represented as the nested profiles'''
+
+
+class BulkSerializer(serializers.Serializer):
+    '''Serializer of the ids targeted by a bulk action'''
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False)
+
+    def validate_ids(self, ids: list) -> list:
+        '''Cap the number of ids and drop the repeated ones'''
+        limit = getattr(settings, 'BULK_MAX_ITEMS', 100)
+        if len(ids) > limit:
+            raise serializers.ValidationError(
+                f'Ensure this field has no more than {limit} elements.')
+        return list(dict.fromkeys(ids))
+
+
+class SearchSerializer(serializers.Serializer):
+    '''Serializer of the parameters of a search'''
+    q = serializers.CharField(max_length=256)
+    type = serializers.ChoiceField(
+        choices=list(search.DOCUMENTS), required=False)
+
+
+class ListingSerializer(serializers.Serializer):
+    '''
+    Serializer of the parameters of a listing of posts or comments: the
+    rows created from `since` and before `until`, read from the archive
+    when `archived` is set
+    '''
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+    archived = serializers.BooleanField(default=False)
+
+    def validate(self, data: dict) -> dict:
+        if data.get('since') and data.get('until') and \
+                data['since'] >= data['until']:
+            raise serializers.ValidationError(
+                'Ensure since is before until.')
+        return data
@@ -0,0 +1,107 @@
+'''
+Streaming of whole listings.
+A listing asked with `?format=json-stream` or `?format=ndjson` (or the
+`Accept: application/x-ndjson` header) isn't paginated: the queryset is
+read with a server-side cursor `STREAM_CHUNK_SIZE` rows at a time, and
+every chunk is serialized and sent before the next one is read, so the
+memory used doesn't grow with the size of the listing.
+The status and headers are sent before the first chunk is read, so an
+error while streaming cuts the response short.
+Under ASGI, Django reads a synchronous streaming response whole before
+sending it, so the chunks are handed over as an asynchronous iterator,
+each read on the thread of the view.
+'''
+from itertools import islice
+from typing import AsyncIterator, Iterable, Iterator
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from api.renderers import FastJSONRenderer
+
+
+class JSONStreamRenderer(FastJSONRenderer):
+    '''Renderer of a listing as a JSON array, chunk by chunk'''
+    format = 'json-stream'
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterator[bytes]:
+        yield b'['
+        separator = b''
+        for chunk in chunks:
+            if chunk:
+                # Each chunk is encoded as an array, without its brackets
+                yield separator + self.render(chunk)[1:-1]
+                separator = b','
+        yield b']'
+
+
+class NDJSONRenderer(FastJSONRenderer):
+    '''Renderer of a listing as newline delimited JSON, chunk by chunk'''
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        '''Render responses which aren't streamed, e.g. errors, as a line'''
+        content = super().render(data, accepted_media_type, renderer_context)
+        return content + b'\n' if content else content
+
+    def render_stream(self, chunks: Iterable[list]) -> Iterator[bytes]:
+        for chunk in chunks:
+            yield b''.join(self.render(item) for item in chunk)
+
+
+STREAM_RENDERERS = (JSONStreamRenderer, NDJSONRenderer)
+
+# Returned by `next` once an iterator is exhausted
+DONE = object()
+
+
+async def iterate_async(parts: Iterator[bytes]) -> AsyncIterator[bytes]:
+    '''
+    Iterate over `parts` from the event loop one part at a time, on the
+    thread the view ran on, which holds its database connection
+    '''
+    read = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            part = await read(parts, DONE)
+            if part is DONE:
+                return
+            yield part
+    finally:
+        await sync_to_async(parts.close, thread_sensitive=True)()
+
+
+class StreamingListMixin:
+    '''
+    Viewset mixin streaming the whole listing of `list` when it's asked
+    with a streaming format, in the order of the paginated listing.
+    '''
+    def get_renderers(self):
+        return super().get_renderers() + [
+            renderer() for renderer in STREAM_RENDERERS]
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, STREAM_RENDERERS):
+            return super().list(request, *args, **kwargs)
+        ordering = getattr(self.paginator, 'ordering', '-id')
+        if isinstance(ordering, str):
+            ordering = [ordering]
+        queryset = self.filter_queryset(
+            self.get_queryset()).order_by(*ordering)
+        content = renderer.render_stream(self.serialize_chunks(queryset))
+        if isinstance(request._request, ASGIRequest):
+            content = iterate_async(content)
+        return StreamingHttpResponse(
+            content, content_type=renderer.media_type)
+
+    def serialize_chunks(self, queryset) -> Iterator[list]:
+        '''Serialize the rows of `queryset` one chunk at a time'''
+        size = getattr(settings, 'STREAM_CHUNK_SIZE', 500)
+        rows = queryset.iterator(chunk_size=size)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield self.get_serializer(chunk, many=True).data
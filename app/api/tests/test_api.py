@@ -3,15 +3,28 @@ Tests for API include
 1. Profile
     a. Follow/Unfollow profile
     b. Get profile details
+    c. Bulk follow/unfollow profiles
+    d. Mutuals, suggestions and relationships of a profile
 2. Post
     a. Create/Delete post
     b. Like/Dislike post
     c. Comment on post
     d. View post by id
     e. Return all posts of a user
+    f. Bulk like/dislike posts
+    g. List posts and comments newest first within a time range
+    h. Reaction of the viewer to posts and follow of their authors
+3. Feed
+    a. Posts of followed profiles
+    b. Fan-outs, backfills and prunes queued as jobs
+4. Search
+    a. Ranked and paginated posts and comments
 '''
+import datetime
 from typing import Type
-from django.test import TestCase
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser
@@ -22,7 +35,8 @@ from api.serializers import (
     ProfileDetailSerializer,
     PostSerializer,
 )
-from core.models import Post, Profile
+from core import jobs, search
+from core.models import Comment, Job, Post, Profile, Reaction
 
 
 def create_user(**kwargs) -> Type[AbstractBaseUser]:
@@ -68,6 +82,10 @@ class ProfileApiTests(TestCase):
         self.assertEqual(
             user_serializer.data['follows'][0]['user'],
             dummy_serializer.data['user'])
+        self.user.profile.refresh_from_db()
+        dummy_user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.follows_count, 1)
+        self.assertEqual(dummy_user.profile.following_count, 1)
 
     def test_follow_invalid_profile(self) -> None:
         '''Testing trying to follow invalid profile raises a 404 error'''
@@ -99,6 +117,115 @@ class ProfileApiTests(TestCase):
         res = self.client.post(url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_bulk_follow(self) -> None:
+        '''Test for following many profiles at once'''
+        followed, new = [create_user(username=f'test_{i}') for i in range(2)]
+        self.user.profile.follows.add(followed.profile)
+        url = reverse('api:profile-bulk-follow')
+        ids = [new.profile.id, followed.profile.id, 666, new.profile.id]
+        res = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': new.profile.id, 'status': 'followed'},
+            {'id': followed.profile.id, 'status': 'already_following'},
+            {'id': 666, 'status': 'not_found'},
+        ])
+        self.assertEqual(
+            set(self.user.profile.follows.all()),
+            {followed.profile, new.profile})
+        self.user.profile.refresh_from_db()
+        new.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.follows_count, 2)
+        self.assertEqual(new.profile.following_count, 1)
+
+    def test_bulk_follow_queries(self) -> None:
+        '''Test that bulk following doesn't query once per profile'''
+        url = reverse('api:profile-bulk-follow')
+        for size in (2, 6):
+            ids = [
+                create_user(username=f'test_{size}_{i}').profile.id
+                for i in range(size)
+            ]
+            with self.assertNumQueries(13):
+                res = self.client.post(url, {'ids': ids}, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(BULK_MAX_ITEMS=2)
+    def test_bulk_follow_cap(self) -> None:
+        '''Test that bulk actions reject too many ids'''
+        url = reverse('api:profile-bulk-follow')
+        res = self.client.post(url, {'ids': [1, 2, 3]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(url, {'ids': []}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_unfollow(self) -> None:
+        '''Test for unfollowing many profiles at once'''
+        followed = [create_user(username=f'test_{i}') for i in range(2)]
+        for user in followed:
+            self.user.profile.follows.add(user.profile)
+        url = reverse('api:profile-bulk-unfollow')
+        ids = [followed[0].profile.id, 666]
+        res = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': followed[0].profile.id, 'status': 'unfollowed'},
+            {'id': 666, 'status': 'not_following'},
+        ])
+        self.assertEqual(
+            list(self.user.profile.follows.all()), [followed[1].profile])
+        self.user.profile.refresh_from_db()
+        followed[0].profile.refresh_from_db()
+        self.assertEqual(self.user.profile.follows_count, 1)
+        self.assertEqual(followed[0].profile.following_count, 0)
+
+    def test_mutuals(self) -> None:
+        '''Test for listing the profiles following a profile back'''
+        mutual, follower = [
+            create_user(username=f'test_{i}').profile for i in range(2)]
+        self.user.profile.follows.add(mutual)
+        mutual.follows.add(self.user.profile)
+        follower.follows.add(self.user.profile)
+        url = reverse('api:profile-mutuals', args=[self.user.profile.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'], [{'id': mutual.id, 'username': 'test_0'}])
+
+    def test_suggestions(self) -> None:
+        '''Test for suggesting profiles followed by the follows'''
+        a, b, c, d = [
+            create_user(username=f'test_{i}').profile for i in range(4)]
+        self.user.profile.follows.add(a, b)
+        a.follows.add(c, d)
+        b.follows.add(d)
+        url = reverse('api:profile-suggestions', args=[self.user.profile.id])
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': d.id, 'username': 'test_3', 'overlap': 2},
+            {'id': c.id, 'username': 'test_2', 'overlap': 1},
+        ])
+        res = self.client.get(url, {'page_size': 1})
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_relationships(self) -> None:
+        '''Test for checking the follows of a profile in bulk'''
+        followed, follower = [
+            create_user(username=f'test_{i}').profile for i in range(2)]
+        self.user.profile.follows.add(followed)
+        follower.follows.add(self.user.profile)
+        url = reverse(
+            'api:profile-relationships', args=[self.user.profile.id])
+        res = self.client.get(url, {'ids': f'{followed.id},{follower.id}'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': followed.id, 'follows': True, 'followed_by': False},
+            {'id': follower.id, 'follows': False, 'followed_by': True},
+        ])
+        res = self.client.get(url, {'ids': 'a,b'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_profile_detail(self) -> None:
         '''Test for getting details of a profile'''
         dummy_user = create_user(username='dummy')
@@ -183,6 +310,111 @@ class PostApiTests(TestCase):
         self.assertEqual(comment.post.id, payload['post_id'])
         self.assertEqual(comment.profile, self.user.profile)
 
+    def test_comment_missing_post(self) -> None:
+        '''Test that comments on missing posts are rejected'''
+        url = reverse('api:comment-list')
+        for payload in ({'comment': 'Sample Comment'},
+                        {'comment': 'Sample Comment', 'post_id': 0},
+                        {'comment': 'Sample Comment', 'post_id': 'post'}):
+            with self.subTest(payload=payload):
+                res = self.client.post(url, payload)
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn('post_id', res.data)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_comment_post_comments(self) -> None:
+        '''Test for commenting on a post through its comments'''
+        post = create_post(profile=self.user.profile)
+        url = reverse('api:post-comments', args=[post.id])
+        res = self.client.post(url, {'comment': 'Sample Comment'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        comment = post.comments.get()
+        self.assertEqual(res.data['id'], comment.id)
+        self.assertEqual(res.data['profile']['id'], self.user.profile.id)
+        self.assertNotIn('post', res.data)
+        self.assertEqual(comment.profile, self.user.profile)
+        res = self.client.post(
+            reverse('api:post-comments', args=[0]),
+            {'comment': 'Sample Comment'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_post_comments(self) -> None:
+        '''Test for listing the comments of a post newest first'''
+        post = create_post(profile=self.user.profile)
+        other = create_post(profile=self.user.profile)
+        comments = [
+            Comment.objects.create(
+                profile=self.user.profile, post=post, comment=f'Comment {i}',
+                created_at=timezone.now() - datetime.timedelta(hours=i))
+            for i in range(3)
+        ]
+        Comment.objects.create(
+            profile=self.user.profile, post=other, comment='Other')
+        url = reverse('api:post-comments', args=[post.id])
+        res = self.client.get(url, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [comment['id'] for comment in res.data['results']],
+            [comments[0].id, comments[1].id])
+        self.assertEqual(res.data['results'][0], {
+            'id': comments[0].id,
+            'profile': {
+                'id': self.user.profile.id,
+                'username': self.user.username,
+            },
+            'comment': 'Comment 0',
+            'created_at': res.data['results'][0]['created_at'],
+        })
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [comment['id'] for comment in res.data['results']],
+            [comments[2].id])
+        res = self.client.get(reverse('api:post-comments', args=[0]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_viewer_state(self) -> None:
+        '''Test for the reaction and follows of the viewer in posts'''
+        followed = create_user(username='test_1')
+        other = create_user(username='test_2')
+        self.user.profile.follows.add(followed.profile)
+        liked = create_post(profile=followed.profile)
+        disliked = create_post(profile=other.profile)
+        untouched = create_post(profile=followed.profile)
+        Reaction.objects.react(liked, self.user.profile, Reaction.LIKE)
+        Reaction.objects.react(disliked, self.user.profile, Reaction.DISLIKE)
+        Reaction.objects.react(untouched, other.profile, Reaction.LIKE)
+        Comment.objects.create(
+            profile=other.profile, post=liked, comment='Sample Comment')
+        expected = {
+            liked.id: ('like', True),
+            disliked.id: ('dislike', False),
+            untouched.id: (None, True),
+        }
+
+        def viewer_state(post: dict) -> tuple:
+            return post['viewer_reaction'], post['viewer_follows_author']
+
+        for params in ({}, {'view': 'summary'}):
+            for compiled in (True, False):
+                with self.subTest(params=params, compiled=compiled), \
+                        override_settings(COMPILED_REPRESENTATIONS=compiled):
+                    res = self.client.get(reverse('api:post-list'), params)
+                    self.assertEqual(
+                        {post['id']: viewer_state(post)
+                         for post in res.data['results']}, expected)
+        for post in (liked, disliked, untouched):
+            res = self.client.get(reverse('api:post-detail', args=[post.id]))
+            self.assertEqual(viewer_state(res.data), expected[post.id])
+        res = self.client.get(reverse('api:comment-list'))
+        self.assertEqual(
+            viewer_state(res.data['results'][0]['post']), expected[liked.id])
+        self.client.force_authenticate(None)
+        res = self.client.get(reverse('api:post-list'))
+        self.assertEqual(
+            [viewer_state(post) for post in res.data['results']],
+            [(None, False)] * 3)
+
     def test_like_post(self) -> None:
         '''Test for liking a post'''
         user = create_user(username='test_1')
@@ -205,6 +437,60 @@ class PostApiTests(TestCase):
         self.assertEqual(dislike_count, 1)
         self.assertIn(self.user.profile, post.dislikes.all())
 
+    def test_bulk_like(self) -> None:
+        '''Test for liking many posts at once'''
+        user = create_user(username='test_1')
+        liked, disliked, new = [
+            create_post(profile=user.profile) for _ in range(3)]
+        Reaction.objects.react(liked, self.user.profile, Reaction.LIKE)
+        Reaction.objects.react(disliked, self.user.profile, Reaction.DISLIKE)
+        url = reverse('api:post-bulk-like')
+        ids = [liked.id, disliked.id, new.id, 666]
+        res = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            {'id': liked.id, 'status': 'unchanged'},
+            {'id': disliked.id, 'status': 'changed'},
+            {'id': new.id, 'status': 'changed'},
+            {'id': 666, 'status': 'not_found'},
+        ])
+        for post in (liked, disliked, new):
+            post.refresh_from_db()
+            self.assertEqual(list(post.likes), [self.user.profile])
+            self.assertEqual(post.like_count, 1)
+            self.assertEqual(post.dislike_count, 0)
+
+    def test_bulk_dislike(self) -> None:
+        '''Test for disliking many posts at once'''
+        user = create_user(username='test_1')
+        posts = [create_post(profile=user.profile) for _ in range(2)]
+        url = reverse('api:post-bulk-dislike')
+        res = self.client.post(
+            url, {'ids': [post.id for post in posts]}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(list(post.dislikes), [self.user.profile])
+            self.assertEqual(post.dislike_count, 1)
+
+    def test_post_counts(self) -> None:
+        '''Test for the like, dislike and comment counts of a post'''
+        user = create_user(username='test_1')
+        post = create_post(profile=user.profile)
+        self.client.post(reverse('api:post-like', args=[post.id]))
+        self.client.post(
+            reverse('api:comment-list'),
+            {'comment': 'Sample Comment', 'post_id': post.id})
+        res = self.client.get(reverse('api:post-detail', args=[post.id]))
+        self.assertEqual(res.data['like_count'], 1)
+        self.assertEqual(res.data['dislike_count'], 0)
+        self.assertEqual(res.data['comment_count'], 1)
+
+        self.client.post(reverse('api:post-dislike', args=[post.id]))
+        res = self.client.get(reverse('api:post-detail', args=[post.id]))
+        self.assertEqual(res.data['like_count'], 0)
+        self.assertEqual(res.data['dislike_count'], 1)
+
     def test_get_post_by_id(self) -> None:
         '''Test for view post details by id of post'''
         post = create_post(profile=self.user.profile)
@@ -224,5 +510,383 @@ class PostApiTests(TestCase):
         url = reverse('api:post-list')
         res = self.client.get(url, {'profile': self.user.profile.id})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        posts_serializer = PostSerializer(res.data, many=True)
-        self.assertEqual(len(posts_serializer.data), 2)
\ No newline at end of file
+        posts_serializer = PostSerializer(res.data['results'], many=True)
+        self.assertEqual(len(posts_serializer.data), 2)
+
+    def test_posts_are_paginated(self) -> None:
+        '''Test for walking through the posts page by page'''
+        posts = [create_post(profile=self.user.profile) for _ in range(5)]
+        url = reverse('api:post-list')
+        res = self.client.get(url, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [post['id'] for post in res.data['results']]
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            self.assertLessEqual(len(res.data['results']), 2)
+            ids += [post['id'] for post in res.data['results']]
+        self.assertEqual(ids, [post.id for post in reversed(posts)])
+
+    def test_profile_posts(self) -> None:
+        '''Test for listing the posts of a profile page by page'''
+        other_user = create_user(username='test_1')
+        create_post(profile=other_user.profile)
+        posts = [create_post(profile=self.user.profile) for _ in range(3)]
+        url = reverse('api:profile-posts', args=[self.user.profile.id])
+        res = self.client.get(url, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [post['id'] for post in res.data['results']],
+            [posts[2].id, posts[1].id])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [post['id'] for post in res.data['results']], [posts[0].id])
+        self.assertIsNone(res.data['next'])
+
+    def test_posts_newest_first(self) -> None:
+        '''Test for listing posts by creation time, then by id'''
+        now = timezone.now()
+        posts = [create_post(profile=self.user.profile) for _ in range(4)]
+        for post, minutes in zip(posts, [3, 1, 2, 1]):
+            post.created_at = now - datetime.timedelta(minutes=minutes)
+            post.save()
+        url = reverse('api:post-list')
+        res = self.client.get(url, {'page_size': 2})
+        ids = [post['id'] for post in res.data['results']]
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            ids += [post['id'] for post in res.data['results']]
+        self.assertEqual(
+            ids, [posts[3].id, posts[1].id, posts[2].id, posts[0].id])
+
+    def test_posts_time_range(self) -> None:
+        '''Test for listing the posts created within a time range'''
+        now = timezone.now()
+        posts = [create_post(profile=self.user.profile) for _ in range(3)]
+        for days, post in enumerate(reversed(posts)):
+            post.created_at = now - datetime.timedelta(days=days)
+            post.save()
+        url = reverse('api:post-list')
+        res = self.client.get(url, {
+            'since': (now - datetime.timedelta(days=1)).isoformat(),
+            'until': now.isoformat(),
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [post['id'] for post in res.data['results']], [posts[1].id])
+        res = self.client.get(url, {
+            'since': (now - datetime.timedelta(days=1)).isoformat()})
+        self.assertEqual(
+            [post['id'] for post in res.data['results']],
+            [posts[2].id, posts[1].id])
+
+    def test_comments_time_range(self) -> None:
+        '''Test for listing the comments created within a time range'''
+        post = create_post(profile=self.user.profile)
+        old = Comment.objects.create(
+            profile=self.user.profile, post=post, comment='Old',
+            created_at=timezone.now() - datetime.timedelta(days=2))
+        new = Comment.objects.create(
+            profile=self.user.profile, post=post, comment='New')
+        url = reverse('api:comment-list')
+        res = self.client.get(url)
+        self.assertEqual(
+            [comment['id'] for comment in res.data['results']],
+            [new.id, old.id])
+        until = timezone.now() - datetime.timedelta(days=1)
+        res = self.client.get(url, {'until': until.isoformat()})
+        self.assertEqual(
+            [comment['id'] for comment in res.data['results']], [old.id])
+
+    def test_list_posts_created_together(self) -> None:
+        '''Test for paging both ways through posts created together'''
+        created_at = timezone.now()
+        Post.objects.bulk_create(
+            Post(profile=self.user.profile, post='Sample Post',
+                 created_at=created_at)
+            for _ in range(1300))
+        ids = list(Post.objects.order_by('-id').values_list('id', flat=True))
+        res = self.client.get(reverse('api:post-list'), {'page_size': 100})
+        pages = [res.data['results']]
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            pages.append(res.data['results'])
+        self.assertEqual(
+            [post['id'] for page in pages for post in page], ids)
+        back = []
+        while res.data['previous'] is not None:
+            res = self.client.get(res.data['previous'])
+            back = res.data['results'] + back
+        self.assertEqual(
+            [post['id'] for post in back], ids[:-len(pages[-1])])
+
+    def test_invalid_cursor(self) -> None:
+        '''Test for rejecting cursors which aren't a position'''
+        res = self.client.get(reverse('api:post-list'), {'cursor': 'cD0x'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_time_range(self) -> None:
+        '''Test for rejecting invalid time ranges'''
+        url = reverse('api:post-list')
+        now = timezone.now().isoformat()
+        for params in ({'since': 'yesterday'}, {'since': now, 'until': now}):
+            with self.subTest(params=params):
+                res = self.client.get(url, params)
+                self.assertEqual(
+                    res.status_code, status.HTTP_400_BAD_REQUEST)
+
+class SummaryApiTests(TestCase):
+    '''Tests for the summary representation'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.other_user = create_user(username='test_1')
+        self.client.force_authenticate(self.user)
+        self.user.profile.follows.add(self.other_user.profile)
+        self.post = create_post(profile=self.other_user.profile)
+        Reaction.objects.react(self.post, self.user.profile, Reaction.LIKE)
+
+    def test_post_summary(self) -> None:
+        '''Test for getting a post with ids instead of nested profiles'''
+        url = reverse('api:post-detail', args=[self.post.id])
+        res = self.client.get(url, {'view': 'summary'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['profile'], {
+            'id': self.other_user.profile.id,
+            'username': self.other_user.username,
+        })
+        self.assertEqual(res.data['likes'], [self.user.profile.id])
+        self.assertEqual(res.data['dislikes'], [])
+        self.assertEqual(res.data['like_count'], 1)
+
+    def test_summary_from_accept_header(self) -> None:
+        '''Test for asking the summary with the `Accept` header'''
+        url = reverse('api:post-detail', args=[self.post.id])
+        res = self.client.get(
+            url, HTTP_ACCEPT='application/json; view=summary')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['likes'], [self.user.profile.id])
+
+    def test_expand_summary(self) -> None:
+        '''Test for expanding a nested field of the summary'''
+        url = reverse('api:post-detail', args=[self.post.id])
+        res = self.client.get(url, {'view': 'summary', 'expand': 'likes'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['likes'][0]['user']['username'], self.user.username)
+        self.assertEqual(
+            res.data['likes'][0]['follows'], [self.other_user.profile.id])
+        self.assertEqual(res.data['profile']['username'],
+                         self.other_user.username)
+
+    def test_profile_summary(self) -> None:
+        '''Test for getting a profile with ids of its follow lists'''
+        url = reverse('api:profile-detail', args=[self.user.profile.id])
+        res = self.client.get(url, {'view': 'summary'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['follows'], [self.other_user.profile.id])
+        self.assertEqual(res.data['following'], [])
+        self.assertEqual(res.data['user']['username'], self.user.username)
+
+    def test_comment_summary(self) -> None:
+        '''Test for listing comments with the id of their post'''
+        self.client.post(
+            reverse('api:comment-list'),
+            {'comment': 'Sample Comment', 'post_id': self.post.id})
+        res = self.client.get(reverse('api:comment-list'), {'view': 'summary'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['post'], self.post.id)
+        self.assertEqual(
+            res.data['results'][0]['profile']['username'], self.user.username)
+
+
+class FeedApiTests(TestCase):
+    '''Tests for feed API'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.followee = create_user(username='test_1')
+        self.client.post(
+            reverse('api:profile-follow', args=[self.followee.profile.id]))
+
+    def create_post(self, user) -> int:
+        '''Helper method for creating a post through the API'''
+        user.profile.refresh_from_db()
+        self.client.force_authenticate(user)
+        res = self.client.post(reverse('api:post-list'), {'post': 'Post'})
+        self.client.force_authenticate(self.user)
+        return res.data['id']
+
+    def feed_ids(self) -> list:
+        '''Helper method for getting the post ids of the feed'''
+        res = self.client.get(reverse('api:feed-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in res.data['results']]
+
+    def test_feed(self) -> None:
+        '''Test for getting own posts and posts of followed profiles'''
+        stranger = create_user(username='test_2')
+        followee_post = self.create_post(self.followee)
+        own_post = self.create_post(self.user)
+        self.create_post(stranger)
+        self.assertEqual(self.feed_ids(), [own_post, followee_post])
+
+    def test_follow_backfills_feed(self) -> None:
+        '''Test for getting earlier posts of a newly followed profile'''
+        other = create_user(username='test_2')
+        post = self.create_post(other)
+        self.assertEqual(self.feed_ids(), [])
+        self.client.post(
+            reverse('api:profile-follow', args=[other.profile.id]))
+        self.assertEqual(self.feed_ids(), [post])
+
+    def test_bulk_follow_backfills_feed(self) -> None:
+        '''Test for getting earlier posts of profiles followed at once'''
+        others = [create_user(username=f'test_{i}') for i in range(2, 4)]
+        posts = [self.create_post(other) for other in others]
+        self.client.post(
+            reverse('api:profile-bulk-follow'),
+            {'ids': [other.profile.id for other in others]}, format='json')
+        self.assertEqual(self.feed_ids(), posts[::-1])
+        self.client.post(
+            reverse('api:profile-bulk-unfollow'),
+            {'ids': [others[0].profile.id]}, format='json')
+        self.assertEqual(self.feed_ids(), [posts[1]])
+
+    def test_unfollow_prunes_feed(self) -> None:
+        '''Test for removing posts of an unfollowed profile from the feed'''
+        self.create_post(self.followee)
+        self.client.post(
+            reverse('api:profile-unfollow', args=[self.followee.profile.id]))
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_feed(self) -> None:
+        '''Test for reading posts of profiles with many followers'''
+        post = self.create_post(self.followee)
+        own_post = self.create_post(self.user)
+        self.assertFalse(
+            self.user.profile.timeline.filter(post_id=post).exists())
+        self.assertEqual(self.feed_ids(), [own_post, post])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_queued_fan_out(self) -> None:
+        '''Test that posts reach the followers once their job is run'''
+        post = self.create_post(self.followee)
+        self.assertEqual(self.feed_ids(), [])
+        own_post = self.create_post(self.user)
+        self.assertEqual(self.feed_ids(), [own_post])
+        jobs.work()
+        self.assertEqual(self.feed_ids(), [own_post, post])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_queued_follow_toggles(self) -> None:
+        '''Test that following and unfollowing again leaves one job'''
+        other = create_user(username='test_2')
+        post = self.create_post(other)
+        jobs.work()
+        for action in ('follow', 'unfollow', 'follow'):
+            self.client.post(
+                reverse(f'api:profile-{action}', args=[other.profile.id]))
+        self.assertEqual(Job.objects.count(), 1)
+        jobs.work()
+        self.assertEqual(self.feed_ids(), [post])
+        self.client.post(
+            reverse('api:profile-unfollow', args=[other.profile.id]))
+        jobs.work()
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(JOBS_EAGER=False)
+    def test_write_rolled_back_without_job(self) -> None:
+        '''Test that follows and posts aren't kept when their job fails'''
+        other = create_user(username='test_2')
+        with mock.patch.object(
+                jobs, 'enqueue', side_effect=RuntimeError('No queue')):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    reverse('api:profile-follow', args=[other.profile.id]))
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse(
+                    'api:profile-unfollow', args=[self.followee.profile.id]))
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('api:post-list'), {'post': 'Post'})
+        self.assertEqual(
+            list(self.user.profile.follows.all()), [self.followee.profile])
+        self.assertFalse(Post.objects.exists())
+
+    def test_feed_requires_authentication(self) -> None:
+        '''Test that anonymous users have no feed'''
+        self.client.force_authenticate(None)
+        res = self.client.get(reverse('api:feed-list'))
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SearchApiTests(TestCase):
+    '''Tests for search API'''
+    def setUp(self) -> None:
+        search.index.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        profile = self.user.profile
+        self.posts = [
+            Post.objects.create(profile=profile, post=f'Python post {i}')
+            for i in range(3)
+        ]
+        self.comment = Comment.objects.create(
+            profile=profile, post=self.posts[0], comment='Python comment')
+        Post.objects.create(profile=profile, post='Rust post')
+
+    def search(self, **params) -> list:
+        '''Helper method for getting the type and id of the results'''
+        res = self.client.get(reverse('api:search-list'), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [(item['type'], item['id']) for item in res.data['results']]
+
+    def test_search(self) -> None:
+        '''Test for searching posts and comments'''
+        res = self.client.get(reverse('api:search-list'), {'q': 'python'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 4)
+        self.assertCountEqual(
+            [(item['type'], item['id']) for item in res.data['results']],
+            [('post', post.id) for post in self.posts] +
+            [('comment', self.comment.id)])
+        post = next(
+            item for item in res.data['results'] if item['type'] == 'post')
+        self.assertEqual(
+            post['post'], Post.objects.get(id=post['id']).post)
+        self.assertIn('rank', post)
+
+    def test_search_type(self) -> None:
+        '''Test for searching only posts or only comments'''
+        self.assertEqual(
+            self.search(q='python', type='comment'),
+            [('comment', self.comment.id)])
+        self.assertEqual(
+            self.search(q='post', type='post', view='summary'),
+            [('post', post.id) for post in Post.objects.order_by('-id')])
+
+    def test_search_paginated(self) -> None:
+        '''Test for paging through the results'''
+        first = self.client.get(
+            reverse('api:search-list'), {'q': 'python', 'page_size': 3})
+        self.assertEqual(len(first.data['results']), 3)
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(second.data['results']), 1)
+        self.assertIsNone(second.data['next'])
+
+    def test_search_deleted(self) -> None:
+        '''Test that deleted posts and their comments aren't found'''
+        self.posts[0].delete()
+        self.assertCountEqual(
+            self.search(q='python'),
+            [('post', post.id) for post in self.posts[1:]])
+
+    def test_search_invalid(self) -> None:
+        '''Test for searching without a query or with an unknown type'''
+        url = reverse('api:search-list')
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(url, {'q': 'python', 'type': 'profile'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,189 @@
+'''
+Tests for reading archived posts and comments through the API
+'''
+import datetime
+import json
+from typing import Type
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import archive
+from core.models import (
+    Post,
+    Reaction,
+    Comment,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+@override_settings(ARCHIVE_AFTER_DAYS=30)
+class ArchiveApiTests(TestCase):
+    '''Tests for the fallback reads of the archive'''
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.other = create_user(username='test_1')
+        self.user.profile.follows.add(self.other.profile)
+        now = timezone.now()
+        self.posts = []
+        for days in (40, 35, 1, 0):
+            post = Post.objects.create(
+                profile=self.user.profile, post=f'{days} days old',
+                created_at=now - datetime.timedelta(days=days))
+            Reaction.objects.react(post, self.other.profile, Reaction.LIKE)
+            Comment.objects.create(
+                profile=self.other.profile, post=post, comment='Comment',
+                created_at=post.created_at)
+            self.posts.append(post)
+        self.old, self.older = self.posts[1], self.posts[0]
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def walk(self, url: str, **params) -> list:
+        '''Helper method for getting every item of a listing page by page'''
+        res = self.client.get(url, {'page_size': 1, **params})
+        items = res.data['results']
+        while res.data['next'] is not None:
+            res = self.client.get(res.data['next'])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            items += res.data['results']
+        return items
+
+    def test_retrieve_archived_post(self) -> None:
+        '''Test that archived posts are retrieved as they were'''
+        url = reverse('api:post-detail', args=[self.old.id])
+        views = ({}, {'view': 'summary'})
+        before = [self.client.get(url, params).data for params in views]
+        archive.archive(30)
+        for params, data in zip(views, before):
+            with self.subTest(params=params):
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(json.loads(res.content), data)
+
+    def test_retrieve_archived_post_as_viewer(self) -> None:
+        '''Test that archived posts keep the reaction of the viewer'''
+        self.client.force_authenticate(self.other)
+        url = reverse('api:post-detail', args=[self.old.id])
+        before = self.client.get(url).data
+        self.assertEqual(before['viewer_reaction'], 'like')
+        archive.archive(30)
+        res = self.client.get(url)
+        self.assertEqual(json.loads(res.content), json.loads(
+            json.dumps(before)))
+
+    def test_retrieve_missing_post(self) -> None:
+        '''Test that posts neither hot nor archived aren't found'''
+        archive.archive(30)
+        res = self.client.get(reverse('api:post-detail', args=[0]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_post_comments(self) -> None:
+        '''Test that the comments of archived posts are listed'''
+        url = reverse('api:post-comments', args=[self.old.id])
+        before = self.client.get(url).data
+        archive.archive(30)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(res.content), json.loads(
+            json.dumps(before)))
+        with override_settings(ARCHIVE_AFTER_DAYS=None):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_posts(self) -> None:
+        '''Test that the listing of posts goes on into the archive'''
+        url = reverse('api:post-list')
+        before = self.walk(url)
+        archive.archive(30)
+        after = self.walk(url)
+        self.assertEqual(
+            [post['id'] for post in after],
+            [post.id for post in reversed(self.posts)])
+        self.assertEqual(json.loads(json.dumps(after)), before)
+
+    def test_list_comments(self) -> None:
+        '''Test that the listing of comments goes on into the archive'''
+        url = reverse('api:comment-list')
+        before = self.walk(url)
+        archive.archive(30)
+        self.assertEqual(
+            json.loads(json.dumps(self.walk(url))), before)
+
+    def test_list_kept_post_in_order(self) -> None:
+        '''Test listing a post kept hot by a comment among archived ones'''
+        Comment.objects.create(
+            profile=self.other.profile, post=self.older, comment='Comment')
+        post_url = reverse('api:post-list')
+        comment_url = reverse('api:comment-list')
+        posts, comments = self.walk(post_url), self.walk(comment_url)
+        archive.archive(30)
+        self.assertTrue(Post.objects.filter(pk=self.older.pk).exists())
+        self.assertFalse(Post.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(
+            [post['id'] for post in self.walk(post_url)],
+            [post.id for post in reversed(self.posts)])
+        self.assertEqual(json.loads(json.dumps(self.walk(post_url))), posts)
+        self.assertEqual(
+            json.loads(json.dumps(self.walk(comment_url))), comments)
+        res = self.client.get(post_url, {'format': 'ndjson'})
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.id for post in reversed(self.posts)])
+
+    def test_list_time_range(self) -> None:
+        '''Test that time ranges of archived rows are read from the archive'''
+        archive.archive(30)
+        until = (timezone.now() - datetime.timedelta(days=30)).isoformat()
+        for name in ('api:post-list', 'api:comment-list'):
+            with self.subTest(name=name):
+                res = self.client.get(reverse(name), {'until': until})
+                self.assertEqual(len(res.data['results']), 2)
+        res = self.client.get(reverse('api:post-list'), {
+            'until': until, 'profile': self.other.profile.id})
+        self.assertEqual(res.data['results'], [])
+
+    def test_list_archived(self) -> None:
+        '''Test for listing only the archived rows'''
+        archive.archive(30)
+        res = self.client.get(reverse('api:post-list'), {'archived': 'true'})
+        self.assertEqual(
+            [post['id'] for post in res.data['results']],
+            [self.old.id, self.older.id])
+
+    def test_stream_posts(self) -> None:
+        '''Test that streamed listings go on into the archive'''
+        archive.archive(30)
+        res = self.client.get(reverse('api:post-list'), {'format': 'ndjson'})
+        lines = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.id for post in reversed(self.posts)])
+
+    @override_settings(ARCHIVE_AFTER_DAYS=None)
+    def test_archive_disabled(self) -> None:
+        '''Test that archived rows aren't read when archiving is off'''
+        archive.archive(30)
+        res = self.client.get(reverse('api:post-detail', args=[self.old.id]))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(len(self.walk(reverse('api:post-list'))), 2)
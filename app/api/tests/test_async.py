@@ -0,0 +1,211 @@
+'''
+Tests for the async read paths.
+Their nested lookups run on worker threads with their own connections,
+which only see committed rows, hence the transaction test case.
+'''
+import json
+from typing import Type
+from asgiref.sync import sync_to_async
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from core import feed
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+    Comment,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def create_graph(profile: Profile, size: int) -> None:
+    '''
+    Helper function for creating `size` posts of `profile`, each of them
+    liked, disliked and commented by `size` profiles which follow
+    each other
+    '''
+    start = Profile.objects.count()
+    profiles = [
+        create_user(username=f'user_{start + i}').profile
+        for i in range(size)
+    ]
+    for i, other in enumerate(profiles):
+        other.follows.add(profile, *profiles[:i])
+    for _ in range(size):
+        post = Post.objects.create(profile=profile, post='Sample Post')
+        feed.fan_out(post)
+        for i, other in enumerate(profiles):
+            kind = Reaction.LIKE if i < size // 2 else Reaction.DISLIKE
+            Reaction.objects.react(post, other, kind)
+        for other in profiles:
+            Comment.objects.create(
+                profile=other, post=post, comment='Sample Comment')
+
+
+def normalize(data):
+    '''
+    Helper function for making responses comparable: the related profiles
+    are listed in no particular order, and links point to the sync views
+    '''
+    if isinstance(data, dict):
+        return {
+            key: sorted(map(normalize, value), key=json.dumps)
+            if key in ('follows', 'following', 'likes', 'dislikes')
+            else normalize(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [normalize(value) for value in data]
+    if isinstance(data, str):
+        return data.replace('/api/async/', '/api/')
+    return data
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+class AsyncViewTests(TransactionTestCase):
+    '''Tests for the async views returning what the viewsets return'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        create_graph(self.user.profile, 4)
+
+    async def assertSameResponse(self, name: str, args=(), headers=None,
+                                 **params) -> None:
+        '''Assert that the async `name` view responds as the viewset'''
+        url = reverse(f'api:async-{name}', args=args)
+        res = await self.async_client.get(url, params, headers=headers)
+        expected = await self.get(
+            reverse(f'api:{name}', args=args), params, headers=headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(
+            normalize(json.loads(res.content)),
+            normalize(json.loads(expected.content)))
+
+    async def get(self, url: str, params: dict, **extra):
+        '''Request a viewset from the async tests'''
+        return await sync_to_async(self.client.get)(url, params, **extra)
+
+    async def authenticate(self, username: str) -> dict:
+        '''Get the headers authenticating the user `username`'''
+        token = await Token.objects.acreate(
+            user=await get_user_model().objects.aget(username=username))
+        return {'Authorization': f'Token {token.key}'}
+
+    async def test_profile_detail(self) -> None:
+        '''Test retrieving a profile'''
+        profile = await Profile.objects.aget(user__username='user_2')
+        await self.assertSameResponse('profile-detail', [profile.id])
+        await self.assertSameResponse(
+            'profile-detail', [profile.id], view='summary')
+
+    async def test_profile_detail_not_found(self) -> None:
+        '''Test retrieving a profile which doesn't exist'''
+        url = reverse('api:async-profile-detail', args=[1000])
+        res = await self.async_client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('detail', json.loads(res.content))
+
+    async def test_post_list(self) -> None:
+        '''Test listing posts'''
+        await self.assertSameResponse('post-list')
+        await self.assertSameResponse('post-list', view='summary')
+        await self.assertSameResponse(
+            'post-list', view='summary', expand='likes')
+
+    async def test_post_list_of_profile(self) -> None:
+        '''Test listing posts filtered by profile and paginated'''
+        profile = await Profile.objects.aget(user__username='test')
+        await self.assertSameResponse(
+            'post-list', profile=profile.id, page_size=2)
+
+    async def test_post_detail(self) -> None:
+        '''Test retrieving a post'''
+        post = await Post.objects.afirst()
+        await self.assertSameResponse('post-detail', [post.id])
+        await self.assertSameResponse(
+            'post-detail', [post.id], view='summary')
+
+    async def test_comment_list(self) -> None:
+        '''Test listing comments'''
+        await self.assertSameResponse('comment-list')
+        await self.assertSameResponse('comment-list', view='summary')
+
+    async def test_viewer(self) -> None:
+        '''Test representing the reactions and follows of the viewer'''
+        headers = await self.authenticate('user_1')
+        post = await Post.objects.afirst()
+        url = reverse('api:async-post-detail', args=[post.id])
+        res = await self.async_client.get(url, headers=headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = json.loads(res.content)
+        self.assertEqual(data['viewer_reaction'], 'like')
+        self.assertTrue(data['viewer_follows_author'])
+        await self.assertSameResponse('post-detail', [post.id], headers)
+        await self.assertSameResponse('post-list', headers=headers)
+        await self.assertSameResponse(
+            'post-list', headers=headers, view='summary')
+        await self.assertSameResponse('comment-list', headers=headers)
+
+    async def test_invalid_token(self) -> None:
+        '''Test reading with a token which doesn't exist'''
+        headers = {'Authorization': 'Token x'}
+        res = await self.async_client.get(
+            reverse('api:async-post-list'), headers=headers)
+        expected = await self.get(
+            reverse('api:post-list'), {}, headers=headers)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(res.status_code, expected.status_code)
+        self.assertEqual(json.loads(res.content), expected.data)
+
+    async def test_summary_accept_header(self) -> None:
+        '''Test asking the summary with the `Accept` header'''
+        headers = {'Accept': 'application/json; view=summary'}
+        post = await Post.objects.afirst()
+        res = await self.async_client.get(
+            reverse('api:async-post-detail', args=[post.id]),
+            headers=headers)
+        self.assertNotIn('follows', json.loads(res.content)['profile'])
+        await self.assertSameResponse('post-detail', [post.id], headers)
+        await self.assertSameResponse('post-list', headers=headers)
+
+    async def test_invalid_cursor(self) -> None:
+        '''Test listing from a cursor which isn't one'''
+        for name in ('post-list', 'comment-list'):
+            res = await self.async_client.get(
+                reverse(f'api:async-{name}'), {'cursor': 'cD0x'})
+            expected = await self.get(
+                reverse(f'api:{name}'), {'cursor': 'cD0x'})
+            self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+            self.assertEqual(json.loads(res.content), expected.data)
+
+    async def test_write_not_allowed(self) -> None:
+        '''Test writing to the read only async views'''
+        res = await self.async_client.post(reverse('api:async-post-list'))
+        self.assertEqual(res.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(res['Allow'], 'GET, HEAD')
+
+    @override_settings(COMPILED_REPRESENTATIONS=False)
+    async def test_post_list_serialized(self) -> None:
+        '''Test listing posts with the serializers'''
+        await self.assertSameResponse('post-list')
+        await self.assertSameResponse('comment-list', view='summary')
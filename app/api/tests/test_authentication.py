@@ -0,0 +1,151 @@
+'''
+Tests for the cached token authentication
+'''
+from typing import Type
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework import status
+from api import authentication
+from api.authentication import CachedTokenAuthentication
+from core.models import Post
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    '''Tests for authenticating with cached tokens'''
+    def setUp(self) -> None:
+        authentication.TOKENS.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+        self.post = Post.objects.create(
+            profile=create_user(username='test_1').profile, post='Post')
+        self.like_url = reverse('api:post-like', args=[self.post.id])
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self) -> None:
+        authentication.TOKENS.clear()
+        caches['default'].clear()
+
+    def authenticate(self, authenticator, key: str = None):
+        '''Helper method for authenticating a request and its profile'''
+        request = APIRequestFactory().get(
+            '/', HTTP_AUTHORIZATION=f'Token {key or self.token.key}')
+        user, token = authenticator.authenticate(request)
+        return user, user.profile
+
+    def test_authentication_queries(self) -> None:
+        '''Test the queries saved on the user and profile of a token'''
+        with self.assertNumQueries(2):
+            self.authenticate(TokenAuthentication())
+        with self.assertNumQueries(1):
+            user, profile = self.authenticate(CachedTokenAuthentication())
+        self.assertEqual(user, self.user)
+        self.assertEqual(profile, self.user.profile)
+        with self.assertNumQueries(0):
+            user, profile = self.authenticate(CachedTokenAuthentication())
+        self.assertEqual(user, self.user)
+        self.assertEqual(profile, self.user.profile)
+
+    def test_like_queries(self) -> None:
+        '''Test that a cached token isn't read from the database again'''
+        with CaptureQueriesContext(connection) as cold:
+            res = self.client.post(self.like_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        other = Post.objects.create(profile=self.post.profile, post='Post')
+        with CaptureQueriesContext(connection) as warm:
+            res = self.client.post(reverse('api:post-like', args=[other.id]))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(warm), len(cold) - 1)
+        self.assertFalse(any(
+            'authtoken_token' in query['sql'] for query in warm))
+
+    def test_requests_get_their_own_objects(self) -> None:
+        '''Test that requests don't share the cached user and profile'''
+        first, first_profile = self.authenticate(CachedTokenAuthentication())
+        second, second_profile = self.authenticate(
+            CachedTokenAuthentication())
+        self.assertIsNot(first, second)
+        self.assertIsNot(first_profile, second_profile)
+        self.assertIs(second_profile.user, second)
+
+    def test_invalid_token(self) -> None:
+        '''Test authenticating with a token which doesn't exist'''
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+        res = self.client.post(self.like_url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deleted_token(self) -> None:
+        '''Test that deleting a token forgets it'''
+        self.client.post(self.like_url)
+        self.token.delete()
+        res = self.client.post(self.like_url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_deactivated_user(self) -> None:
+        '''Test that deactivating a user forgets its token'''
+        self.client.post(self.like_url)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.post(self.like_url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(TOKEN_CACHE_TTL=0)
+    def test_expired_token(self) -> None:
+        '''Test that expired tokens are read from the database again'''
+        self.authenticate(CachedTokenAuthentication())
+        with self.assertNumQueries(1):
+            self.authenticate(CachedTokenAuthentication())
+
+    @override_settings(TOKEN_CACHE_SIZE=1)
+    def test_least_recently_used_token_evicted(self) -> None:
+        '''Test that the LRU keeps at most `TOKEN_CACHE_SIZE` tokens'''
+        other = Token.objects.create(user=create_user(username='test_2'))
+        self.authenticate(CachedTokenAuthentication())
+        self.authenticate(CachedTokenAuthentication(), other.key)
+        with self.assertNumQueries(0):
+            self.authenticate(CachedTokenAuthentication(), other.key)
+        with self.assertNumQueries(1):
+            self.authenticate(CachedTokenAuthentication())
+
+    @override_settings(TOKEN_CACHE_ALIAS='default')
+    def test_shared_cache(self) -> None:
+        '''Test caching tokens in a cache shared by the processes'''
+        self.authenticate(CachedTokenAuthentication())
+        self.assertFalse(authentication.TOKENS.entries)
+        with self.assertNumQueries(0):
+            user, profile = self.authenticate(CachedTokenAuthentication())
+        self.assertEqual(profile, self.user.profile)
+        self.token.delete()
+        res = self.client.post(self.like_url)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_obtain_token(self) -> None:
+        '''Test obtaining the token of a user'''
+        self.user.set_password('testpass123')
+        self.user.save()
+        res = APIClient().post(reverse('api:authenticate'), {
+            'username': 'test', 'password': 'testpass123'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['token'], self.token.key)
@@ -0,0 +1,190 @@
+'''
+Tests for the response cache of the profile and post endpoints
+1. Cached responses are served without querying the database
+2. Unchanged responses are answered with 304 Not Modified
+3. Writes invalidate the responses built from what they change
+'''
+from typing import Type
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from api import cache as response_cache
+from api.views import PostViewSet
+from core import counters
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def create_post(profile: Profile) -> Post:
+    '''Helper function for creating post'''
+    return Post.objects.create(profile=profile, post='Sample Post')
+
+
+class ResponseCacheTests(TestCase):
+    '''Tests for the response cache'''
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.other_user = create_user(username='test_1')
+        self.post = create_post(self.other_user.profile)
+        self.post_url = reverse('api:post-detail', args=[self.post.id])
+        self.profile_url = reverse(
+            'api:profile-detail', args=[self.other_user.profile.id])
+
+    def test_cached_post(self) -> None:
+        '''Test for serving a post from the cache'''
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.post_url)
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.data, res.data)
+        self.assertEqual(cached['ETag'], res['ETag'])
+
+    def test_cached_representations(self) -> None:
+        '''Test for caching each representation of a post on its own'''
+        full = self.client.get(self.post_url)
+        summary = self.client.get(self.post_url, {'view': 'summary'})
+        self.assertEqual(summary.data['profile'], {
+            'id': self.other_user.profile.id,
+            'username': self.other_user.username,
+        })
+        self.assertNotEqual(full['ETag'], summary['ETag'])
+
+    def test_cached_per_viewer(self) -> None:
+        '''Test for caching a post on its own for every viewer'''
+        Reaction.objects.react(self.post, self.user.profile, Reaction.LIKE)
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['viewer_reaction'], 'like')
+        self.client.force_authenticate(self.other_user)
+        res = self.client.get(self.post_url)
+        self.assertIsNone(res.data['viewer_reaction'])
+        self.client.force_authenticate(None)
+        res = self.client.get(self.post_url)
+        self.assertIsNone(res.data['viewer_reaction'])
+
+    def test_follow_invalidates_viewer_state(self) -> None:
+        '''Test for invalidating the posts of a profile when followed'''
+        res = self.client.get(self.post_url)
+        self.assertFalse(res.data['viewer_follows_author'])
+        self.client.post(
+            reverse('api:profile-follow', args=[self.other_user.profile.id]))
+        res = self.client.get(self.post_url)
+        self.assertTrue(res.data['viewer_follows_author'])
+
+    def test_not_modified(self) -> None:
+        '''Test for answering an unchanged post with 304'''
+        etag = self.client.get(self.post_url)['ETag']
+        with self.assertNumQueries(0):
+            res = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_like_invalidates_post(self) -> None:
+        '''Test for invalidating a post when it's liked'''
+        etag = self.client.get(self.post_url)['ETag']
+        self.client.post(reverse('api:post-like', args=[self.post.id]))
+        res = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['like_count'], 1)
+        self.assertNotEqual(res['ETag'], etag)
+
+    @override_settings(JOBS_EAGER=False, COUNTER_SHARDS=4,
+                       HOT_POST_REACTIONS=0)
+    def test_roll_up_invalidates_post(self) -> None:
+        '''Test for invalidating a hot post when its shards are rolled up'''
+        self.client.post(reverse('api:post-like', args=[self.post.id]))
+        self.assertEqual(self.client.get(self.post_url).data['like_count'], 0)
+        counters.roll_up(self.post.id)
+        self.assertEqual(self.client.get(self.post_url).data['like_count'], 1)
+
+    def test_comment_invalidates_post(self) -> None:
+        '''Test for invalidating a post when it's commented'''
+        self.client.get(self.post_url)
+        self.client.post(
+            reverse('api:comment-list'),
+            {'comment': 'Sample Comment', 'post_id': self.post.id})
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['comment_count'], 1)
+
+    def test_destroy_invalidates_post(self) -> None:
+        '''Test for invalidating a post when it's deleted'''
+        post = create_post(self.user.profile)
+        url = reverse('api:post-detail', args=[post.id])
+        self.client.get(url)
+        self.client.delete(url)
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_follow_invalidates_profiles(self) -> None:
+        '''Test for invalidating both profiles of a follow'''
+        self.client.get(self.profile_url)
+        self.client.post(
+            reverse('api:profile-follow', args=[self.other_user.profile.id]))
+        res = self.client.get(self.profile_url)
+        self.assertEqual(res.data['following_count'], 1)
+        self.client.post(
+            reverse('api:profile-unfollow',
+                    args=[self.other_user.profile.id]))
+        res = self.client.get(self.profile_url)
+        self.assertEqual(res.data['following_count'], 0)
+
+    def test_follow_invalidates_posts_of_liker(self) -> None:
+        '''Test for invalidating posts embedding the follows of a liker'''
+        Reaction.objects.react(self.post, self.user.profile, Reaction.LIKE)
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['likes'][0]['follows_count'], 0)
+        self.client.post(
+            reverse('api:profile-follow', args=[self.other_user.profile.id]))
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['likes'][0]['follows_count'], 1)
+
+    def test_write_while_loading(self) -> None:
+        '''Test for not caching a post edited while it's being loaded'''
+        get_object = PostViewSet.get_object
+
+        def edit_after_loading(view):
+            instance = get_object(view)
+            Post.objects.filter(pk=self.post.pk).update(post='Edited')
+            response_cache.invalidate('post', self.post.pk)
+            return instance
+
+        with mock.patch.object(
+                PostViewSet, 'get_object', edit_after_loading):
+            self.client.get(self.post_url)
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['post'], 'Edited')
+
+    def test_user_edit_invalidates_profile(self) -> None:
+        '''Test for invalidating the profile and posts of an edited user'''
+        self.client.get(self.profile_url)
+        self.client.get(self.post_url)
+        self.other_user.first_name = 'Jane'
+        self.other_user.save()
+        res = self.client.get(self.profile_url)
+        self.assertEqual(res.data['user']['first_name'], 'Jane')
+        res = self.client.get(self.post_url)
+        self.assertEqual(res.data['profile']['user']['first_name'], 'Jane')
@@ -0,0 +1,103 @@
+'''
+Tests for the profiling middleware
+'''
+import re
+from typing import Type
+from unittest import mock
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Post
+from api.profiling import RequestProfile
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def server_timing(res) -> dict:
+    '''Helper function for parsing the `Server-Timing` header'''
+    metrics = {}
+    for metric in re.split(r', (?=\w+;)', res['Server-Timing']):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1)
+class ProfilingTests(TestCase):
+    '''Tests for the profiled requests'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(
+            profile=self.user.profile, post='Sample Post')
+
+    def test_server_timing(self) -> None:
+        '''Test the `Server-Timing` header of a profiled request'''
+        with self.assertNumQueries(6), \
+                self.assertLogs('api.profiling', 'INFO') as logs:
+            res = self.client.get(reverse('api:post-list'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('action=PostViewSet.list', logs.output[0])
+        metrics = server_timing(res)
+        self.assertEqual(
+            metrics['db']['desc'], '"6 queries, 0 duplicates"')
+        self.assertEqual(metrics['total']['desc'], '"PostViewSet.list"')
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+
+    def test_action(self) -> None:
+        '''Test naming the custom action of a viewset'''
+        url = reverse('api:post-like', args=[self.post.id])
+        with self.assertLogs('api.profiling', 'INFO') as logs:
+            res = self.client.post(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            server_timing(res)['total']['desc'], '"PostViewSet.like"')
+        self.assertIn('action=PostViewSet.like', logs.output[0])
+        record = logs.records[0].profiling
+        self.assertEqual(record['method'], 'POST')
+        self.assertEqual(record['status'], status.HTTP_200_OK)
+        self.assertGreater(record['queries'], 0)
+
+    def test_duplicate_queries(self) -> None:
+        '''Test counting the queries repeated with the same params'''
+        profile = RequestProfile()
+        execute = mock.Mock(return_value=None)
+        for params in ((1,), (1,), (2,)):
+            profile(execute, 'SELECT %s', params, False, {})
+        self.assertEqual(profile.queries, 3)
+        self.assertEqual(profile.duplicates, 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.5)
+    def test_sampling(self) -> None:
+        '''Test that only the sampled requests are profiled'''
+        url = reverse('api:post-list')
+        with mock.patch('api.profiling.random.random', return_value=0.7):
+            res = self.client.get(url)
+        self.assertNotIn('Server-Timing', res)
+        with mock.patch('api.profiling.random.random', return_value=0.2), \
+                self.assertLogs('api.profiling', 'INFO') as logs:
+            res = self.client.get(url)
+        self.assertIn('Server-Timing', res)
+        self.assertEqual(len(logs.records), 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_disabled(self) -> None:
+        '''Test that profiling is off without a sample rate'''
+        with self.assertNumQueries(6):
+            res = self.client.get(reverse('api:post-list'))
+        self.assertNotIn('Server-Timing', res)
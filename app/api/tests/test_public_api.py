@@ -139,5 +139,5 @@ class PublicApiTests(TestCase):
         url = reverse('api:post-list')
         res = self.client.get(url, {'profile': user.profile.id})
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        posts_serializer = PostSerializer(res.data, many=True)
+        posts_serializer = PostSerializer(res.data['results'], many=True)
         self.assertEqual(len(posts_serializer.data), 2)
\ No newline at end of file
@@ -0,0 +1,160 @@
+'''
+Tests for the number of queries fired by the API.
+The query count of an endpoint must not depend on the number of
+posts, likes, dislikes, comments and follows being serialized.
+'''
+from typing import Type
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import feed
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+    Comment,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def create_graph(profile: Profile, size: int) -> None:
+    '''
+    Helper function for creating `size` posts of `profile`, each of them
+    liked, disliked and commented by `size` profiles which follow
+    each other
+    '''
+    start = Profile.objects.count()
+    profiles = [
+        create_user(username=f'user_{start + i}').profile
+        for i in range(size)
+    ]
+    for i, other in enumerate(profiles):
+        other.follows.add(profile, *profiles[:i])
+    for _ in range(size):
+        post = Post.objects.create(profile=profile, post='Sample Post')
+        feed.fan_out(post)
+        for i, other in enumerate(profiles):
+            kind = Reaction.LIKE if i < size // 2 else Reaction.DISLIKE
+            Reaction.objects.react(post, other, kind)
+        for other in profiles:
+            Comment.objects.create(
+                profile=other, post=post, comment='Sample Comment')
+
+
+class QueryCountTests(TestCase):
+    '''Tests for the number of queries of the read endpoints'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+
+    def assertConstantQueries(self, num: int, url: str, **params) -> None:
+        '''Assert that `url` fires `num` queries as the graph grows'''
+        for size in (2, 6):
+            create_graph(self.user.profile, size)
+            with self.assertNumQueries(num):
+                res = self.client.get(url, params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_posts(self) -> None:
+        '''Test listing posts'''
+        self.assertConstantQueries(4, reverse('api:post-list'))
+
+    def test_list_posts_as_viewer(self) -> None:
+        '''Test listing posts with the reactions and follows of a viewer'''
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries(6, reverse('api:post-list'))
+        with override_settings(COMPILED_REPRESENTATIONS=False):
+            self.assertConstantQueries(
+                4, reverse('api:post-list'), view='summary')
+
+    def test_list_posts_of_profile(self) -> None:
+        '''Test listing posts filtered by profile'''
+        self.assertConstantQueries(
+            4, reverse('api:post-list'), profile=self.user.profile.id)
+
+    def test_retrieve_post(self) -> None:
+        '''Test retrieving a post'''
+        create_graph(self.user.profile, 4)
+        post = Post.objects.first()
+        url = reverse('api:post-detail', args=[post.id])
+        with self.assertNumQueries(6):
+            res = self.client.get(url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['likes']), 2)
+        self.assertEqual(len(res.data['likes'][1]['follows']), 2)
+
+    def test_retrieve_profile(self) -> None:
+        '''Test retrieving a profile'''
+        self.assertConstantQueries(
+            3, reverse('api:profile-detail', args=[self.user.profile.id]))
+
+    def test_list_profile_posts(self) -> None:
+        '''Test listing the posts of a profile'''
+        self.assertConstantQueries(
+            5, reverse('api:profile-posts', args=[self.user.profile.id]))
+
+    def test_list_comments(self) -> None:
+        '''Test listing comments'''
+        self.assertConstantQueries(7, reverse('api:comment-list'))
+
+    def test_list_post_comments(self) -> None:
+        '''Test listing the comments of a post'''
+        create_graph(self.user.profile, 2)
+        post = Post.objects.first()
+        url = reverse('api:post-comments', args=[post.id])
+        for size in (2, 6):
+            Comment.objects.bulk_create(
+                Comment(profile=self.user.profile, post=post,
+                        comment='Sample Comment')
+                for _ in range(size))
+            with self.assertNumQueries(2):
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_create_comment(self) -> None:
+        '''Test creating a comment, answered with the graph of its post'''
+        self.client.force_authenticate(self.user)
+        url = reverse('api:comment-list')
+        for size in (2, 6):
+            create_graph(self.user.profile, size)
+            post = Post.objects.first()
+            with self.assertNumQueries(14):
+                res = self.client.post(
+                    url, {'comment': 'Sample Comment', 'post_id': post.id})
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_list_posts_summary(self) -> None:
+        '''Test listing posts in the summary representation'''
+        self.assertConstantQueries(
+            2, reverse('api:post-list'), view='summary')
+
+    def test_retrieve_profile_summary(self) -> None:
+        '''Test retrieving a profile in the summary representation'''
+        self.assertConstantQueries(
+            3, reverse('api:profile-detail', args=[self.user.profile.id]),
+            view='summary')
+
+    def test_list_comments_summary(self) -> None:
+        '''Test listing comments in the summary representation'''
+        self.assertConstantQueries(
+            1, reverse('api:comment-list'), view='summary')
+
+    def test_feed(self) -> None:
+        '''Test listing the feed'''
+        self.client.force_authenticate(self.user)
+        self.assertConstantQueries(7, reverse('api:feed-list'))
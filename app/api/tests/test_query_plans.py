@@ -0,0 +1,188 @@
+'''
+Tests for the query plans of the API.
+The hot queries of the endpoints are captured and explained, and each of
+them must be served by the index which exists for its access pattern.
+The planner of an empty database prefers sequential scans, so they are
+disabled on PostgreSQL for the duration of a test.
+'''
+import re
+from typing import Type
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import feed
+from core.models import (
+    Follow,
+    Post,
+    Reaction,
+    Comment,
+    TimelineEntry,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def explain(sql: str) -> str:
+    '''Helper function for getting the query plan of `sql`'''
+    if connection.vendor == 'sqlite':
+        sql = 'EXPLAIN QUERY PLAN ' + sql
+    else:
+        sql = 'EXPLAIN ' + sql
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+def index_names(model, *columns) -> list:
+    '''
+    Helper function for getting the names of the indexes of `model`
+    starting with `columns`, as they appear in a query plan
+    '''
+    table = model._meta.db_table
+    names = []
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, constraint in constraints.items():
+        if constraint['columns'][:len(columns)] != list(columns):
+            continue
+        if constraint['index'] or constraint['unique']:
+            names.append(name)
+        # SQLite backs unique constraints with automatic indexes
+        if connection.vendor == 'sqlite' and constraint['unique']:
+            names.append(f'sqlite_autoindex_{table}_')
+    return names
+
+
+class QueryPlanTests(TestCase):
+    '''Tests for the indexes used by the hot queries of the endpoints'''
+    def setUp(self) -> None:
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            self.skipTest('Query plans are checked on SQLite and PostgreSQL')
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        self.client = APIClient()
+        self.user = create_user()
+        self.profile = self.user.profile
+        self.other = create_user(username='other').profile
+        self.other.follows.add(self.profile)
+        for _ in range(3):
+            post = Post.objects.create(profile=self.profile, post='Sample')
+            feed.fan_out(post)
+            Reaction.objects.react(post, self.other, Reaction.LIKE)
+            Comment.objects.create(
+                profile=self.other, post=post, comment='Sample Comment')
+
+    def capture(self, url: str, pattern: str, **params) -> str:
+        '''Get the query matching `pattern` fired by requesting `url`'''
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for query in context.captured_queries:
+            if re.search(pattern, query['sql']):
+                return query['sql']
+        self.fail(f'No query of {url} matches {pattern}')
+
+    def assertUsesIndex(self, sql: str, model, *columns) -> None:
+        '''Assert that `sql` is served by an index of `model` on `columns`'''
+        names = index_names(model, *columns)
+        self.assertTrue(names, f'{model.__name__} has no index on {columns}')
+        plan = explain(sql)
+        self.assertTrue(
+            any(name in plan for name in names),
+            f'{names} not used by:\n{sql}\n{plan}')
+
+    def test_list_posts_of_profile(self) -> None:
+        '''Test that the posts of a profile are read from its index'''
+        sql = self.capture(
+            reverse('api:post-list'), r'WHERE .*"core_post"\."profile_id" = ',
+            profile=self.profile.id)
+        self.assertUsesIndex(sql, Post, 'profile_id', 'created_at')
+
+    def test_list_profile_posts(self) -> None:
+        '''Test that the posts action of a profile is read from its index'''
+        sql = self.capture(
+            reverse('api:profile-posts', args=[self.profile.id]),
+            r'WHERE .*"core_post"\."profile_id" = ')
+        self.assertUsesIndex(sql, Post, 'profile_id', 'created_at')
+
+    def test_list_comments_of_post(self) -> None:
+        '''Test that the comments of a post are read from its index'''
+        post = Post.objects.first()
+        sql = self.capture(
+            reverse('api:post-comments', args=[post.id]),
+            r'WHERE .*"core_comment"\."post_id" = ')
+        self.assertUsesIndex(sql, Comment, 'post_id', 'created_at')
+
+    def test_list_posts(self) -> None:
+        '''Test that the newest posts are read from the time index'''
+        sql = self.capture(
+            reverse('api:post-list'), r'FROM "core_post" .*ORDER BY')
+        self.assertUsesIndex(sql, Post, 'created_at')
+
+    def test_list_comments(self) -> None:
+        '''Test that the newest comments are read from the time index'''
+        sql = self.capture(
+            reverse('api:comment-list'), r'FROM "core_comment" .*ORDER BY')
+        self.assertUsesIndex(sql, Comment, 'created_at')
+
+    def test_prefetch_reactions(self) -> None:
+        '''Test that the reactions of a page of posts are read from an index'''
+        sql = self.capture(
+            reverse('api:post-list'), r'"core_reaction"\."post_id" IN ')
+        self.assertUsesIndex(sql, Reaction, 'post_id')
+
+    def test_prefetch_follows(self) -> None:
+        '''Test that the follows of a profile are read from an index'''
+        sql = self.capture(
+            reverse('api:profile-detail', args=[self.other.id]),
+            r'"core_profile_follows"\."from_profile_id" IN ')
+        self.assertUsesIndex(sql, Follow, 'from_profile_id')
+
+    def test_prefetch_followers(self) -> None:
+        '''Test that the followers of a profile are read from an index'''
+        sql = self.capture(
+            reverse('api:profile-detail', args=[self.profile.id]),
+            r'"core_profile_follows"\."to_profile_id" IN ')
+        self.assertUsesIndex(sql, Follow, 'to_profile_id')
+
+    def test_follow_graph_of_page(self) -> None:
+        '''Test that the follows of a page of profiles use both indexes'''
+        sql = self.capture(
+            reverse('api:post-list'),
+            r'"core_profile_follows"\."from_profile_id" IN .* OR ')
+        self.assertUsesIndex(sql, Follow, 'from_profile_id')
+        self.assertUsesIndex(sql, Follow, 'to_profile_id')
+
+    def test_feed(self) -> None:
+        '''Test that the timeline of a profile is read from its index'''
+        self.client.force_authenticate(self.other.user)
+        sql = self.capture(
+            reverse('api:feed-list'),
+            r'"core_timelineentry"\."profile_id" = ')
+        self.assertUsesIndex(sql, TimelineEntry, 'profile_id', 'post_id')
+
+    def test_search(self) -> None:
+        '''Test that posts and comments are searched with their indexes'''
+        if connection.vendor != 'postgresql':
+            self.skipTest('Only PostgreSQL has search vectors')
+        sql = self.capture(
+            reverse('api:search-list'), r'search_vector @@ ', q='sample')
+        self.assertUsesIndex(sql, Post, 'search_vector')
+        self.assertUsesIndex(sql, Comment, 'search_vector')
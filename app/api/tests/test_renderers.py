@@ -0,0 +1,169 @@
+'''
+Tests for the JSON renderer and parser
+'''
+import datetime
+import decimal
+import json
+from io import BytesIO
+from typing import Type
+from unittest import mock, skipIf
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework import status
+from api import renderers
+from api.renderers import FastJSONRenderer, FastJSONParser
+from core.models import Post
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+# Data with the types and characters the encoders treat differently
+SPECIAL = {
+    'datetime': datetime.datetime(
+        2023, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+    'naive': datetime.datetime(2023, 5, 1, 12, 30),
+    'date': datetime.date(2023, 5, 1),
+    'time': datetime.time(12, 30, 15, 123456),
+    'decimal': decimal.Decimal('1.10'),
+    'lazy': gettext_lazy('Not found.'),
+    'error': ErrorDetail('Invalid.', code='invalid'),
+    'separators': 'a b c',
+    'unicode': 'Grüße, 世界 😀',
+    'numbers': [0, -1, 2 ** 53, 1.5, True, False, None],
+    'keys': {1: 'int', 'str': 'str'},
+    'nested': [{'a': []}, {}],
+}
+
+
+class FastJSONRendererTests(TestCase):
+    '''Tests for the JSON renderer'''
+    def assertSameJSON(self, data, **context) -> None:
+        '''Assert that `data` renders the same as with REST framework'''
+        expected = JSONRenderer().render(data, renderer_context=context)
+        content = FastJSONRenderer().render(data, renderer_context=context)
+        self.assertEqual(json.loads(content), json.loads(expected))
+        self.assertEqual(content, expected)
+
+    def test_render_special_values(self) -> None:
+        '''Test rendering the values REST framework encodes itself'''
+        self.assertSameJSON(SPECIAL)
+
+    def test_render_scalars(self) -> None:
+        '''Test rendering data which isn't a dict'''
+        for data in ['', 'text', 0, [], [1, 'a']]:
+            with self.subTest(data=data):
+                self.assertSameJSON(data)
+
+    def test_render_none(self) -> None:
+        '''Test rendering nothing'''
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_render_indented(self) -> None:
+        '''Test rendering indented JSON'''
+        self.assertSameJSON(SPECIAL, indent=2)
+
+    def test_render_without_orjson(self) -> None:
+        '''Test rendering when orjson isn't installed'''
+        with mock.patch('api.renderers.orjson', None):
+            self.assertSameJSON(SPECIAL)
+
+    def test_render_unknown_type(self) -> None:
+        '''Test rendering a value neither encoder knows'''
+        with self.assertRaises(TypeError):
+            FastJSONRenderer().render({'value': object()})
+
+
+class FastJSONParserTests(TestCase):
+    '''Tests for the JSON parser'''
+    def parse(self, content: bytes, **context):
+        return FastJSONParser().parse(BytesIO(content), parser_context=context)
+
+    def test_parse(self) -> None:
+        '''Test parsing the same data as REST framework'''
+        content = JSONRenderer().render(SPECIAL)
+        self.assertEqual(
+            self.parse(content), JSONParser().parse(BytesIO(content)))
+
+    def test_parse_encoding(self) -> None:
+        '''Test parsing JSON which isn't encoded with UTF-8'''
+        content = '{"text": "Grüße"}'.encode('latin-1')
+        self.assertEqual(
+            self.parse(content, encoding='latin-1'), {'text': 'Grüße'})
+
+    def test_parse_invalid(self) -> None:
+        '''Test parsing invalid JSON'''
+        for content in [b'', b'{"a": ', b'\xff']:
+            with self.subTest(content=content):
+                with self.assertRaises(ParseError):
+                    self.parse(content)
+
+    def test_parse_without_orjson(self) -> None:
+        '''Test parsing when orjson isn't installed'''
+        with mock.patch('api.renderers.orjson', None):
+            self.assertEqual(self.parse(b'{"a": [1]}'), {'a': [1]})
+            with self.assertRaises(ParseError):
+                self.parse(b'{"a": ')
+
+
+@skipIf(renderers.orjson is None, 'orjson is not installed')
+class FastJSONApiTests(TestCase):
+    '''Tests for the API responding with the JSON renderer and parser'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.profile = self.user.profile
+        others = [
+            create_user(
+                username=f'user_{i}', first_name=f'Prénom {i} ',
+                email=f'user_{i}@example.com').profile
+            for i in range(50)
+        ]
+        self.profile.follows.add(*others[:30])
+        for other in others[20:]:
+            other.follows.add(self.profile)
+        self.client.force_authenticate(self.user)
+
+    def test_profile_detail(self) -> None:
+        '''Test a large profile rendering the same as with REST framework'''
+        url = reverse('api:profile-detail', args=[self.profile.id])
+        for params in [{}, {'view': 'summary'}]:
+            with self.subTest(**params):
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                with mock.patch('api.renderers.orjson', None):
+                    expected = self.client.get(url, params)
+                self.assertEqual(res.content, expected.content)
+
+    def test_create_post(self) -> None:
+        '''Test creating a post from JSON'''
+        res = self.client.post(
+            reverse('api:post-list'), {'post': 'Grüße \U0001f600'},
+            format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.json()['post'], 'Grüße \U0001f600')
+
+    def test_create_post_invalid_json(self) -> None:
+        '''Test creating a post from invalid JSON'''
+        res = self.client.post(
+            reverse('api:post-list'), '{"post": ',
+            content_type='application/json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Post.objects.exists())
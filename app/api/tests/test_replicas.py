@@ -0,0 +1,134 @@
+'''
+Tests for routing the reads of the API to read replicas
+'''
+from typing import Type
+from unittest import mock
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.replicas import REPLICA, ReplicaRouter
+from core.models import Post
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0', 'replica_1'])
+class ReplicaRouterTests(TestCase):
+    '''Tests for the database router'''
+    def test_default(self) -> None:
+        '''Test that reads outside of replica requests go to default'''
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+        self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+
+    def test_replica(self) -> None:
+        '''Test that only the reads of replica requests go to the replica'''
+        token = REPLICA.set('replica_1')
+        try:
+            self.assertEqual(router.db_for_read(Post), 'replica_1')
+            self.assertEqual(router.db_for_write(Post), DEFAULT_DB_ALIAS)
+        finally:
+            REPLICA.reset(token)
+
+    def test_migrate(self) -> None:
+        '''Test that replicas aren't migrated'''
+        self.assertFalse(
+            router.allow_migrate('replica_0', 'core', model_name='post'))
+        self.assertTrue(
+            router.allow_migrate(DEFAULT_DB_ALIAS, 'core', model_name='post'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'], REPLICA_STICKY_SECONDS=60)
+class ReplicaApiTests(TestCase):
+    '''Tests for the viewsets reading from the replicas'''
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.post = Post.objects.create(
+            profile=create_user(username='test_1').profile, post='Post')
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def routed(self, method: str, url: str, **kwargs) -> set:
+        '''
+        Helper method for getting the aliases the reads of a request are
+        routed to. They are run on default, which the replica mirrors.
+        '''
+        aliases = set()
+        route = ReplicaRouter.db_for_read
+
+        def db_for_read(self, model, **hints) -> str:
+            aliases.add(route(self, model, **hints))
+            return DEFAULT_DB_ALIAS
+
+        with mock.patch.object(ReplicaRouter, 'db_for_read', db_for_read):
+            res = getattr(self.client, method)(url, **kwargs)
+        self.assertLess(res.status_code, status.HTTP_400_BAD_REQUEST)
+        return aliases
+
+    def test_safe_requests_read_replica(self) -> None:
+        '''Test that safe requests read from the replica'''
+        for url in [
+                reverse('api:post-list'),
+                reverse('api:post-detail', args=[self.post.id]),
+                reverse('api:profile-detail', args=[self.user.profile.id]),
+                reverse('api:feed-list')]:
+            with self.subTest(url=url):
+                self.assertEqual(self.routed('get', url), {'replica_0'})
+
+    def test_anonymous_requests_read_replica(self) -> None:
+        '''Test that anonymous requests read from the replica'''
+        self.client.force_authenticate(None)
+        self.assertEqual(
+            self.routed('get', reverse('api:post-list')), {'replica_0'})
+
+    def test_writes_read_default(self) -> None:
+        '''Test that the reads of writes go to default'''
+        self.assertEqual(self.routed(
+            'post', reverse('api:post-like', args=[self.post.id])),
+            {DEFAULT_DB_ALIAS})
+
+    def test_read_your_writes(self) -> None:
+        '''Test that users read from default for a while after a write'''
+        url = reverse('api:post-list')
+        self.client.post(reverse('api:post-like', args=[self.post.id]))
+        self.assertEqual(self.routed('get', url), {DEFAULT_DB_ALIAS})
+        # Other users still read from the replica
+        self.client.force_authenticate(create_user(username='test_2'))
+        self.assertEqual(self.routed('get', url), {'replica_0'})
+
+    @override_settings(REPLICA_STICKY_SECONDS=0)
+    def test_stickiness_expires(self) -> None:
+        '''Test that users read from replicas again after a while'''
+        url = reverse('api:post-list')
+        self.client.post(reverse('api:post-like', args=[self.post.id]))
+        self.assertEqual(self.routed('get', url), {'replica_0'})
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas(self) -> None:
+        '''Test that everything goes to default without replicas'''
+        self.assertEqual(
+            self.routed('get', reverse('api:post-list')), {DEFAULT_DB_ALIAS})
+
+    def test_replica_reset_after_request(self) -> None:
+        '''Test that reads after a request go to default'''
+        self.routed('get', reverse('api:post-list'))
+        self.assertIsNone(REPLICA.get())
@@ -0,0 +1,124 @@
+'''
+Contract tests for the precompiled representations.
+Every list endpoint must render the same bytes whether its rows are
+represented by `api.representations` or by the serializers, in every
+representation the clients can ask for.
+'''
+from typing import Type
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core import feed
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+    Comment,
+)
+
+# Query parameters of the representations checked for every endpoint
+REPRESENTATIONS = [
+    {},
+    {'view': 'summary'},
+    {'view': 'summary', 'expand': 'likes'},
+    {'view': 'summary', 'expand': 'profile,follows'},
+    {'view': 'summary', 'expand': 'post,dislikes,following'},
+    {'page_size': 2},
+]
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class RepresentationContractTests(TestCase):
+    '''Tests for the precompiled representations matching the serializers'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.profile = self.user.profile
+        # Profiles are created out of order of their follows and reactions
+        others = [
+            create_user(
+                username=f'user_{i}', first_name=f'First {i}',
+                email=f'user_{i}@example.com').profile
+            for i in range(5)
+        ]
+        for i, other in enumerate(others):
+            other.follows.add(*reversed(others[i + 1:]))
+            if i % 2:
+                other.follows.add(self.profile)
+        self.profile.follows.add(others[3], others[0], others[2])
+        for i, author in enumerate([self.profile, others[2], others[4]] * 2):
+            post = Post.objects.create(profile=author, post=f'Post {i}')
+            feed.fan_out(post)
+            if i % 3:
+                kind = Reaction.LIKE if i % 2 else Reaction.DISLIKE
+                Reaction.objects.react(post, self.profile, kind)
+            for j, other in enumerate(reversed(others)):
+                if (i + j) % 3:
+                    kind = Reaction.LIKE if j % 2 else Reaction.DISLIKE
+                    Reaction.objects.react(post, other, kind)
+            for other in others[i % 3:]:
+                Comment.objects.create(
+                    profile=other, post=post, comment=f'Comment {i}')
+        self.client.force_authenticate(self.user)
+
+    def assertSameContent(self, url: str) -> None:
+        '''Assert that `url` renders the same in every representation'''
+        for params in REPRESENTATIONS:
+            with self.subTest(url=url, **params):
+                with override_settings(COMPILED_REPRESENTATIONS=False):
+                    expected = self.client.get(url, params)
+                res = self.client.get(url, params)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual(res.content, expected.content)
+
+    def test_list_posts(self) -> None:
+        '''Test listing posts'''
+        self.assertSameContent(reverse('api:post-list'))
+
+    def test_list_posts_anonymous(self) -> None:
+        '''Test listing posts without a viewer'''
+        self.client.force_authenticate(None)
+        self.assertSameContent(reverse('api:post-list'))
+
+    def test_list_posts_of_profile(self) -> None:
+        '''Test listing posts filtered by profile'''
+        profile = Profile.objects.get(user__username='user_2')
+        self.assertSameContent(
+            reverse('api:post-list') + f'?profile={profile.id}')
+
+    def test_list_profile_posts(self) -> None:
+        '''Test listing the posts of a profile'''
+        self.assertSameContent(
+            reverse('api:profile-posts', args=[self.profile.id]))
+
+    def test_feed(self) -> None:
+        '''Test listing the feed'''
+        self.assertSameContent(reverse('api:feed-list'))
+
+    def test_list_comments(self) -> None:
+        '''Test listing comments'''
+        self.assertSameContent(reverse('api:comment-list'))
+
+    def test_list_post_comments(self) -> None:
+        '''Test listing the comments of a post'''
+        post = Post.objects.first()
+        self.assertSameContent(reverse('api:post-comments', args=[post.id]))
+
+    def test_list_empty(self) -> None:
+        '''Test listing nothing'''
+        self.assertSameContent(reverse('api:post-list') + '?profile=0')
@@ -0,0 +1,230 @@
+'''
+Tests for streaming whole listings
+'''
+import gc
+import json
+import tracemalloc
+from typing import Callable, Type
+from django.core import signals
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from core.models import Post, Reaction, Comment
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def create_comments(profile, post: Post, count: int) -> None:
+    '''Helper function for creating `count` comments of a post'''
+    Comment.objects.bulk_create(
+        Comment(profile=profile, post=post, comment=f'Comment {i}')
+        for i in range(count))
+
+
+@override_settings(STREAM_CHUNK_SIZE=10)
+class StreamingApiTests(TestCase):
+    '''Tests for streaming the post and comment listings'''
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.user = create_user()
+        self.profile = self.user.profile
+        self.other = create_user(username='test_1').profile
+        self.posts = [
+            Post.objects.create(profile=self.profile, post=f'Post {i}')
+            for i in range(25)
+        ]
+        for post in self.posts[:3]:
+            Reaction.objects.react(post, self.other, Reaction.LIKE)
+        create_comments(self.other, self.posts[0], 25)
+
+    def paginated(self, name: str, **params) -> list:
+        '''Helper method for getting a whole listing page by page'''
+        url, items = reverse(name), []
+        while url:
+            res = self.client.get(url, params)
+            items += res.data['results']
+            url, params = res.data['next'], {}
+        return json.loads(json.dumps(items))
+
+    def stream(self, name: str, **params):
+        '''Helper method for requesting a streamed listing'''
+        res = self.client.get(reverse(name), params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return res
+
+    def test_stream_ndjson(self) -> None:
+        '''Test streaming posts as newline delimited JSON'''
+        res = self.stream('api:post-list', format='ndjson')
+        self.assertEqual(res['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            self.paginated('api:post-list'))
+
+    def test_stream_ndjson_accept(self) -> None:
+        '''Test streaming asked with the Accept header'''
+        res = self.client.get(
+            reverse('api:comment-list'),
+            HTTP_ACCEPT='application/x-ndjson')
+        self.assertTrue(res.streaming)
+        self.assertEqual(
+            len(b''.join(res.streaming_content).splitlines()), 25)
+
+    def test_stream_json(self) -> None:
+        '''Test streaming comments as a JSON array'''
+        res = self.stream(
+            'api:comment-list', format='json-stream', view='summary')
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertEqual(
+            json.loads(b''.join(res.streaming_content)),
+            self.paginated('api:comment-list', view='summary'))
+
+    def test_stream_empty(self) -> None:
+        '''Test streaming an empty listing'''
+        res = self.stream(
+            'api:post-list', format='json-stream', profile=0)
+        self.assertEqual(json.loads(b''.join(res.streaming_content)), [])
+        res = self.stream('api:post-list', format='ndjson', profile=0)
+        self.assertEqual(b''.join(res.streaming_content), b'')
+
+    def test_stream_filtered(self) -> None:
+        '''Test that a streamed listing is filtered as the paginated one'''
+        res = self.stream(
+            'api:post-list', format='ndjson', profile=self.other.id)
+        self.assertEqual(b''.join(res.streaming_content), b'')
+
+    def test_paginated_by_default(self) -> None:
+        '''Test that listings are still paginated by default'''
+        res = self.client.get(reverse('api:post-list'))
+        self.assertFalse(res.streaming)
+        self.assertEqual(len(res.data['results']), 20)
+
+    def peak_memory(self, count: int) -> int:
+        '''
+        Helper method for getting the peak of the memory allocated while
+        streaming `count` comments.
+        Model instances hold reference cycles, left to the collector, which
+        is run between chunks so only what streaming keeps alive is counted.
+        '''
+        Comment.objects.all().delete()
+        create_comments(self.other, self.posts[1], count)
+        res = self.client.get(
+            reverse('api:comment-list'), {'format': 'ndjson'})
+        tracemalloc.start()
+        try:
+            lines = 0
+            for chunk in res.streaming_content:
+                lines += chunk.count(b'\n')
+                gc.collect()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, count)
+        return peak
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    def test_stream_memory_flat(self) -> None:
+        '''Test that streaming 10 times more rows takes as much memory'''
+        self.peak_memory(200)
+        small = self.peak_memory(200)
+        large = self.peak_memory(2000)
+        self.assertLess(large, small * 1.5)
+
+    async def asgi_get(self, path: str, query: str,
+                       on_body: Callable[[bytes], None]) -> int:
+        '''
+        Helper method for requesting `path` through the ASGI handler the
+        app is served by, calling `on_body` with every part of the body it
+        sends, and returning the status
+        '''
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'query_string': query.encode(),
+            'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 1234),
+        }
+        started = []
+
+        async def receive() -> dict:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message: dict) -> None:
+            if message['type'] == 'http.response.start':
+                started.append(message['status'])
+            elif message.get('body'):
+                on_body(message['body'])
+
+        # The connection of the test transaction stays open, as with the
+        # test client
+        signals.request_started.disconnect(close_old_connections)
+        signals.request_finished.disconnect(close_old_connections)
+        try:
+            await ASGIHandler()(scope, receive, send)
+        finally:
+            signals.request_started.connect(close_old_connections)
+            signals.request_finished.connect(close_old_connections)
+        return started[0]
+
+    async def test_stream_asgi(self) -> None:
+        '''Test that listings streamed under ASGI are the same'''
+        parts = []
+        code = await self.asgi_get(
+            reverse('api:post-list'), 'format=ndjson', parts.append)
+        self.assertEqual(code, status.HTTP_200_OK)
+        self.assertGreater(len(parts), 1)
+        lines = b''.join(parts).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.id for post in reversed(self.posts)])
+
+    async def asgi_peak_memory(self, count: int) -> int:
+        '''
+        Helper method for getting the peak of the memory allocated while
+        streaming `count` comments through the ASGI handler
+        '''
+        await Comment.objects.all().adelete()
+        await Comment.objects.abulk_create(
+            Comment(profile=self.other, post=self.posts[1],
+                    comment=f'Comment {i}')
+            for i in range(count))
+        lines = [0]
+
+        def on_body(body: bytes) -> None:
+            lines[0] += body.count(b'\n')
+            gc.collect()
+
+        tracemalloc.start()
+        try:
+            await self.asgi_get(
+                reverse('api:comment-list'), 'format=ndjson', on_body)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines[0], count)
+        return peak
+
+    @override_settings(STREAM_CHUNK_SIZE=100)
+    async def test_stream_memory_flat_asgi(self) -> None:
+        '''Test that streaming under ASGI takes as much memory too'''
+        await self.asgi_peak_memory(200)
+        small = await self.asgi_peak_memory(200)
+        large = await self.asgi_peak_memory(2000)
+        self.assertLess(large, small * 1.5)
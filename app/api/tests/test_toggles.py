@@ -0,0 +1,195 @@
+'''
+Tests for throttling and coalescing likes, dislikes, follows and unfollows
+'''
+from typing import Type
+from unittest import mock
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from rest_framework.test import APIClient
+from rest_framework import status
+from api.throttling import ToggleThrottle
+from core import jobs
+from core.models import (
+    Job,
+    Post,
+    Reaction,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+    }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class ToggleTestCase(TestCase):
+    '''Base of the tests toggling the reactions and follows of a user'''
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = APIClient()
+        self.user = create_user()
+        self.other = create_user(username='test_1')
+        self.post = Post.objects.create(
+            profile=self.other.profile, post='Post')
+        self.client.force_authenticate(self.user)
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def like(self, action: str = 'like'):
+        return self.client.post(
+            reverse(f'api:post-{action}', args=[self.post.id]))
+
+    def follow(self, action: str = 'follow'):
+        return self.client.post(
+            reverse(f'api:profile-{action}', args=[self.other.profile.id]))
+
+
+@mock.patch.object(ToggleThrottle, 'THROTTLE_RATES', {'toggle': '3/min'})
+class ToggleThrottleTests(ToggleTestCase):
+    '''Tests for the token bucket of the toggles of a profile'''
+    def setUp(self) -> None:
+        super().setUp()
+        self.now = 1000.0
+        patcher = mock.patch.object(
+            ToggleThrottle, 'timer', lambda throttle: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst(self) -> None:
+        '''Test that a profile can toggle as many times as its bucket holds'''
+        for action in ('like', 'dislike', 'like'):
+            self.assertEqual(self.like(action).status_code, status.HTTP_200_OK)
+        res = self.like('dislike')
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res['Retry-After'], '20')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+    def test_refill(self) -> None:
+        '''Test that buckets are refilled over time'''
+        for _ in range(3):
+            self.like()
+        self.now += 19
+        self.assertEqual(
+            self.like().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.now += 1
+        self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.like().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # A bucket doesn't fill past its size
+        self.now += 3600
+        for _ in range(3):
+            self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.like().status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bucket_shared_by_toggles(self) -> None:
+        '''Test that reactions, follows and bulk actions share a bucket'''
+        self.like()
+        self.follow()
+        self.client.post(
+            reverse('api:post-bulk-like'), {'ids': [self.post.id]},
+            format='json')
+        self.assertEqual(
+            self.follow('unfollow').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_bucket_per_profile(self) -> None:
+        '''Test that profiles have their own bucket'''
+        for _ in range(4):
+            self.like()
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+
+    def test_reads_not_throttled(self) -> None:
+        '''Test that other requests don't take tokens'''
+        for _ in range(4):
+            self.client.get(reverse('api:post-detail', args=[self.post.id]))
+        self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+
+
+@override_settings(JOBS_EAGER=False, TOGGLE_COALESCE_WINDOW=5)
+class ToggleCoalescingTests(ToggleTestCase):
+    '''Tests for coalescing the rapid toggles of a pair'''
+    def flush(self) -> None:
+        '''Helper method for running the jobs once their window is over'''
+        Job.objects.update(run_at=timezone.now())
+        jobs.work()
+
+    def test_reactions_coalesced(self) -> None:
+        '''Test that rapid reactions are written once, the last one'''
+        for action in ('like', 'dislike', 'like', 'dislike', 'like'):
+            self.assertEqual(
+                self.like(action).status_code, status.HTTP_202_ACCEPTED)
+        self.assertFalse(Reaction.objects.exists())
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(jobs.work(), 0)
+        self.flush()
+        self.assertEqual(
+            list(Reaction.objects.values_list('profile', 'kind')),
+            [(self.user.profile.id, Reaction.LIKE)])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.dislike_count, 0)
+
+    def test_follows_coalesced(self) -> None:
+        '''Test that rapid follows and unfollows are written once'''
+        for action in ('follow', 'unfollow', 'follow', 'unfollow'):
+            self.assertEqual(
+                self.follow(action).status_code, status.HTTP_202_ACCEPTED)
+        self.follow()
+        self.assertEqual(Job.objects.count(), 1)
+        self.flush()
+        self.flush()
+        self.assertEqual(
+            list(self.user.profile.follows.all()), [self.other.profile])
+        self.other.profile.refresh_from_db()
+        self.assertEqual(self.other.profile.following_count, 1)
+
+    def test_toggle_after_flush(self) -> None:
+        '''Test that toggles after a write queue another one'''
+        self.like()
+        self.flush()
+        self.like('dislike')
+        self.flush()
+        self.assertEqual(
+            list(Reaction.objects.values_list('kind', flat=True)),
+            [Reaction.DISLIKE])
+
+    def test_pairs_coalesced_apart(self) -> None:
+        '''Test that the toggles of other pairs are written apart'''
+        self.like()
+        self.client.force_authenticate(self.other)
+        self.like('dislike')
+        self.assertEqual(Job.objects.count(), 2)
+        self.flush()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+        self.assertEqual(self.post.dislike_count, 1)
+
+    def test_lost_state(self) -> None:
+        '''Test writing the state of the queuing toggle without the cache'''
+        self.like('dislike')
+        cache.clear()
+        self.flush()
+        self.assertEqual(
+            list(Reaction.objects.values_list('kind', flat=True)),
+            [Reaction.DISLIKE])
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs(self) -> None:
+        '''Test that toggles are written at once when jobs are eager'''
+        self.assertEqual(self.like().status_code, status.HTTP_200_OK)
+        self.assertEqual(Reaction.objects.count(), 1)
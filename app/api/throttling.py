@@ -0,0 +1,48 @@
+'''
+Throttles of the API.
+'''
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    '''
+    Throttle giving every profile a bucket of `num_requests` tokens in the
+    default cache, refilled at `num_requests` per `duration`, where each
+    request takes a token. Unlike the sliding window of
+    `SimpleRateThrottle`, its state is two numbers whatever the rate, and
+    a profile which paused can burst again.
+    Requests racing in other processes may each take the same token, so
+    the limit is approximate under heavy concurrency of a single profile.
+    '''
+    def get_cache_key(self, request, view):
+        if request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+        now = self.timer()
+        tokens, updated = self.cache.get(self.key, (self.num_requests, now))
+        self.tokens = min(
+            self.num_requests,
+            tokens + (now - updated) * self.num_requests / self.duration)
+        if self.tokens < 1:
+            return False
+        # A bucket left alone for `duration` is full again, like a new one
+        self.cache.set(self.key, (self.tokens - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        '''Seconds until the bucket holds a token again'''
+        return (1 - self.tokens) * self.duration / self.num_requests
+
+
+class ToggleThrottle(TokenBucketThrottle):
+    '''Throttle of likes, dislikes, follows and unfollows'''
+    scope = 'toggle'
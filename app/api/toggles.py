@@ -0,0 +1,93 @@
+'''
+Coalescing of rapid likes, dislikes, follows and unfollows.
+When `TOGGLE_COALESCE_WINDOW` is set and jobs are queued, a toggle isn't
+written when it's asked. The state asked for the (profile, post) or
+(profile, target) pair is kept in the default cache, and a job queued by
+the first toggle of the window writes the last state asked once the
+window is over. However often a pair is toggled within a window, it's
+written once, and touches the post and its counters once.
+The job also carries the state of the toggle which queued it, which it
+writes if the cache lost the pair.
+'''
+from django.conf import settings
+from django.core.cache import cache
+from core import feed, jobs
+from core.models import (
+    Profile,
+    Reaction,
+)
+from api import cache as response_cache
+
+# Seconds the last state asked for a pair is kept, which has to outlast
+# any delay of the workers
+STATE_TIMEOUT = 24 * 60 * 60
+
+
+def coalescing() -> bool:
+    '''Check whether toggles are coalesced, which needs queued jobs'''
+    return (getattr(settings, 'TOGGLE_COALESCE_WINDOW', 0) > 0
+            and not getattr(settings, 'JOBS_EAGER', True))
+
+
+def state_key(pair: str) -> str:
+    return f'api:toggle:{pair}'
+
+
+def queued_key(pair: str) -> str:
+    return f'api:toggle:{pair}:queued'
+
+
+def toggle(task: str, pair: str, state, **kwargs) -> None:
+    '''Ask for the state of a pair, to be written by the job `task`'''
+    window = getattr(settings, 'TOGGLE_COALESCE_WINDOW', 0)
+    cache.set(state_key(pair), state, timeout=STATE_TIMEOUT)
+    if cache.add(queued_key(pair), True, timeout=window):
+        jobs.enqueue(
+            task, key=state_key(pair), delay=window, pair=pair,
+            state=state, **kwargs)
+
+
+def take_state(pair: str, default):
+    '''
+    Get the last state asked for a pair, for writing it. Toggles asked
+    from now on queue another job.
+    '''
+    cache.delete(queued_key(pair))
+    return cache.get(state_key(pair), default)
+
+
+def react(profile: Profile, post_id: int, kind: int) -> None:
+    '''Ask for the reaction of a profile to a post'''
+    toggle('toggles.react', f'react:{profile.pk}:{post_id}', kind,
+           profile=profile.pk, post=post_id)
+
+
+def follow(profile: Profile, target_id: int, following: bool) -> None:
+    '''Ask for a profile to follow a target or not'''
+    toggle('toggles.follow', f'follow:{profile.pk}:{target_id}', following,
+           profile=profile.pk, target=target_id)
+
+
+@jobs.task('toggles.react')
+def react_job(pair: str, state: int, profile: int, post: int) -> None:
+    kind = take_state(pair, state)
+    profile = Profile.objects.filter(pk=profile).first()
+    if profile is None:
+        return
+    found, changed = Reaction.objects.react_many([post], profile, kind)
+    if changed:
+        response_cache.invalidate('post', *changed)
+
+
+@jobs.task('toggles.follow')
+def follow_job(pair: str, state: bool, profile: int, target: int) -> None:
+    following = take_state(pair, state)
+    profile = Profile.objects.filter(pk=profile).first()
+    target = Profile.objects.filter(pk=target).first()
+    if profile is None or target is None:
+        return
+    if following:
+        profile.follows.add(target)
+    else:
+        profile.follows.remove(target)
+    feed.sync(profile, target.pk)
@@ -1,10 +1,13 @@
-from django.urls import path, include
+from django.urls import path
 from rest_framework.authtoken import views
 from rest_framework.routers import DefaultRouter
+from api import async_views
 from api.views import (
     ProfileViewSet,
     PostViewSet,
     CommentViewSet,
+    FeedViewSet,
+    SearchViewSet,
 )
 
 
@@ -12,10 +15,18 @@ router = DefaultRouter()
 router.register('profile', ProfileViewSet, basename='profile')
 router.register('post', PostViewSet, basename='post')
 router.register('comment', CommentViewSet, basename='comment')
+router.register('feed', FeedViewSet, basename='feed')
+router.register('search', SearchViewSet, basename='search')
 
 app_name = 'api'
-urlpatterns = router.urls
-# urlpatterns=[
-#     path('api/authenticate/', views.obtain_auth_token),
-#     path('api/', include(router.urls)),
-# ]
\ No newline at end of file
+urlpatterns = router.urls + [
+    path('authenticate/', views.obtain_auth_token, name='authenticate'),
+    # Async read paths for ASGI deployments
+    path('async/profile/<int:pk>/', async_views.profile_detail,
+         name='async-profile-detail'),
+    path('async/post/', async_views.post_list, name='async-post-list'),
+    path('async/post/<int:pk>/', async_views.post_detail,
+         name='async-post-detail'),
+    path('async/comment/', async_views.comment_list,
+         name='async-comment-list'),
+]
@@ -1,69 +1,274 @@
 import sys
+from typing import Optional
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from rest_framework import (
     viewsets,
     status,
     mixins,
+    exceptions,
+)
+from rest_framework.permissions import (
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
 )
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core import feed, graph, search
+from api import (
+    archive,
+    cache,
+    profiling,
+    replicas,
+    representations,
+    streaming,
+    toggles,
+)
+from api.throttling import ToggleThrottle
+from api.pagination import (
+    CreatedAtPagination,
+    TimelinePagination,
+    SearchPagination,
+)
 from core.models import (
     Profile,
+    Follow,
     Post,
+    Reaction,
     Comment,
+    ArchivedPost,
+    ArchivedComment,
 )
 from api.serializers import (
     ProfileDetailSerializer,
+    ProfileStubSerializer,
     PostSerializer,
     CommentSerializer,
+    PostCommentSerializer,
+    BulkSerializer,
+    SearchSerializer,
+    get_representation,
 )
 
 
-class ProfileViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+def get_bulk_ids(data) -> list:
+    '''Get the validated ids of a bulk action'''
+    serializer = BulkSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data['ids']
+
+
+def bulk_response(ids: list, statuses: dict, default: str) -> Response:
+    '''Respond with the status of every id of a bulk action'''
+    return Response({'results': [
+        {'id': pk, 'status': statuses.get(pk, default)} for pk in ids
+    ]}, status=status.HTTP_200_OK)
+
+
+class SearchUnavailable(exceptions.APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Search took too long, try a narrower query.'
+    default_code = 'search_timeout'
+
+
+def get_viewer(request) -> Optional[int]:
+    '''Get the id of the user viewing the posts, if authenticated'''
+    return get_representation(request).viewer
+
+
+def is_summary(request) -> bool:
+    '''Check whether the summary without any expanded field is asked'''
+    representation = get_representation(request)
+    return representation.summary and not representation.expand
+
+
+class ProfileViewSet(
+        profiling.ProfilingMixin,
+        replicas.ReplicaReadMixin,
+        representations.CompiledPageMixin,
+        cache.CachedRetrieveMixin,
+        mixins.RetrieveModelMixin,
+        viewsets.GenericViewSet
+    ):
     '''
     Profile viewset
     Provides views for viewing a profile, following/unfollowing a profile
     '''
+    cache_kind = 'profile'
     queryset = Profile.objects.all()
     serializer_class = ProfileDetailSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    @action(detail=True, methods=['POST'])
+    def get_queryset(self):
+        '''Prefetch the profile graph when it is going to be serialized'''
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            if is_summary(self.request):
+                queryset = queryset.with_follow_ids()
+            else:
+                queryset = queryset.with_follow_graph()
+        return queryset
+
+    @action(detail=True, methods=['POST'], throttle_classes=[ToggleThrottle])
     def follow(self, request, pk=None):
         '''Custom action for following a profile'''
         target_profile = self.get_object()
         user = request.user
-        user.profile.follows.add(target_profile)
+        if toggles.coalescing():
+            toggles.follow(user.profile, target_profile.pk, True)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        with transaction.atomic():
+            user.profile.follows.add(target_profile)
+            feed.sync(user.profile, target_profile.pk)
         return Response(status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=['POST'])
+    @action(detail=True, methods=['POST'], throttle_classes=[ToggleThrottle])
     def unfollow(self, request, pk=None):
         '''Custom action for unfollowing a profile'''
         target_profile = self.get_object()
         user = request.user
-        user.profile.follows.remove(target_profile)
+        if toggles.coalescing():
+            toggles.follow(user.profile, target_profile.pk, False)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        with transaction.atomic():
+            user.profile.follows.remove(target_profile)
+            feed.sync(user.profile, target_profile.pk)
         return Response(status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['POST'], throttle_classes=[ToggleThrottle])
+    def bulk_follow(self, request):
+        '''Custom action for following many profiles at once'''
+        ids = get_bulk_ids(request.data)
+        profile = request.user.profile
+        with transaction.atomic():
+            found, new = Follow.objects.follow(profile, ids)
+            feed.sync(profile, *new)
+        statuses = dict.fromkeys(found, 'already_following')
+        statuses.update(dict.fromkeys(new, 'followed'))
+        return bulk_response(ids, statuses, 'not_found')
+
+    @action(detail=False, methods=['POST'], throttle_classes=[ToggleThrottle])
+    def bulk_unfollow(self, request):
+        '''Custom action for unfollowing many profiles at once'''
+        ids = get_bulk_ids(request.data)
+        profile = request.user.profile
+        with transaction.atomic():
+            removed = Follow.objects.unfollow(profile, ids)
+            feed.sync(profile, *removed)
+        return bulk_response(
+            ids, dict.fromkeys(removed, 'unfollowed'), 'not_following')
+
+    @action(detail=True, methods=['GET'],
+            serializer_class=ProfileStubSerializer)
+    def mutuals(self, request, pk=None):
+        '''Custom action for listing the profiles following a profile back'''
+        target_profile = self.get_object()
+        queryset = graph.mutuals(target_profile).select_related('user')
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['GET'],
+            serializer_class=ProfileStubSerializer)
+    def suggestions(self, request, pk=None):
+        '''
+        Custom action for suggesting profiles to follow, ranked by the
+        number of follows of the profile following them
+        '''
+        target_profile = self.get_object()
+        ranked = graph.suggestions(
+            target_profile, self.paginator.get_page_size(request))
+        profiles = Profile.objects.select_related('user').in_bulk(
+            [profile_id for profile_id, _ in ranked])
+        return Response({'results': [
+            {**self.get_serializer(profiles[profile_id]).data,
+             'overlap': overlap}
+            for profile_id, overlap in ranked
+        ]})
+
+    @action(detail=True, methods=['GET'])
+    def relationships(self, request, pk=None):
+        '''
+        Custom action for checking whether a profile follows and is
+        followed by each of the profiles of `?ids=1,2,3`
+        '''
+        target_profile = self.get_object()
+        ids = get_bulk_ids({'ids': [
+            profile_id for profile_id in
+            request.query_params.get('ids', '').split(',') if profile_id
+        ]})
+        relationships = graph.relationships(target_profile, ids)
+        return Response({'results': [
+            {'id': profile_id, **relationships[profile_id]}
+            for profile_id in ids
+        ]})
+
+    @action(detail=True, methods=['GET'], serializer_class=PostSerializer,
+            pagination_class=CreatedAtPagination)
+    def posts(self, request, pk=None):
+        '''Custom action for listing the posts of a profile page by page'''
+        target_profile = self.get_object()
+        queryset = Post.objects.filter(profile=target_profile)
+        if is_summary(request):
+            queryset = queryset.with_summary()
+        else:
+            queryset = queryset.with_related()
+        return self.list_queryset(queryset.with_viewer(get_viewer(request)))
+
 
 class PostViewSet(
+        profiling.ProfilingMixin,
+        replicas.ReplicaReadMixin,
+        archive.ArchiveListMixin,
+        archive.ArchiveRetrieveMixin,
+        streaming.StreamingListMixin,
+        representations.CompiledListMixin,
+        cache.CachedRetrieveMixin,
         mixins.ListModelMixin,
         mixins.RetrieveModelMixin,
         mixins.CreateModelMixin,
         mixins.DestroyModelMixin,
         viewsets.GenericViewSet
     ):
-    '''Post viewset'''
+    '''
+    Post viewset
+    Lists the posts newest first, optionally only those of `?profile=`
+    created from `?since=` and before `?until=`
+    '''
+    cache_kind = 'post'
     serializer_class = PostSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtPagination
+    archive_model = ArchivedPost
 
     def get_queryset(self):
-        '''Filter queryset by profile id'''
+        '''Filter queryset by profile id and creation time'''
         queryset = Post.objects.all()
+        if self.action in ('list', 'retrieve'):
+            if is_summary(self.request):
+                queryset = queryset.with_summary()
+            else:
+                queryset = queryset.with_related()
+            queryset = queryset.with_viewer(get_viewer(self.request))
+        if self.action == 'list':
+            queryset = self.filter_listing(queryset)
+        return queryset
+
+    def filter_listing(self, queryset):
         profile = self.request.query_params.get('profile')
         if profile is not None:
             queryset = queryset.filter(profile=profile)
-        return queryset
+        return super().filter_listing(queryset)
+
+    def get_cache_dependencies(self, instance) -> list:
+        '''A post embeds its author, likers and dislikers'''
+        return super().get_cache_dependencies(instance) + [
+            ('profile', instance.profile_id)
+        ] + [
+            ('profile', reaction.profile_id)
+            for reaction in instance.reactions.all()
+        ]
 
     def destroy(self, request, pk=None):
         '''Only authorized person can delete a post'''
@@ -74,27 +279,188 @@ class PostViewSet(
             return Response(status=status.HTTP_401_UNAUTHORIZED)
         return super().destroy(request, pk=pk)
 
-    @action(detail=True, methods=['POST'])
-    def like(self, request, pk=None):
-        '''Custom action for liking a post'''
+    @action(detail=True, methods=['GET', 'POST'],
+            serializer_class=PostCommentSerializer)
+    def comments(self, request, pk=None):
+        '''
+        Custom action for listing the comments of a post page by page,
+        newest first, or commenting on it
+        '''
+        if request.method == 'POST':
+            target_post = self.get_object()
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(profile=request.user.profile, post=target_post)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        try:
+            target_post = self.get_object()
+        except Http404:
+            archived_post = self.get_archived_object(
+                ArchivedPost.objects.only('id'))
+            return self.list_queryset(
+                ArchivedComment.objects.filter(post=archived_post),
+                representations.ARCHIVED[PostCommentSerializer])
+        return self.list_queryset(Comment.objects.filter(
+            post=target_post).select_related('profile__user'))
+
+    def react(self, request, kind: int) -> Response:
+        '''React to a post, or ask for the reaction when coalescing'''
         target_post = self.get_object()
-        target_post.likes.add(request.user.profile)
+        if toggles.coalescing():
+            toggles.react(request.user.profile, target_post.id, kind)
+            return Response(status=status.HTTP_202_ACCEPTED)
+        Reaction.objects.react(target_post, request.user.profile, kind)
+        cache.invalidate('post', target_post.id)
         return Response(status=status.HTTP_200_OK)
 
-    @action(detail=True, methods=['POST'])
+    @action(detail=True, methods=['POST'], throttle_classes=[ToggleThrottle])
+    def like(self, request, pk=None):
+        '''Custom action for liking a post'''
+        return self.react(request, Reaction.LIKE)
+
+    @action(detail=True, methods=['POST'], throttle_classes=[ToggleThrottle])
     def dislike(self, request, pk=None):
         '''Custom action for disliking a post'''
-        target_post = self.get_object()
-        target_post.dislikes.add(request.user.profile)
-        return Response(status=status.HTTP_200_OK)
+        return self.react(request, Reaction.DISLIKE)
+
+    def bulk_react(self, request, kind: int) -> Response:
+        '''React to many posts at once'''
+        ids = get_bulk_ids(request.data)
+        found, changed = Reaction.objects.react_many(
+            ids, request.user.profile, kind)
+        if changed:
+            cache.invalidate('post', *changed)
+        statuses = dict.fromkeys(found, 'unchanged')
+        statuses.update(dict.fromkeys(changed, 'changed'))
+        return bulk_response(ids, statuses, 'not_found')
+
+    @action(detail=False, methods=['POST'], throttle_classes=[ToggleThrottle])
+    def bulk_like(self, request):
+        '''Custom action for liking many posts at once'''
+        return self.bulk_react(request, Reaction.LIKE)
+
+    @action(detail=False, methods=['POST'], throttle_classes=[ToggleThrottle])
+    def bulk_dislike(self, request):
+        '''Custom action for disliking many posts at once'''
+        return self.bulk_react(request, Reaction.DISLIKE)
 
 
 class CommentViewSet(
+        profiling.ProfilingMixin,
+        replicas.ReplicaReadMixin,
+        archive.ArchiveListMixin,
+        streaming.StreamingListMixin,
+        representations.CompiledListMixin,
         mixins.ListModelMixin,
         mixins.CreateModelMixin,
         viewsets.GenericViewSet
     ):
-    '''Comment viewset'''
+    '''
+    Comment viewset
+    Lists the comments newest first, optionally only those created from
+    `?since=` and before `?until=`
+    '''
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
-    permission_classes = [IsAuthenticatedOrReadOnly]
\ No newline at end of file
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CreatedAtPagination
+    archive_model = ArchivedComment
+
+    def get_queryset(self):
+        '''Prefetch the comment graph when it is going to be serialized'''
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            if is_summary(self.request):
+                queryset = queryset.with_summary()
+            else:
+                queryset = queryset.with_related().with_viewer(
+                    get_viewer(self.request))
+            queryset = self.filter_listing(queryset)
+        return queryset
+
+    def perform_create(self, serializer):
+        '''Read the created comment back with the graph of its post'''
+        comment = serializer.save()
+        serializer.instance = Comment.objects.with_related().with_viewer(
+            get_viewer(self.request)).get(pk=comment.pk)
+
+
+class FeedViewSet(
+        profiling.ProfilingMixin,
+        replicas.ReplicaReadMixin,
+        representations.CompiledListMixin,
+        mixins.ListModelMixin,
+        viewsets.GenericViewSet
+    ):
+    '''
+    Feed viewset
+    Provides the home timeline of the authenticated profile, made of its own
+    posts and the posts of the profiles it follows
+    '''
+    serializer_class = PostSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = TimelinePagination
+
+    def get_queryset(self):
+        queryset = feed.timeline(self.request.user.profile)
+        if is_summary(self.request):
+            queryset = queryset.with_summary()
+        else:
+            queryset = queryset.with_related()
+        return queryset.with_viewer(get_viewer(self.request))
+
+
+class SearchViewSet(
+        profiling.ProfilingMixin,
+        replicas.ReplicaReadMixin,
+        viewsets.GenericViewSet
+    ):
+    '''
+    Search viewset
+    Provides the posts and comments containing every term of `?q=`,
+    best match first, optionally only those of `?type=post|comment`
+    '''
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = SearchPagination
+    serializers = {
+        'post': PostSerializer,
+        'comment': CommentSerializer,
+    }
+
+    def list(self, request):
+        params = SearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        kind = params.validated_data.get('type')
+        try:
+            hits = search.search(
+                params.validated_data['q'],
+                [kind] if kind else search.DOCUMENTS)
+        except search.SearchTimeout:
+            raise SearchUnavailable()
+        page = self.paginate_queryset(hits)
+        return self.get_paginated_response(self.serialize(page))
+
+    def serialize(self, hits: list) -> list:
+        '''Serialize the documents of a page of hits in their order'''
+        data = {}
+        for kind, serializer_class in self.serializers.items():
+            ids = [hit.id for hit in hits if hit.kind == kind]
+            if not ids:
+                continue
+            model, _ = search.DOCUMENTS[kind]
+            queryset = model.objects.filter(pk__in=ids)
+            if is_summary(self.request):
+                queryset = queryset.with_summary()
+                if kind == 'post':
+                    queryset = queryset.with_viewer(get_viewer(self.request))
+            else:
+                queryset = queryset.with_related().with_viewer(
+                    get_viewer(self.request))
+            serializer = serializer_class(
+                queryset, many=True, context=self.get_serializer_context())
+            data[kind] = {item['id']: item for item in serializer.data}
+        # Documents deleted since they were found are left out
+        return [
+            {**data[hit.kind][hit.id], 'type': hit.kind, 'rank': hit.rank}
+            for hit in hits if hit.id in data.get(hit.kind, {})
+        ]
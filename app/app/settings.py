@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -93,9 +94,48 @@ DATABASES = {
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
+        # Connections are kept open for the next requests of their thread,
+        # and checked before being reused
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas of `default`, e.g. DB_REPLICA_HOSTS=replica-1,replica-2
+DATABASE_REPLICAS = []
+for i, host in enumerate(
+        filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    DATABASE_REPLICAS.append(f'replica_{i}')
+    DATABASES[f'replica_{i}'] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['api.replicas.ReplicaRouter']
+
+# Seconds a user reads from `default` rather than the replicas after a write
+REPLICA_STICKY_SECONDS = 10
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL'),
+    }
+
+# Cache of the responses of the profile and post detail endpoints
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = 300
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -139,4 +179,108 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
-}
\ No newline at end of file
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.CursorPagination',
+    'PAGE_SIZE': 20,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    # JSON is encoded and decoded with orjson when it's installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    # Token buckets of the likes, dislikes, follows and unfollows of a
+    # profile, bulk or not
+    'DEFAULT_THROTTLE_RATES': {
+        'toggle': '60/min',
+    },
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Authentication tokens are cached for TOKEN_CACHE_TTL seconds, in an LRU
+# of TOKEN_CACHE_SIZE tokens per process, or in the cache TOKEN_CACHE_ALIAS
+# shared by the processes when it's set
+TOKEN_CACHE_TTL = 60
+TOKEN_CACHE_SIZE = 10000
+TOKEN_CACHE_ALIAS = None
+
+# Side effects of the write endpoints are queued as jobs and run by the
+# `manage.py runjobs` workers, or run in the request when JOBS_EAGER is on
+JOBS_EAGER = os.environ.get('JOBS_EAGER', '1') == '1'
+JOBS_BATCH_SIZE = 100
+JOBS_MAX_ATTEMPTS = 5
+# Seconds before the first retry of a failed job, doubled on every attempt
+JOBS_RETRY_DELAY = 10
+# Seconds after which a job taken by a worker which died is taken again
+JOBS_LEASE = 300
+
+# Seconds within which the likes, dislikes, follows and unfollows of the
+# same pair are written once, with the last state asked (0 to write each
+# of them, as when JOBS_EAGER is on)
+TOGGLE_COALESCE_WINDOW = 0
+
+# Posts reacted to more than HOT_POST_REACTIONS times within HOT_POST_WINDOW
+# seconds count their reactions in COUNTER_SHARDS shards, rolled up into
+# their counters COUNTER_ROLLUP_DELAY seconds later (only when JOBS_EAGER
+# is off, and 1 shard to never shard)
+COUNTER_SHARDS = 16
+HOT_POST_REACTIONS = 100
+HOT_POST_WINDOW = 10
+COUNTER_ROLLUP_DELAY = 5
+
+# Posts older than ARCHIVE_AFTER_DAYS days, and not commented since, are
+# moved with their comments to the archive tables by `manage.py
+# archive_posts`, ARCHIVE_BATCH_SIZE posts at a time (None to keep them)
+ARCHIVE_AFTER_DAYS = None
+ARCHIVE_BATCH_SIZE = 500
+
+# Maximum number of ids of a bulk follow, unfollow, like or dislike
+BULK_MAX_ITEMS = 100
+
+# Number of latest follows of a profile walked for follow suggestions
+GRAPH_SUGGESTION_SOURCES = 500
+
+# List posts and comments with the representations of api.representations
+# rather than their serializers
+COMPILED_REPRESENTATIONS = True
+
+# Number of rows read and serialized at a time by streamed listings
+STREAM_CHUNK_SIZE = 500
+
+# Search
+# Maximum number of ranked hits of a search
+SEARCH_MAX_RESULTS = 1000
+# Milliseconds after which a search is cancelled on PostgreSQL
+SEARCH_TIMEOUT = 200
+
+# Home timeline
+# Posts of profiles with more followers than the limit are fanned out on read
+FEED_FANOUT_LIMIT = 10000
+# Number of posts of a newly followed profile pushed to the timeline
+FEED_BACKFILL = 50
+
+# Profiling
+# Fraction of the requests reporting their queries and timings, 0 turns it off
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
@@ -0,0 +1,101 @@
+'''
+Benchmarks for the API.
+Every benchmark runs against a throwaway test database created from the
+configured `default` connection, e.g.
+
+    python -m benchmarks.pagination --rows 1000000
+'''
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+
+def setup() -> None:
+    '''
+    Configure Django for running a benchmark as a script.
+    Benchmarks toggle far more often than a profile is allowed to, so the
+    toggles aren't throttled.
+    '''
+    import django
+    django.setup()
+    from api.throttling import ToggleThrottle
+    ToggleThrottle.THROTTLE_RATES = {
+        **ToggleThrottle.THROTTLE_RATES, 'toggle': None}
+
+
+@contextmanager
+def test_database(keepdb: bool = False) -> Iterator[None]:
+    '''Create the test database for the benchmark and drop it afterwards'''
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import (
+        setup_test_environment,
+        teardown_test_environment,
+    )
+
+    setup_test_environment()
+    settings.ALLOWED_HOSTS = ['*']
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb)
+        teardown_test_environment()
+
+
+def measure(func: Callable[[], object], repeat: int) -> List[float]:
+    '''Return the latencies of `repeat` calls of `func` in milliseconds'''
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def percentile(timings: List[float], percent: int) -> float:
+    '''Return the `percent`th percentile of `timings`'''
+    if len(timings) < 2:
+        return timings[0]
+    return statistics.quantiles(timings, n=100, method='inclusive')[
+        percent - 1]
+
+
+def save_baseline(path: str, results: Dict[str, dict], **meta) -> None:
+    '''Save the results of a benchmark run as a JSON baseline'''
+    with open(path, 'w') as file:
+        json.dump({'meta': meta, 'results': results}, file, indent=2,
+                  sort_keys=True)
+
+
+def load_baseline(path: str) -> Dict[str, dict]:
+    '''Load the results of a JSON baseline'''
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(baseline: Dict[str, dict], results: Dict[str, dict],
+            threshold: float) -> List[str]:
+    '''
+    Return the regressions of `results` against `baseline`: metrics which
+    grew by more than `threshold` percent, or by any amount for the metrics
+    which don't depend on the machine, i.e. queries and bytes.
+    '''
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(name, {}).get(metric)
+            if old is None:
+                continue
+            exact = metric in ('queries', 'bytes')
+            limit = old if exact else old * (1 + threshold / 100)
+            if value > limit:
+                regressions.append(f'{name} {metric}: {old:g} -> {value:g}')
+    return regressions
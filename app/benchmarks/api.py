@@ -0,0 +1,207 @@
+'''
+Benchmark of the routes of the API on a synthetic social graph.
+Every route is requested `--repeat` times through the test client and
+reported with its p50/p99 latency, throughput, queries per request and
+bytes per response. Results can be saved as a JSON baseline and later
+runs compared against it, e.g.
+
+    python -m benchmarks.api --save baseline.json
+    python -m benchmarks.api --compare baseline.json
+
+The response cache is disabled unless `--cache` is given, so the latencies
+are the ones of building the responses.
+'''
+import argparse
+import sys
+from collections import namedtuple
+from itertools import cycle
+from typing import Dict, List
+
+from benchmarks import (
+    compare,
+    load_baseline,
+    measure,
+    percentile,
+    save_baseline,
+    setup,
+    test_database,
+)
+
+Scenario = namedtuple('Scenario', ['name', 'method', 'paths', 'data'])
+
+
+def scenarios(profile, targets: list, posts: list) -> List[Scenario]:
+    '''
+    Return the scenarios run as `profile`, reading and writing the
+    `targets` profiles and the `posts` posts in turn
+    '''
+    from django.urls import reverse
+    from core.models import Post
+
+    def paths(name: str, objects: list = None, query: str = ''):
+        '''Cycle through the route `name` of `objects`'''
+        urls = [
+            reverse(name, args=[] if pk is None else [pk]) + query
+            for pk in objects or [None]
+        ]
+        return lambda: cycle(urls)
+
+    def own_posts():
+        '''Go through the posts written by the `post-create` scenario'''
+        posts = Post.objects.filter(profile=profile, post='Benchmark')
+        return (reverse('api:post-detail', args=[pk])
+                for pk in posts.values_list('id', flat=True))
+
+    summary = '?view=summary'
+    return [
+        Scenario('profile-retrieve', 'get',
+                 paths('api:profile-detail', targets), None),
+        Scenario('profile-retrieve-summary', 'get',
+                 paths('api:profile-detail', targets, summary), None),
+        Scenario('profile-posts', 'get',
+                 paths('api:profile-posts', targets), None),
+        Scenario('post-list', 'get', paths('api:post-list'), None),
+        Scenario('post-list-summary', 'get',
+                 paths('api:post-list', query=summary), None),
+        Scenario('post-list-profile', 'get', lambda: cycle(
+            reverse('api:post-list') + f'?profile={pk}' for pk in targets),
+            None),
+        Scenario('post-retrieve', 'get',
+                 paths('api:post-detail', posts), None),
+        Scenario('post-comments', 'get',
+                 paths('api:post-comments', posts), None),
+        Scenario('comment-list', 'get', paths('api:comment-list'), None),
+        Scenario('comment-list-summary', 'get',
+                 paths('api:comment-list', query=summary), None),
+        Scenario('feed-list', 'get', paths('api:feed-list'), None),
+        Scenario('profile-follow', 'post',
+                 paths('api:profile-follow', targets), None),
+        Scenario('profile-unfollow', 'post',
+                 paths('api:profile-unfollow', targets), None),
+        Scenario('post-like', 'post', paths('api:post-like', posts), None),
+        Scenario('post-dislike', 'post',
+                 paths('api:post-dislike', posts), None),
+        Scenario('post-create', 'post', paths('api:post-list'),
+                 {'post': 'Benchmark'}),
+        Scenario('post-destroy', 'delete', own_posts, None),
+        Scenario('comment-create', 'post', paths('api:comment-list'),
+                 {'comment': 'Benchmark', 'post_id': posts[0]}),
+        Scenario('post-comment-create', 'post',
+                 paths('api:post-comments', posts[:1]),
+                 {'comment': 'Benchmark'}),
+    ]
+
+
+def run(client, scenario: Scenario, repeat: int) -> Dict[str, float]:
+    '''Run `scenario` `repeat` times and return its metrics'''
+    from django.db import connection
+
+    paths = scenario.paths()
+    request = getattr(client, scenario.method)
+    queries, sizes = [], []
+
+    def count(execute, sql, params, many, context):
+        queries[-1] += 1
+        return execute(sql, params, many, context)
+
+    def call():
+        path = next(paths, None)
+        if path is None:
+            raise RuntimeError(f'{scenario.name} ran out of objects')
+        queries.append(0)
+        with connection.execute_wrapper(count):
+            res = request(path, scenario.data)
+        if res.status_code >= 400:
+            raise RuntimeError(
+                f'{scenario.name} failed with {res.status_code}')
+        sizes.append(len(res.content))
+
+    timings = measure(call, repeat)
+    return {
+        'p50': round(percentile(timings, 50), 3),
+        'p99': round(percentile(timings, 99), 3),
+        'mean': round(sum(timings) / len(timings), 3),
+        'queries': round(sum(queries) / len(queries), 2),
+        'bytes': round(sum(sizes) / len(sizes)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=1000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--reactions', type=int, default=10)
+    parser.add_argument('--comments', type=int, default=3)
+    parser.add_argument('--alpha', type=float, default=1.2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--scenario', action='append',
+                        help='Run only the given scenarios')
+    parser.add_argument('--cache', action='store_true',
+                        help='Keep the response cache enabled')
+    parser.add_argument('--save', metavar='PATH',
+                        help='Save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='Compare the results with a JSON baseline')
+    parser.add_argument('--threshold', type=float, default=10,
+                        help='Latency regression tolerated, in percent')
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    import random
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+    from benchmarks.graph import generate
+    from core.models import Profile, Post
+
+    caches = {} if args.cache else {'CACHES': {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}}
+    with test_database(keepdb=args.keepdb), override_settings(**caches):
+        if not Post.objects.exists():
+            generate(
+                profiles=args.profiles, follows=args.follows,
+                posts=args.posts, reactions=args.reactions,
+                comments=args.comments, alpha=args.alpha, seed=args.seed)
+        rng = random.Random(args.seed)
+        profile_ids = list(Profile.objects.values_list('id', flat=True))
+        post_ids = list(Post.objects.values_list('id', flat=True))
+        # Requests are made as the most followed profile, the busiest one
+        profile = Profile.objects.select_related('user').order_by(
+            '-following_count').first()
+        targets = rng.sample(profile_ids, min(50, len(profile_ids)))
+        posts = rng.sample(post_ids, min(50, len(post_ids)))
+
+        client = APIClient()
+        client.force_authenticate(profile.user)
+        results = {}
+        print(f'{"scenario":<26} {"p50":>9} {"p99":>9} {"req/s":>9} '
+              f'{"queries":>8} {"bytes":>9}  (ms)')
+        for scenario in scenarios(profile, targets, posts):
+            if args.scenario and scenario.name not in args.scenario:
+                continue
+            metrics = run(client, scenario, args.repeat)
+            results[scenario.name] = metrics
+            print(f'{scenario.name:<26} {metrics["p50"]:>9.2f} '
+                  f'{metrics["p99"]:>9.2f} {1000 / metrics["mean"]:>9.1f} '
+                  f'{metrics["queries"]:>8g} {metrics["bytes"]:>9}')
+
+    if args.save:
+        save_baseline(
+            args.save, results, profiles=args.profiles, follows=args.follows,
+            posts=args.posts, reactions=args.reactions,
+            comments=args.comments, alpha=args.alpha, seed=args.seed,
+            repeat=args.repeat, cache=args.cache)
+    if args.compare:
+        regressions = compare(
+            load_baseline(args.compare), results, args.threshold)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+'''
+Benchmark of the bulk follow and like endpoints.
+Compares following, unfollowing and liking `n` targets with one request
+per target against a single bulk request, in total time and queries.
+'''
+import argparse
+import time
+
+from benchmarks import setup, test_database
+
+
+def timed(func) -> tuple:
+    '''Return the time of calling `func` in milliseconds and its queries'''
+    from django.db import connection
+
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    start = time.perf_counter()
+    with connection.execute_wrapper(count):
+        func()
+    return (time.perf_counter() - start) * 1000, len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from core.models import Post
+
+    with test_database(keepdb=args.keepdb):
+        User = get_user_model()
+        user = User.objects.create(username='bench')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def single(name: str, ids: list):
+            def call():
+                for pk in ids:
+                    res = client.post(reverse(name, args=[pk]))
+                    assert res.status_code == 200, res.status_code
+            return call
+
+        def bulk(name: str, ids: list):
+            def call():
+                res = client.post(reverse(name), {'ids': ids}, format='json')
+                assert res.status_code == 200, res.status_code
+            return call
+
+        print(f'{"action":<10} {"n":>5} {"single ms":>10} {"queries":>8} '
+              f'{"bulk ms":>10} {"queries":>8} {"speedup":>8}')
+        for size in args.sizes:
+            targets = [
+                User.objects.create(username=f'bench_{size}_{i}').profile
+                for i in range(size)
+            ]
+            ids = [profile.id for profile in targets]
+            posts = [
+                Post.objects.create(profile=profile, post='Post').id
+                for profile in targets
+            ]
+            # Each bulk run is preceded by undoing the single-item run, so
+            # both write the same rows
+            rounds = [
+                ('follow', single('api:profile-follow', ids),
+                 bulk('api:profile-bulk-follow', ids),
+                 bulk('api:profile-bulk-unfollow', ids)),
+                ('unfollow', single('api:profile-unfollow', ids),
+                 bulk('api:profile-bulk-unfollow', ids),
+                 bulk('api:profile-bulk-follow', ids)),
+                ('like', single('api:post-like', posts),
+                 bulk('api:post-bulk-like', posts),
+                 bulk('api:post-bulk-dislike', posts)),
+                ('dislike', single('api:post-dislike', posts),
+                 bulk('api:post-bulk-dislike', posts),
+                 bulk('api:post-bulk-like', posts)),
+            ]
+            for name, single_call, bulk_call, undo in rounds:
+                single_ms, single_queries = timed(single_call)
+                undo()
+                bulk_ms, bulk_queries = timed(bulk_call)
+                print(f'{name:<10} {size:>5} {single_ms:>10.1f} '
+                      f'{single_queries:>8} {bulk_ms:>10.1f} '
+                      f'{bulk_queries:>8} {single_ms / bulk_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
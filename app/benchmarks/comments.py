@@ -0,0 +1,101 @@
+'''
+Benchmark of the comments of a single post.
+Writes `--comments` comments from `--profiles` profiles, which also react
+to the post, then compares listing them under the post with listing them
+with the comment endpoint, which embeds the post in every comment, on the
+first page and on a page `--depth` pages deep. Creating a comment through
+both endpoints is measured too. Reports p50/p99 latency, queries per
+request and bytes per response.
+'''
+import argparse
+
+from benchmarks import measure, percentile, setup, test_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--comments', type=int, default=10000)
+    parser.add_argument('--profiles', type=int, default=200)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from core.models import Comment, Post, Profile, Reaction
+
+    with test_database(keepdb=args.keepdb):
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'commenter_{i}')
+            for i in range(args.profiles))
+        Profile.objects.bulk_create(Profile(user=user) for user in users)
+        profiles = list(Profile.objects.all())
+        post = Post.objects.create(profile=profiles[0], post='Busy post')
+        for i, profile in enumerate(profiles):
+            kind = Reaction.LIKE if i % 2 else Reaction.DISLIKE
+            Reaction.objects.react(post, profile, kind)
+        Comment.objects.bulk_create(
+            (Comment(profile=profiles[i % len(profiles)], post=post,
+                     comment=f'Comment {i}')
+             for i in range(args.comments)), batch_size=1000)
+        client = APIClient()
+        client.force_authenticate(users[0])
+
+        def deep(url: str) -> str:
+            '''Follow the next links of `url` `--depth` pages deep'''
+            for _ in range(args.depth):
+                next_url = client.get(url).data['next']
+                if next_url is None:
+                    break
+                url = next_url
+            return url
+
+        params = f'?page_size={args.page_size}'
+        nested = reverse('api:post-comments', args=[post.id]) + params
+        flat = reverse('api:comment-list') + params
+        reads = [
+            ('post comments', nested),
+            ('post comments deep', deep(nested)),
+            ('comment list', flat),
+            ('comment list deep', deep(flat)),
+            ('comment list summary', flat + '&view=summary'),
+        ]
+        writes = [
+            ('create on post', reverse('api:post-comments', args=[post.id]),
+             {'comment': 'New comment'}),
+            ('create with post_id', reverse('api:comment-list'),
+             {'comment': 'New comment', 'post_id': post.id}),
+        ]
+
+        print(f'{"request":<22} {"p50":>9} {"p99":>9} {"queries":>8} '
+              f'{"bytes":>9}  (ms)')
+        for name, url, *payload in reads + writes:
+            if payload:
+                def call(url=url, payload=payload[0]):
+                    return client.post(url, payload)
+            else:
+                def call(url=url):
+                    return client.get(url)
+            queries = []
+
+            def count(execute, sql, params, many, context):
+                queries.append(sql)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                res = call()
+            assert res.status_code in (200, 201), res.status_code
+            timings = measure(call, args.repeat)
+            print(f'{name:<22} {percentile(timings, 50):>9.2f} '
+                  f'{percentile(timings, 99):>9.2f} '
+                  f'{len(queries):>8} '
+                  f'{len(res.content):>9}')
+
+
+if __name__ == '__main__':
+    main()
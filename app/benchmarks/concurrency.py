@@ -0,0 +1,110 @@
+'''
+Benchmark of the async read paths against the viewsets under concurrency.
+The viewsets are requested from `--concurrency` threads as a threaded
+WSGI server would, and the async views from as many tasks on an event
+loop, each request in its own context as the ASGI handler does.
+The response cache is disabled as the async views don't use it.
+'''
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple
+
+from benchmarks import percentile, setup, test_database
+
+
+def run_wsgi(paths: List[str], concurrency: int) -> Tuple[float, list]:
+    '''Request `paths` from `concurrency` threads'''
+    from django.test import Client
+
+    local = threading.local()
+
+    def call(path: str) -> float:
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        start = time.perf_counter()
+        res = local.client.get(path)
+        assert res.status_code == 200, (path, res.status_code)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        timings = list(executor.map(call, paths))
+    return time.perf_counter() - start, timings
+
+
+def run_asgi(paths: List[str], concurrency: int) -> Tuple[float, list]:
+    '''Request `paths` from `concurrency` tasks'''
+    from asgiref.sync import ThreadSensitiveContext
+    from django.test import AsyncClient
+
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(path: str) -> float:
+        async with semaphore, ThreadSensitiveContext():
+            start = time.perf_counter()
+            res = await client.get(path)
+            assert res.status_code == 200, (path, res.status_code)
+            return (time.perf_counter() - start) * 1000
+
+    async def main() -> list:
+        return await asyncio.gather(*(call(path) for path in paths))
+
+    start = time.perf_counter()
+    timings = asyncio.run(main())
+    return time.perf_counter() - start, timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    import random
+    from django.test import override_settings
+    from django.urls import reverse
+    from benchmarks.graph import generate
+    from core.models import Profile, Post
+
+    dummy = {'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+    with test_database(keepdb=args.keepdb), override_settings(CACHES=dummy):
+        if not Post.objects.exists():
+            generate(profiles=args.profiles, posts=args.posts, seed=args.seed)
+        rng = random.Random(args.seed)
+        profile_ids = list(Profile.objects.values_list('id', flat=True))
+        post_ids = list(Post.objects.values_list('id', flat=True))
+
+        routes = {
+            'profile-detail': [
+                [pk] for pk in rng.choices(profile_ids, k=args.requests)],
+            'post-list': [[]] * args.requests,
+            'post-detail': [
+                [pk] for pk in rng.choices(post_ids, k=args.requests)],
+            'comment-list': [[]] * args.requests,
+        }
+        print(f'{"route":<16} {"server":<6} {"req/s":>9} {"p50":>9} '
+              f'{"p99":>9}  (ms)')
+        for name, args_list in routes.items():
+            for server, prefix, run in (('wsgi', 'api:', run_wsgi),
+                                        ('asgi', 'api:async-', run_asgi)):
+                paths = [reverse(prefix + name, args=route_args)
+                         for route_args in args_list]
+                elapsed, timings = run(paths, args.concurrency)
+                print(f'{name:<16} {server:<6} '
+                      f'{len(paths) / elapsed:>9.1f} '
+                      f'{percentile(timings, 50):>9.2f} '
+                      f'{percentile(timings, 99):>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+'''
+Benchmark of the follow graph endpoints at a million follows.
+Requests the mutuals, suggestions and relationships of random profiles
+and of the most followed ones, and checks their p99 latency against
+the targets, e.g.
+
+    python -m benchmarks.follow_graph --profiles 50000 --follows 20
+'''
+import argparse
+import itertools
+import random
+import sys
+
+from benchmarks import measure, percentile, setup, test_database
+
+# p99 latency targets in milliseconds
+TARGETS = {
+    'mutuals': 50,
+    'suggestions': 150,
+    'relationships': 20,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=50000)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from benchmarks.graph import generate
+    from core.models import Profile, Follow
+
+    with test_database(keepdb=args.keepdb):
+        if not Follow.objects.exists():
+            generate(profiles=args.profiles, follows=args.follows, posts=0,
+                     reactions=0, comments=0, seed=args.seed)
+        print(f'{Follow.objects.count()} follows')
+        rng = random.Random(args.seed)
+        ids = list(Profile.objects.values_list('id', flat=True))
+        # Random profiles and the most followed ones, the heaviest
+        pool = ids + list(Profile.objects.order_by(
+            '-following_count').values_list('id', flat=True)[:10])
+        client = APIClient()
+
+        def requests(name: str, **params):
+            profiles = (rng.choice(pool) for _ in itertools.count())
+            return lambda: client.get(
+                reverse(f'api:profile-{name}', args=[next(profiles)]),
+                params)
+
+        failed = False
+        print(f'{"endpoint":<14} {"p50":>9} {"p99":>9} {"target":>9}  (ms)')
+        for name, params in (
+                ('mutuals', {}),
+                ('suggestions', {}),
+                ('relationships', {'ids': ','.join(
+                    map(str, rng.sample(ids, 100)))})):
+            timings = measure(requests(name, **params), args.repeat)
+            p99 = percentile(timings, 99)
+            failed |= p99 > TARGETS[name]
+            print(f'{name:<14} {percentile(timings, 50):>9.2f} {p99:>9.2f} '
+                  f'{TARGETS[name]:>9}'
+                  f'{"  MISSED" if p99 > TARGETS[name] else ""}')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+'''
+Synthetic social graph for the benchmarks.
+Popularity follows a power law: profiles are ranked and the profile of
+rank `r` is picked as a followee, author, or reactor with a weight of
+`1 / r ** alpha`, so a few profiles gather most follows and activity
+like on a real network. The same seed generates the same graph.
+'''
+import io
+import random
+from collections import defaultdict
+from itertools import accumulate
+from typing import Dict, List, Set
+
+
+def power_law_weights(size: int, alpha: float) -> List[float]:
+    '''Return the cumulative weights of `size` ranks with exponent `alpha`'''
+    return list(accumulate(1 / (rank + 1) ** alpha for rank in range(size)))
+
+
+def sample(rng: random.Random, population: list, weights: List[float],
+           k: int) -> Set:
+    '''Pick `k` distinct items of `population` following `weights`'''
+    # Rare items of a long tail would take ages to be picked
+    k = min(k, len(population) // 2)
+    picked = set()
+    while len(picked) < k:
+        picked.update(rng.choices(population, cum_weights=weights, k=k))
+    return set(list(picked)[:k])
+
+
+def generate(profiles: int = 1000, follows: int = 20, posts: int = 5000,
+             reactions: int = 10, comments: int = 3, alpha: float = 1.2,
+             seed: int = 0, batch_size: int = 5000) -> Dict[str, int]:
+    '''
+    Create a graph of `profiles` profiles following `follows` others,
+    writing `posts` posts in total, each of them getting on average
+    `reactions` likes or dislikes and `comments` comments.
+    Counters and timelines are filled in as the API would have.
+    Return the number of rows created per model.
+    '''
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from core import feed
+    from core.models import (
+        Profile,
+        Follow,
+        Post,
+        Reaction,
+        Comment,
+        TimelineEntry,
+    )
+
+    rng = random.Random(seed)
+    User = get_user_model()
+    start = User.objects.count()
+    User.objects.bulk_create(
+        (User(username=f'bench_{start + i}') for i in range(profiles)),
+        batch_size=batch_size)
+    # `bulk_create` doesn't send `post_save`, so profiles are created here
+    users = User.objects.filter(profile__isnull=True).values_list(
+        'id', flat=True)
+    Profile.objects.bulk_create(
+        (Profile(user_id=user_id) for user_id in users.iterator()),
+        batch_size=batch_size)
+    ids = list(Profile.objects.order_by('id').values_list('id', flat=True))
+    weights = power_law_weights(len(ids), alpha)
+
+    followers = defaultdict(list)
+    rows = []
+    for profile_id in ids:
+        count = rng.randint(0, 2 * follows)
+        targets = sample(rng, ids, weights, count + 1) - {profile_id}
+        for target in list(targets)[:count]:
+            followers[target].append(profile_id)
+            rows.append(
+                Follow(from_profile_id=profile_id, to_profile_id=target))
+    Follow.objects.bulk_create(
+        rows, batch_size=batch_size, ignore_conflicts=True)
+
+    authors = rng.choices(ids, cum_weights=weights, k=posts)
+    Post.objects.bulk_create(
+        (Post(profile_id=author, post=f'Post {i}')
+         for i, author in enumerate(authors)),
+        batch_size=batch_size)
+    post_rows = list(Post.objects.order_by('-id').values_list(
+        'id', 'profile_id')[:posts])
+
+    reaction_rows, comment_rows, entries = [], [], []
+    for post_id, author in post_rows:
+        reactors = sample(
+            rng, ids, weights, rng.randint(0, 2 * reactions))
+        reaction_rows += [
+            Reaction(post_id=post_id, profile_id=profile_id,
+                     kind=rng.choice((Reaction.LIKE, Reaction.DISLIKE)))
+            for profile_id in reactors
+        ]
+        comment_rows += [
+            Comment(post_id=post_id, profile_id=profile_id, comment='Comment')
+            for profile_id in rng.choices(
+                ids, cum_weights=weights, k=rng.randint(0, 2 * comments))
+        ]
+        timeline = [author]
+        if len(followers[author]) <= feed.fanout_limit():
+            timeline += followers[author]
+        entries += [
+            TimelineEntry(profile_id=profile_id, post_id=post_id)
+            for profile_id in timeline
+        ]
+    Reaction.objects.bulk_create(
+        reaction_rows, batch_size=batch_size, ignore_conflicts=True)
+    Comment.objects.bulk_create(comment_rows, batch_size=batch_size)
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=batch_size, ignore_conflicts=True)
+    call_command('reconcile_counters', stdout=io.StringIO())
+
+    return {
+        'profiles': profiles,
+        'follows': len(rows),
+        'posts': posts,
+        'reactions': len(reaction_rows),
+        'comments': len(comment_rows),
+        'timeline_entries': len(entries),
+    }
@@ -0,0 +1,115 @@
+'''
+Benchmark of the write path of the reactions of a hot post.
+`--concurrency` threads, each with its own connection, like a single post
+with as many profiles as `--reactions`, first with the counters of the
+post updated in its row, then counted in `--shards` shards. The roll-up of
+the shards is timed apart, as it runs in the workers.
+On SQLite the database is switched to WAL, but writers still take turns
+on the database lock, so contention on the row of the post only shows on
+PostgreSQL.
+'''
+import argparse
+import threading
+import time
+from typing import List, Tuple
+
+from benchmarks import percentile, setup, test_database
+
+
+def run(post, profiles: list, concurrency: int) -> Tuple[float, list, int]:
+    '''
+    Like `post` with `profiles` from `concurrency` threads, and return the
+    elapsed seconds, the latencies and the number of retries
+    '''
+    from django.db import OperationalError, connection
+    from core.models import Reaction
+
+    chunks = [profiles[i::concurrency] for i in range(concurrency)]
+    timings: List[float] = []
+    retries = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def like(chunk: list) -> None:
+        local = []
+        barrier.wait()
+        try:
+            for profile in chunk:
+                start = time.perf_counter()
+                while True:
+                    try:
+                        Reaction.objects.react(post, profile, Reaction.LIKE)
+                        break
+                    except OperationalError:
+                        # SQLite refuses lock upgrades of concurrent writers
+                        with lock:
+                            retries[0] += 1
+                local.append((time.perf_counter() - start) * 1000)
+        finally:
+            connection.close()
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=like, args=(chunk,))
+               for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, timings, retries[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reactions', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import override_settings
+    from core import counters
+    from core.models import Post, Profile, Reaction
+
+    with test_database(keepdb=args.keepdb):
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+        users = get_user_model().objects.bulk_create(
+            get_user_model()(username=f'hot_{i}')
+            for i in range(args.reactions))
+        Profile.objects.bulk_create(Profile(user=user) for user in users)
+        profiles = list(Profile.objects.all())
+        post = Post.objects.create(profile=profiles[0], post='Hot post')
+        connection.close()
+
+        print(f'{"counters":<9} {"shards":>6} {"req/s":>9} {"p50":>9} '
+              f'{"p99":>9} {"retries":>8}  (ms)')
+        for name, shards in (('row', 1), ('sharded', args.shards)):
+            Reaction.objects.all().delete()
+            Post.objects.filter(pk=post.pk).update(like_count=0)
+            cache.clear()
+            with override_settings(JOBS_EAGER=False, COUNTER_SHARDS=shards,
+                                   HOT_POST_REACTIONS=0):
+                elapsed, timings, retries = run(
+                    post, profiles, args.concurrency)
+                start = time.perf_counter()
+                counters.roll_up(post.pk)
+                rolled_up = (time.perf_counter() - start) * 1000
+            post.refresh_from_db()
+            assert post.like_count == args.reactions, post.like_count
+            print(f'{name:<9} {shards:>6} '
+                  f'{args.reactions / elapsed:>9.1f} '
+                  f'{percentile(timings, 50):>9.2f} '
+                  f'{percentile(timings, 99):>9.2f} {retries:>8}')
+        print(f'roll-up of {args.shards} shards: {rolled_up:.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+'''
+Benchmark for the cursor pagination of `/api/post/`.
+Compares the latency of fetching a page at increasing depths of the
+listing through the API against the equivalent LIMIT/OFFSET query.
+'''
+import argparse
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from benchmarks import measure, percentile, setup, test_database
+
+
+def cursor_for(row: dict) -> str:
+    '''Return the cursor of the page starting right after `row`'''
+    position = f'{row["created_at"].isoformat()}|{row["id"]}'
+    return b64encode(urlencode({'p': position}).encode('ascii')).decode()
+
+
+def populate(rows: int, profiles: int, batch_size: int = 10000) -> None:
+    '''Create `rows` posts spread over `profiles` profiles'''
+    from django.contrib.auth import get_user_model
+    from core.models import Post, Profile
+
+    for i in range(profiles):
+        get_user_model().objects.create(username=f'user_{i}')
+    profile_ids = list(Profile.objects.values_list('id', flat=True))
+    for start in range(0, rows, batch_size):
+        Post.objects.bulk_create(
+            Post(profile_id=profile_ids[i % len(profile_ids)], post='Post')
+            for i in range(start, min(start + batch_size, rows))
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--profiles', type=int, default=100)
+    parser.add_argument('--page-size', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from core.models import Post
+
+    with test_database(keepdb=args.keepdb):
+        if not Post.objects.exists():
+            populate(args.rows, args.profiles)
+        client = APIClient()
+        url = reverse('api:post-list')
+        ordered = Post.objects.order_by('-created_at', '-id')
+
+        print(f'{"depth":>10} {"cursor p50":>12} {"cursor p99":>12} '
+              f'{"offset p50":>12} {"offset p99":>12}  (ms)')
+        for depth in (0, args.rows // 100, args.rows // 10,
+                      args.rows // 2, args.rows - args.page_size):
+            params = {'page_size': args.page_size}
+            if depth:
+                params['cursor'] = cursor_for(
+                    ordered.values('created_at', 'id')[depth - 1])
+            res = client.get(url, params)
+            assert res.status_code == 200, res.status_code
+            cursor = measure(
+                lambda: client.get(url, params), args.repeat)
+            offset = measure(
+                lambda: list(ordered.values('id')[
+                    depth:depth + args.page_size]),
+                args.repeat)
+            print(f'{depth:>10} {percentile(cursor, 50):>12.2f} '
+                  f'{percentile(cursor, 99):>12.2f} '
+                  f'{percentile(offset, 50):>12.2f} '
+                  f'{percentile(offset, 99):>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Microbenchmark of the JSON renderer and parser against those of REST
+framework, on the detail of a profile with many follows and followers.
+Reports the median time of rendering and parsing it each way, and the
+speedup.
+'''
+import argparse
+from io import BytesIO
+
+from benchmarks import measure, percentile, setup, test_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--followers', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from api import renderers
+    from api.serializers import ProfileDetailSerializer
+    from core.models import Profile, Follow
+
+    if renderers.orjson is None:
+        parser.exit(1, 'orjson is not installed\n')
+
+    with test_database(keepdb=args.keepdb):
+        if not Profile.objects.exists():
+            get_user_model().objects.bulk_create(
+                get_user_model()(
+                    username=f'user_{i}', first_name=f'First {i}',
+                    last_name=f'Last {i}', email=f'user_{i}@example.com')
+                for i in range(args.followers + 1))
+            Profile.objects.bulk_create(
+                Profile(user=user) for user in get_user_model().objects.all())
+            profile, *others = Profile.objects.order_by('id')
+            Follow.objects.bulk_create(
+                [Follow(from_profile=profile, to_profile=other)
+                 for other in others[::2]] +
+                [Follow(from_profile=other, to_profile=profile)
+                 for other in others])
+        profile = Profile.objects.order_by('id').with_follow_graph().first()
+        factory = APIRequestFactory()
+        print(f'{"profile":<10} {"":<7} {"kb":>6} {"drf":>8} {"orjson":>8} '
+              f'{"speedup":>8}  (ms, median)')
+        for view in ('', 'summary'):
+            request = Request(factory.get('/', {'view': view}))
+            data = ProfileDetailSerializer(
+                profile, context={'request': request}).data
+            content = JSONRenderer().render(data)
+            assert renderers.FastJSONRenderer().render(data) == content
+            for name, slow, fast in (
+                    ('render',
+                     lambda: JSONRenderer().render(data),
+                     lambda: renderers.FastJSONRenderer().render(data)),
+                    ('parse',
+                     lambda: JSONParser().parse(BytesIO(content)),
+                     lambda: renderers.FastJSONParser().parse(
+                         BytesIO(content)))):
+                slow = percentile(measure(slow, args.repeat), 50)
+                fast = percentile(measure(fast, args.repeat), 50)
+                print(f'{view or "full":<10} {name:<7} '
+                      f'{len(content) / 1024:>6.0f} {slow:>8.2f} '
+                      f'{fast:>8.2f} {slow / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
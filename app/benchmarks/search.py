@@ -0,0 +1,100 @@
+'''
+Benchmark of the search endpoint.
+Writes posts and comments made of words of a vocabulary whose frequencies
+follow a power law, then searches common, rare and combined terms and
+checks their p99 latency against the targets, e.g.
+
+    python -m benchmarks.search --posts 100000 --comments 200000
+'''
+import argparse
+import itertools
+import random
+import sys
+import time
+
+from benchmarks import measure, percentile, setup, test_database
+
+# p99 latency targets in milliseconds
+TARGETS = {
+    'common': 100,
+    'rare': 50,
+    'two terms': 100,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--comments', type=int, default=200000)
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+    from benchmarks.graph import generate, power_law_weights
+    from core import search
+    from core.models import Profile, Post, Comment
+
+    with test_database(keepdb=args.keepdb):
+        rng = random.Random(args.seed)
+        vocabulary = [f'word{rank}' for rank in range(args.words)]
+        weights = power_law_weights(args.words, 1.0)
+
+        def text(length: int) -> str:
+            return ' '.join(rng.choices(
+                vocabulary, cum_weights=weights, k=length))
+
+        if not Post.objects.exists():
+            generate(profiles=args.profiles, follows=0, posts=0,
+                     reactions=0, comments=0, seed=args.seed)
+            profile_ids = list(Profile.objects.values_list('id', flat=True))
+            Post.objects.bulk_create(
+                (Post(profile_id=rng.choice(profile_ids), post=text(20))
+                 for _ in range(args.posts)), batch_size=5000)
+            post_ids = list(Post.objects.values_list('id', flat=True))
+            Comment.objects.bulk_create(
+                (Comment(profile_id=rng.choice(profile_ids),
+                         post_id=rng.choice(post_ids), comment=text(8))
+                 for _ in range(args.comments)), batch_size=5000)
+        print(f'{Post.objects.count()} posts, '
+              f'{Comment.objects.count()} comments')
+
+        # Build the in-memory index up front when there is one
+        start = time.perf_counter()
+        search.search(vocabulary[0])
+        print(f'first search {(time.perf_counter() - start) * 1000:.0f}ms')
+
+        client = APIClient()
+        common = vocabulary[:10]
+        rare = vocabulary[args.words // 2:]
+
+        def requests(terms):
+            queries = (' '.join(terms()) for _ in itertools.count())
+            return lambda: client.get(
+                reverse('api:search-list'),
+                {'q': next(queries), 'view': 'summary'})
+
+        failed = False
+        print(f'{"query":<10} {"p50":>9} {"p99":>9} {"target":>9}  (ms)')
+        for name, terms in (
+                ('common', lambda: [rng.choice(common)]),
+                ('rare', lambda: [rng.choice(rare)]),
+                ('two terms', lambda: rng.sample(vocabulary[:100], 2))):
+            timings = measure(requests(terms), args.repeat)
+            p99 = percentile(timings, 99)
+            failed |= p99 > TARGETS[name]
+            print(f'{name:<10} {percentile(timings, 50):>9.2f} {p99:>9.2f} '
+                  f'{TARGETS[name]:>9}'
+                  f'{"  MISSED" if p99 > TARGETS[name] else ""}')
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+'''
+Microbenchmark of the precompiled representations against the serializers.
+Represents pages of posts and comments both ways, from the queries to the
+rendered JSON, and reports the median time of each and the speedup.
+'''
+import argparse
+
+from benchmarks import measure, percentile, setup, test_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--profiles', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=5000)
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--keepdb', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+    from api import representations
+    from api.serializers import (
+        PostSerializer,
+        CommentSerializer,
+        get_representation,
+    )
+    from benchmarks.graph import generate
+    from core.models import Post, Comment
+
+    with test_database(keepdb=args.keepdb):
+        if not Post.objects.exists():
+            generate(profiles=args.profiles, posts=args.posts, seed=args.seed)
+        renderer = JSONRenderer()
+        factory = APIRequestFactory()
+        print(f'{"page":<16} {"serializer":>11} {"compiled":>9} '
+              f'{"speedup":>8}  (ms, median)')
+        for model, serializer_class in ((Post, PostSerializer),
+                                        (Comment, CommentSerializer)):
+            ids = list(model.objects.order_by('-id').values_list(
+                'id', flat=True)[:args.page_size])
+            queryset = model.objects.filter(pk__in=ids).order_by('-id')
+            compiled = representations.COMPILED[serializer_class]
+            for view in ('', 'summary'):
+                request = Request(factory.get('/', {'view': view}))
+                representation = get_representation(request)
+
+                def serialize():
+                    if representation.summary:
+                        page = queryset.with_summary()
+                    else:
+                        page = queryset.with_related()
+                    return renderer.render(serializer_class(
+                        page, many=True, context={'request': request}).data)
+
+                def represent():
+                    rows = list(queryset.values(
+                        *compiled.columns(representation)))
+                    return renderer.render(
+                        compiled.represent(rows, representation))
+
+                assert serialize() == represent()
+                slow = percentile(measure(serialize, args.repeat), 50)
+                fast = percentile(measure(represent, args.repeat), 50)
+                name = f'{model.__name__.lower()} {view}'
+                print(f'{name:<16} {slow:>11.2f} {fast:>9.2f} '
+                      f'{slow / fast:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
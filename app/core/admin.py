@@ -1,3 +1,8 @@
 from django.contrib import admin
+from core.models import Job
 
-# Register your models here.
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'name', 'status', 'attempts', 'run_at']
+    list_filter = ['status', 'name']
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self) -> None:
+        # Register the jobs of the feed and of the counter roll-ups, and
+        # connect the receivers keeping the search index up to date
+        from core import counters, feed, search  # noqa: F401
@@ -0,0 +1,89 @@
+'''
+Archive of old posts.
+`manage.py archive_posts` moves the posts older than `ARCHIVE_AFTER_DAYS`
+days, and not commented since, out of `Post` and `Comment` into
+`ArchivedPost` and `ArchivedComment` along with their comments, so the
+hot tables and their indexes only hold the recent posts. An archived post
+keeps its id and counters, and the ids of the profiles which liked or
+disliked it in place of its reactions.
+Archived posts are read only: they can't be reacted to or commented on,
+and they leave the home timelines and the search index. The post and
+comment endpoints fall back to the archive, see `api.archive`.
+'''
+import datetime
+from collections import defaultdict
+from typing import List
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+from core import counters
+from core.models import (
+    Post,
+    Reaction,
+    Comment,
+    CounterShard,
+    ArchivedPost,
+    ArchivedComment,
+)
+
+
+def enabled() -> bool:
+    '''Check whether old posts are archived'''
+    return getattr(settings, 'ARCHIVE_AFTER_DAYS', None) is not None
+
+
+def archivable(before: datetime.datetime) -> QuerySet:
+    '''Ids of the posts created and last commented before `before`'''
+    return Post.objects.filter(created_at__lt=before).exclude(
+        comments__created_at__gte=before).order_by(
+        'created_at', 'id').values_list('id', flat=True)
+
+
+def archive_posts(ids: List[int]) -> int:
+    '''
+    Move the posts of `ids` and their comments to the archive in one
+    transaction, and return how many were moved
+    '''
+    with transaction.atomic():
+        ids = list(Post.objects.select_for_update().filter(
+            pk__in=ids).values_list('id', flat=True))
+        sharded = CounterShard.objects.filter(post__in=ids).exclude(
+            like_count=0, dislike_count=0).values_list('post_id', flat=True)
+        for post_id in set(sharded):
+            counters.roll_up(post_id)
+        reactions = defaultdict(
+            lambda: {Reaction.LIKE: [], Reaction.DISLIKE: []})
+        for post_id, profile_id, kind in Reaction.objects.filter(
+                post__in=ids).order_by('profile_id').values_list(
+                'post_id', 'profile_id', 'kind'):
+            reactions[post_id][kind].append(profile_id)
+        ArchivedPost.objects.bulk_create(
+            ArchivedPost(
+                likes=reactions[row['id']][Reaction.LIKE],
+                dislikes=reactions[row['id']][Reaction.DISLIKE], **row)
+            for row in Post.objects.filter(pk__in=ids).values(
+                'id', 'profile_id', 'post', 'like_count', 'dislike_count',
+                'comment_count', 'created_at'))
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(**row)
+            for row in Comment.objects.filter(post__in=ids).values(
+                'id', 'profile_id', 'post_id', 'comment', 'created_at'))
+        # Their reactions, comments and timeline entries go with them
+        Post.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+def archive(days: int, batch_size: int = None) -> int:
+    '''
+    Move the posts older than `days` days and their comments to the
+    archive, `batch_size` posts at a time, and return how many were moved
+    '''
+    batch_size = batch_size or getattr(settings, 'ARCHIVE_BATCH_SIZE', 500)
+    before = timezone.now() - datetime.timedelta(days=days)
+    moved = 0
+    while True:
+        ids = list(archivable(before)[:batch_size])
+        if not ids:
+            return moved
+        moved += archive_posts(ids)
@@ -0,0 +1,143 @@
+'''
+Sharded reaction counters of hot posts.
+Every like or dislike updates the counters of its post in the transaction
+of the reaction, so the reactions of a viral post queue up on the lock of
+its row. A post reacted to more than `HOT_POST_REACTIONS` times within
+`HOT_POST_WINDOW` seconds is hot: its reactions add to one of its
+`COUNTER_SHARDS` shards at random instead, and a job queued by the first
+of them rolls the shards up into the counters of the post
+`COUNTER_ROLLUP_DELAY` seconds later. The counters of a hot post lag
+behind its reactions by as much.
+Rolling up needs queued jobs, so no post is hot when `JOBS_EAGER` is on.
+'''
+import random
+import time
+from typing import Dict, Iterable, Set
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from core import jobs
+from core.models import (
+    Post,
+    CounterShard,
+)
+
+# Sent with the id of a post whose shards were rolled up into its counters
+rolled_up = Signal()
+
+COUNTERS = ['like_count', 'dislike_count']
+
+
+def sharding() -> bool:
+    '''Check whether the counters of hot posts are sharded'''
+    return (getattr(settings, 'COUNTER_SHARDS', 0) > 1
+            and not getattr(settings, 'JOBS_EAGER', True))
+
+
+def reactions_key(pk: int, window: int) -> str:
+    return f'core:counters:reactions:{pk}:{window}'
+
+
+def hot_key(pk: int) -> str:
+    return f'core:counters:hot:{pk}'
+
+
+def hot(ids: Iterable[int]) -> Set[int]:
+    '''
+    Count a reaction to each post of `ids`, and return the ids of the hot
+    ones
+    '''
+    count(ids)
+    return hot_among(ids)
+
+
+def hot_among(ids: Iterable[int]) -> Set[int]:
+    '''Return the ids of the hot posts of `ids`'''
+    if not sharding():
+        return set()
+    found = cache.get_many([hot_key(pk) for pk in ids])
+    return {pk for pk in ids if hot_key(pk) in found}
+
+
+def count(ids: Iterable[int]) -> None:
+    '''
+    Count a reaction to each post of `ids`. A post stays hot for a window
+    after the reaction which made it hot, so it doesn't cool down at the
+    start of every window.
+    '''
+    if not sharding():
+        return
+    window = getattr(settings, 'HOT_POST_WINDOW', 10)
+    threshold = getattr(settings, 'HOT_POST_REACTIONS', 100)
+    current = int(time.time() // window)
+    for pk in ids:
+        key = reactions_key(pk, current)
+        cache.add(key, 0, timeout=2 * window)
+        try:
+            reactions = cache.incr(key)
+        except ValueError:
+            # Evicted since it was added
+            continue
+        if reactions > threshold:
+            cache.set(hot_key(pk), True, timeout=window)
+
+
+def add(post_id: int, counts: Dict[str, int]) -> None:
+    '''
+    Add `counts` to the counters of a hot post in one of its shards, and
+    queue their roll-up
+    '''
+    shard = random.randrange(settings.COUNTER_SHARDS)
+    shards = CounterShard.objects.filter(post_id=post_id, shard=shard)
+    changes = {counter: F(counter) + count
+               for counter, count in counts.items()}
+    if not shards.update(**changes):
+        try:
+            with transaction.atomic():
+                CounterShard.objects.create(
+                    post_id=post_id, shard=shard, **counts)
+        except IntegrityError:
+            # Created by a concurrent reaction since
+            shards.update(**changes)
+    jobs.enqueue(
+        'counters.roll_up', key=f'counters.roll_up:{post_id}',
+        delay=getattr(settings, 'COUNTER_ROLLUP_DELAY', 5), post=post_id)
+
+
+def roll_up(post_id: int) -> bool:
+    '''
+    Add the shards of a post to its counters and empty them. Return
+    whether they held anything.
+    '''
+    with transaction.atomic():
+        shards = list(CounterShard.objects.select_for_update().filter(
+            post_id=post_id).exclude(like_count=0, dislike_count=0))
+        if not shards:
+            return False
+        totals = {counter: sum(getattr(shard, counter) for shard in shards)
+                  for counter in COUNTERS}
+        changes = {counter: F(counter) + total
+                   for counter, total in totals.items() if total}
+        if changes:
+            Post.objects.filter(pk=post_id).update(**changes)
+        CounterShard.objects.filter(
+            pk__in=[shard.pk for shard in shards]).update(
+            **{counter: 0 for counter in COUNTERS})
+    rolled_up.send(sender=CounterShard, post_id=post_id)
+    return True
+
+
+def roll_up_all() -> int:
+    '''Roll up the shards of every post, and return how many held anything'''
+    post_ids = CounterShard.objects.exclude(
+        like_count=0, dislike_count=0).values_list(
+        'post_id', flat=True).distinct()
+    return sum(roll_up(post_id) for post_id in list(post_ids))
+
+
+@jobs.task('counters.roll_up')
+def roll_up_job(post: int) -> None:
+    '''Roll up the counter shards of a hot post'''
+    roll_up(post)
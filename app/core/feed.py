@@ -0,0 +1,125 @@
+'''
+Home timeline of a profile.
+Posts are fanned out on write to the timelines of the followers of their
+author. Authors followed by more than `FEED_FANOUT_LIMIT` profiles are
+fanned out on read instead, so a single post never writes millions of rows.
+Fan-outs, backfills and prunes run as background jobs of `core.jobs`.
+'''
+from typing import List, Union
+from django.conf import settings
+from django.db.models import F, Q, QuerySet, Window
+from django.db.models.functions import RowNumber
+from core import jobs
+from core.models import (
+    Profile,
+    Post,
+    TimelineEntry,
+)
+
+
+def fanout_limit() -> int:
+    '''Number of followers above which posts are fanned out on read'''
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 10000)
+
+
+def fan_out(post: Post) -> None:
+    '''Push a new post to the timelines of its author and their followers'''
+    author = post.profile
+    profile_ids = [author.id]
+    if author.following_count <= fanout_limit():
+        profile_ids += Profile.follows.through.objects.filter(
+            to_profile=author).values_list('from_profile', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(profile_id=profile_id, post=post)
+         for profile_id in profile_ids),
+        batch_size=1000, ignore_conflicts=True)
+
+
+def publish(post: Post) -> None:
+    '''
+    Push a new post to the timeline of its author, and queue its fan-out
+    to the timelines of their followers
+    '''
+    TimelineEntry.objects.create(profile_id=post.profile_id, post=post)
+    jobs.enqueue('feed.fan_out', key=f'feed.fan_out:{post.pk}', post=post.pk)
+
+
+@jobs.task('feed.fan_out')
+def fan_out_job(post: int) -> None:
+    '''Push a post to the timelines of its author and their followers'''
+    # The post may have been deleted since
+    post = Post.objects.select_related('profile').filter(pk=post).first()
+    if post is not None:
+        fan_out(post)
+
+
+def backfill(profile: Profile, *targets: Profile) -> None:
+    '''Push the latest posts of newly followed profiles to a timeline'''
+    target_ids = [
+        target.id for target in targets
+        if target.following_count <= fanout_limit()
+    ]
+    if not target_ids:
+        return
+    posts = Post.objects.filter(profile__in=target_ids).annotate(
+        rank=Window(RowNumber(), partition_by=F('profile'),
+                    order_by=F('id').desc()),
+    ).filter(rank__lte=getattr(settings, 'FEED_BACKFILL', 50))
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(profile=profile, post_id=post_id)
+         for post_id in posts.values_list('id', flat=True)),
+        batch_size=1000, ignore_conflicts=True)
+
+
+def prune(profile: Profile, *targets: Union[Profile, int]) -> None:
+    '''Remove the posts of unfollowed profiles from a timeline'''
+    TimelineEntry.objects.filter(
+        profile=profile, post__profile__in=targets).delete()
+
+
+def sync(profile: Profile, *targets: int) -> None:
+    '''
+    Queue bringing the timeline of a profile in line with whether it
+    follows each of the profiles of `targets`, once they are followed or
+    unfollowed
+    '''
+    if not targets:
+        return
+    # A single follow toggled again before its job is run needs one job
+    key = f'feed.sync:{profile.pk}:{targets[0]}' if len(targets) == 1 else None
+    jobs.enqueue(
+        'feed.sync', key=key, profile=profile.pk, targets=sorted(targets))
+
+
+@jobs.task('feed.sync')
+def sync_job(profile: int, targets: List[int]) -> None:
+    '''
+    Backfill the posts of the targets a profile follows and prune those of
+    the others, as they are when the job is run
+    '''
+    profile = Profile.objects.filter(pk=profile).first()
+    if profile is None:
+        return
+    followed = list(profile.follows.filter(pk__in=targets))
+    backfill(profile, *followed)
+    unfollowed = set(targets) - {target.pk for target in followed}
+    if unfollowed:
+        prune(profile, *unfollowed)
+
+
+def timeline(profile: Profile) -> QuerySet:
+    '''
+    Posts of the home timeline of a profile, annotated with the
+    `timeline_post` they are paginated by
+    '''
+    celebrity_ids = list(profile.follows.filter(
+        following_count__gt=fanout_limit()).values_list('id', flat=True))
+    if not celebrity_ids:
+        # Ordering by the entries rather than the posts lets the database
+        # read the page straight from the (profile, post) index
+        return Post.objects.filter(timeline_entries__profile=profile).annotate(
+            timeline_post=F('timeline_entries__post'))
+    entries = TimelineEntry.objects.filter(profile=profile).values('post')
+    return Post.objects.filter(
+        Q(pk__in=entries) | Q(profile__in=celebrity_ids)).annotate(
+        timeline_post=F('pk'))
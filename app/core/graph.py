@@ -0,0 +1,58 @@
+'''
+Queries of the follow graph.
+They are set-based queries on `Follow`, served by its unique
+(from_profile, to_profile) index for the follows of a profile and by its
+(to_profile, from_profile) index for the followers, so their cost depends
+on the degree of the profiles involved rather than the size of the graph.
+'''
+from typing import Dict, Iterable, List, Tuple
+from django.conf import settings
+from django.db.models import Count, QuerySet
+from core.models import (
+    Profile,
+    Follow,
+)
+
+
+def mutuals(profile: Profile) -> QuerySet:
+    '''Profiles which follow `profile` back'''
+    follows = Follow.objects.filter(from_profile=profile)
+    followers = Follow.objects.filter(to_profile=profile)
+    return Profile.objects.filter(
+        pk__in=follows.values('to_profile')).filter(
+        pk__in=followers.values('from_profile'))
+
+
+def suggestions(profile: Profile, limit: int) -> List[Tuple[int, int]]:
+    '''
+    Profiles followed by the follows of `profile` which it doesn't follow,
+    as (id, overlap) ranked by the number of its follows following them.
+    Only the latest `GRAPH_SUGGESTION_SOURCES` follows are walked, so the
+    cost is bounded for profiles following many others.
+    '''
+    sources = Follow.objects.filter(from_profile=profile).order_by(
+        '-id').values('to_profile')[
+        :getattr(settings, 'GRAPH_SUGGESTION_SOURCES', 500)]
+    follows = Follow.objects.filter(from_profile=profile).values('to_profile')
+    candidates = Follow.objects.filter(
+        from_profile__in=sources).exclude(
+        to_profile__in=follows).exclude(to_profile=profile)
+    return list(candidates.values('to_profile').annotate(
+        overlap=Count('*')).order_by('-overlap', 'to_profile').values_list(
+        'to_profile', 'overlap')[:limit])
+
+
+def relationships(profile: Profile,
+                  ids: Iterable[int]) -> Dict[int, Dict[str, bool]]:
+    '''Whether `profile` follows and is followed by each of `ids`'''
+    ids = list(ids)
+    follows = set(Follow.objects.filter(
+        from_profile=profile, to_profile__in=ids).values_list(
+        'to_profile', flat=True))
+    followed_by = set(Follow.objects.filter(
+        to_profile=profile, from_profile__in=ids).values_list(
+        'from_profile', flat=True))
+    return {
+        pk: {'follows': pk in follows, 'followed_by': pk in followed_by}
+        for pk in ids
+    }
@@ -0,0 +1,115 @@
+'''
+Background jobs for the side effects of the write endpoints.
+A job is a registered task with JSON keyword arguments. It's queued as a
+`Job` row in the transaction of the write it follows up, so it runs if
+and only if the write is committed, and it's run out of the request by
+the workers of `manage.py runjobs`.
+Workers take the due jobs `JOBS_BATCH_SIZE` at a time, skipping those
+taken by other workers. A failed job is retried after `JOBS_RETRY_DELAY`
+seconds, doubled on every attempt, until it has been tried
+`JOBS_MAX_ATTEMPTS` times. A job whose worker died is taken again once
+its `JOBS_LEASE` is over, so a job may run more than once and tasks must
+be idempotent.
+With `JOBS_EAGER` on, jobs run as soon as they're queued, in the request.
+'''
+import datetime
+import json
+import logging
+import traceback
+from typing import Callable, Dict, List
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Registered tasks by name
+TASKS: Dict[str, Callable] = {}
+
+
+def task(name: str) -> Callable:
+    '''Register the decorated function as the task `name`'''
+    def register(func: Callable) -> Callable:
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name: str, key: str = None, delay: float = 0,
+            **kwargs) -> None:
+    '''
+    Queue the task `name` with the keyword arguments `kwargs` to run in
+    `delay` seconds, unless a pending job has the same `key`
+    '''
+    func = TASKS[name]
+    # Eager jobs get their arguments through JSON too, as queued ones do
+    kwargs = json.loads(json.dumps(kwargs))
+    if getattr(settings, 'JOBS_EAGER', True):
+        func(**kwargs)
+        return
+    run_at = timezone.now() + datetime.timedelta(seconds=delay)
+    Job.objects.bulk_create(
+        [Job(name=name, key=key, kwargs=kwargs, run_at=run_at)],
+        ignore_conflicts=True)
+
+
+def claim(size: int) -> List[Job]:
+    '''Take the `size` jobs due first which no other worker has taken'''
+    now = timezone.now()
+    lease = datetime.timedelta(seconds=getattr(settings, 'JOBS_LEASE', 300))
+    with transaction.atomic():
+        jobs = list(Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING, run_at__lte=now) |
+            Q(status=Job.RUNNING, locked_until__lt=now)).order_by(
+            'run_at', 'id')[:size])
+        Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            locked_until=now + lease)
+    for job in jobs:
+        job.status = Job.RUNNING
+        job.attempts += 1
+    return jobs
+
+
+def run(job: Job) -> bool:
+    '''
+    Run a taken job and delete it in the same transaction, or schedule
+    its retry. Return whether it succeeded.
+    '''
+    try:
+        with transaction.atomic():
+            TASKS[job.name](**job.kwargs)
+            Job.objects.filter(pk=job.pk).delete()
+        return True
+    except Exception:
+        logger.exception('Job %s failed on attempt %d', job, job.attempts)
+        retry(job, traceback.format_exc())
+        return False
+
+
+def retry(job: Job, error: str) -> None:
+    '''Schedule the retry of a failed job, or give up on it'''
+    jobs = Job.objects.filter(pk=job.pk)
+    if job.attempts >= getattr(settings, 'JOBS_MAX_ATTEMPTS', 5):
+        jobs.update(status=Job.FAILED, locked_until=None, error=error)
+        return
+    delay = getattr(settings, 'JOBS_RETRY_DELAY', 10) * 2 ** (
+        job.attempts - 1)
+    try:
+        with transaction.atomic():
+            jobs.update(
+                status=Job.PENDING, locked_until=None, error=error,
+                run_at=timezone.now() + datetime.timedelta(seconds=delay))
+    except IntegrityError:
+        # A job with the same key was queued since, and will do the same
+        jobs.delete()
+
+
+def work(size: int = None) -> int:
+    '''Run a batch of due jobs, and return how many were taken'''
+    jobs = claim(size or getattr(settings, 'JOBS_BATCH_SIZE', 100))
+    for job in jobs:
+        run(job)
+    return len(jobs)
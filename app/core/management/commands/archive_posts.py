@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core import archive
+
+
+class Command(BaseCommand):
+    '''
+    Move the old posts and their comments to the archive tables of
+    `core.archive`, a batch of posts per transaction.
+    '''
+    help = 'Move the posts older than ARCHIVE_AFTER_DAYS days to the archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Age in days of the archived posts '
+                 '(default: ARCHIVE_AFTER_DAYS)')
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Number of posts moved at a time '
+                 '(default: ARCHIVE_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is None:
+            days = getattr(settings, 'ARCHIVE_AFTER_DAYS', None)
+        if days is None:
+            raise CommandError(
+                'Archiving is off, set ARCHIVE_AFTER_DAYS or pass --days.')
+        moved = archive.archive(days, options['batch_size'])
+        self.stdout.write(f'{moved} posts archived')
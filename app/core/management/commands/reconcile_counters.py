@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from core import counters
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+    Comment,
+)
+
+
+def count_rows(queryset, field: str) -> Coalesce:
+    '''Expression counting the rows of `queryset` pointing to the outer row'''
+    rows = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(
+        Subquery(rows.annotate(count=Count('*')).values('count')), 0)
+
+
+class Command(BaseCommand):
+    '''
+    Recompute the denormalized counters from the rows they count.
+    Every counter is fixed with a single UPDATE touching only the rows
+    which drifted. The shards of hot posts are rolled up first, so they
+    aren't counted twice.
+    '''
+    help = 'Fix the like, dislike, comment and follow counters which drifted'
+
+    def counters(self):
+        '''Yield the model, the counter and the expression counting its rows'''
+        follows = Profile.follows.through.objects.all()
+        yield Post, 'like_count', count_rows(
+            Reaction.objects.filter(kind=Reaction.LIKE), 'post')
+        yield Post, 'dislike_count', count_rows(
+            Reaction.objects.filter(kind=Reaction.DISLIKE), 'post')
+        yield Post, 'comment_count', count_rows(Comment.objects.all(), 'post')
+        yield Profile, 'follows_count', count_rows(follows, 'from_profile')
+        yield Profile, 'following_count', count_rows(follows, 'to_profile')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rolled_up = counters.roll_up_all()
+            self.stdout.write(f'Post shards: {rolled_up} rolled up')
+            for model, counter, actual in self.counters():
+                drifted = model.objects.annotate(actual=actual).exclude(
+                    **{counter: F('actual')})
+                fixed = model.objects.filter(
+                    pk__in=drifted.values('pk')).update(**{counter: actual})
+                self.stdout.write(
+                    f'{model.__name__}.{counter}: {fixed} fixed')
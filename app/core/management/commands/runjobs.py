@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from core import jobs
+
+
+class Command(BaseCommand):
+    '''
+    Worker running the background jobs of `core.jobs`.
+    Any number of workers can run side by side, each taking its own
+    batches of jobs.
+    '''
+    help = 'Run the queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=None,
+            help='Number of jobs taken at a time (default: JOBS_BATCH_SIZE)')
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Seconds to wait for new jobs when none is due')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once no job is due instead of waiting for new ones')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            count = jobs.work(options['batch_size'])
+            if count and options['verbosity'] > 1:
+                self.stdout.write(f'{count} jobs taken')
+            if not count:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_alter_comment_post_alter_post_profile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['profile', '-id'], name='core_post_profile_id_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:29
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_rows(queryset, field):
+    rows = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field)
+    return Coalesce(
+        Subquery(rows.annotate(count=Count('*')).values('count')), 0)
+
+
+def backfill_counters(apps, schema_editor):
+    Profile = apps.get_model('core', 'Profile')
+    Post = apps.get_model('core', 'Post')
+    Comment = apps.get_model('core', 'Comment')
+    follows = Profile.follows.through.objects.all()
+    Post.objects.update(
+        like_count=count_rows(Post.likes.through.objects.all(), 'post'),
+        dislike_count=count_rows(Post.dislikes.through.objects.all(), 'post'),
+        comment_count=count_rows(Comment.objects.all(), 'post'),
+    )
+    Profile.objects.update(
+        follows_count=count_rows(follows, 'from_profile'),
+        following_count=count_rows(follows, 'to_profile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_post_profile_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='dislike_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='like_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='follows_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
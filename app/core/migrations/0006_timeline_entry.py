@@ -0,0 +1,38 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='core.post')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='core.profile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('profile', 'post'), name='core_timeline_entry_unique'),
+        ),
+        migrations.RunSQL(
+            '''
+            INSERT INTO core_timelineentry (profile_id, post_id)
+            SELECT profile_id, id FROM core_post
+            UNION
+            SELECT follows.from_profile_id, post.id
+            FROM core_post post
+            JOIN core_profile_follows follows
+            ON follows.to_profile_id = post.profile_id
+            ''',
+            migrations.RunSQL.noop,
+        ),
+    ]
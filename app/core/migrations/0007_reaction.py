@@ -0,0 +1,66 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+LIKE = 1
+DISLIKE = -1
+
+
+def copy_reactions(apps, schema_editor):
+    '''Copy the likes and dislikes through tables into reactions'''
+    Post = apps.get_model('core', 'Post')
+    Reaction = apps.get_model('core', 'Reaction')
+    for kind, through in (
+            (DISLIKE, Post.dislikes.through), (LIKE, Post.likes.through)):
+        rows = through.objects.values_list('post_id', 'profile_id')
+        Reaction.objects.bulk_create(
+            (Reaction(post_id=post_id, profile_id=profile_id, kind=kind)
+             for post_id, profile_id in rows.iterator(chunk_size=2000)),
+            batch_size=2000, ignore_conflicts=True)
+
+
+def copy_likes_dislikes(apps, schema_editor):
+    '''Copy reactions back into the likes and dislikes through tables'''
+    Post = apps.get_model('core', 'Post')
+    Reaction = apps.get_model('core', 'Reaction')
+    for kind, through in (
+            (DISLIKE, Post.dislikes.through), (LIKE, Post.likes.through)):
+        rows = Reaction.objects.filter(kind=kind).values_list(
+            'post_id', 'profile_id')
+        through.objects.bulk_create(
+            (through(post_id=post_id, profile_id=profile_id)
+             for post_id, profile_id in rows.iterator(chunk_size=2000)),
+            batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_timeline_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.SmallIntegerField(choices=[(1, 'Like'), (-1, 'Dislike')])),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='core.post')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='core.profile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reaction',
+            constraint=models.UniqueConstraint(fields=('post', 'profile'), name='core_reaction_unique'),
+        ),
+        migrations.RunPython(copy_reactions, copy_likes_dislikes),
+        migrations.RemoveField(
+            model_name='post',
+            name='dislikes',
+        ),
+        migrations.RemoveField(
+            model_name='post',
+            name='likes',
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.1 on 2026-10-18 15:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_reaction'),
+    ]
+
+    operations = [
+        # Take over the table Django created for `Profile.follows`
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Follow',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('from_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.profile')),
+                        ('to_profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.profile')),
+                    ],
+                    options={
+                        'db_table': 'core_profile_follows',
+                        'unique_together': {('from_profile', 'to_profile')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='profile',
+                    name='follows',
+                    field=models.ManyToManyField(blank=True, related_name='following', through='core.Follow', to='core.profile'),
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='from_profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.profile'),
+        ),
+        migrations.AlterField(
+            model_name='follow',
+            name='to_profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.profile'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['to_profile', 'from_profile'], name='core_follow_to_from_idx'),
+        ),
+        # The composite and unique indexes lead with these foreign keys
+        migrations.AlterField(
+            model_name='comment',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.post'),
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='posts', to='core.profile'),
+        ),
+        migrations.AlterField(
+            model_name='reaction',
+            name='post',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reactions', to='core.post'),
+        ),
+        migrations.AlterField(
+            model_name='timelineentry',
+            name='profile',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to='core.profile'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-id'], name='core_comment_post_id_idx'),
+        ),
+    ]
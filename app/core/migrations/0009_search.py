@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# Tables and text columns searched with `core.search`
+DOCUMENTS = [
+    ('core_post', 'post'),
+    ('core_comment', 'comment'),
+]
+
+
+def add_search_vectors(apps, schema_editor) -> None:
+    '''
+    Add a generated `search_vector` column with a GIN index to the posts
+    and comments. Only PostgreSQL has them, other databases are searched
+    with the in-memory index of `core.search`.
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in DOCUMENTS:
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD COLUMN search_vector tsvector '
+            f"GENERATED ALWAYS AS (to_tsvector('english', {column})) STORED")
+        schema_editor.execute(
+            f'CREATE INDEX {table}_search_idx ON {table} '
+            f'USING gin (search_vector)')
+
+
+def remove_search_vectors(apps, schema_editor) -> None:
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, _ in DOCUMENTS:
+        schema_editor.execute(
+            f'ALTER TABLE {table} DROP COLUMN search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, remove_search_vectors),
+    ]
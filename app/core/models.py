@@ -1,6 +1,114 @@
-from django.db import models
+from collections import defaultdict
+from typing import Iterable, Optional, Set, Tuple
+from django.db import connections, models, transaction
+from django.db.models import F, Prefetch
 from django.conf import settings
 from django.dispatch import receiver
+from django.utils import timezone
+
+
+class ProfileQuerySet(models.QuerySet):
+    '''Queryset for profile'''
+    def with_follow_graph(self):
+        '''
+        Load the user and the follow lists needed for serializing a profile
+        in a fixed number of queries.
+        '''
+        users = Profile.objects.select_related('user').order_by('id')
+        return self.select_related('user').prefetch_related(
+            Prefetch('follows', queryset=users),
+            Prefetch('following', queryset=users),
+        )
+
+    def with_follow_ids(self):
+        '''Load the user and only the ids of the follow lists'''
+        ids = Profile.objects.only('id').order_by('id')
+        return self.select_related('user').prefetch_related(
+            Prefetch('follows', queryset=ids),
+            Prefetch('following', queryset=ids),
+        )
+
+
+def viewer_prefetches(viewer: Optional[int], prefix: str = '') -> list:
+    '''
+    Prefetches of the reactions of the user `viewer` to the posts under
+    `prefix`, as `viewer_reactions`, and of the profile of the viewer
+    among the followers of their authors, as `viewer_follows`
+    '''
+    if viewer is None:
+        return []
+    return [
+        Prefetch(
+            f'{prefix}reactions',
+            queryset=Reaction.objects.filter(profile__user=viewer).only(
+                'post_id', 'kind'),
+            to_attr='viewer_reactions'),
+        Prefetch(
+            f'{prefix}profile__following',
+            queryset=Profile.objects.filter(user=viewer).only('id'),
+            to_attr='viewer_follows'),
+    ]
+
+
+class PostQuerySet(models.QuerySet):
+    '''Queryset for post'''
+    def with_related(self):
+        '''
+        Load the author, likers and dislikers of the posts along with
+        their follow lists in a fixed number of queries.
+        '''
+        users = Profile.objects.select_related('user').order_by('id')
+        reactions = Reaction.objects.select_related(
+            'profile__user').order_by('profile_id').prefetch_related(
+            Prefetch('profile__follows', queryset=users),
+            Prefetch('profile__following', queryset=users),
+        )
+        return self.select_related('profile__user').prefetch_related(
+            Prefetch('profile__follows', queryset=users),
+            Prefetch('profile__following', queryset=users),
+            Prefetch('reactions', queryset=reactions),
+        )
+
+    def with_summary(self):
+        '''Load the author and only the ids of the likers and dislikers'''
+        reactions = Reaction.objects.only(
+            'post_id', 'profile_id', 'kind').order_by('profile_id')
+        return self.select_related('profile__user').prefetch_related(
+            Prefetch('reactions', queryset=reactions),
+        )
+
+    def with_viewer(self, viewer: Optional[int]):
+        '''
+        Load the reaction of the user `viewer` to the posts and whether it
+        follows their authors, with one query each
+        '''
+        return self.prefetch_related(*viewer_prefetches(viewer))
+
+
+class CommentQuerySet(models.QuerySet):
+    '''Queryset for comment'''
+    def with_related(self):
+        '''
+        Load the author and the commented post of the comments
+        in a fixed number of queries.
+        '''
+        users = Profile.objects.select_related('user').order_by('id')
+        return self.select_related('profile__user').prefetch_related(
+            Prefetch('profile__follows', queryset=users),
+            Prefetch('profile__following', queryset=users),
+            Prefetch('post', queryset=Post.objects.with_related()),
+        )
+
+    def with_summary(self):
+        '''Load only the author of the comments'''
+        return self.select_related('profile__user')
+
+    def with_viewer(self, viewer: Optional[int]):
+        '''
+        Load the reaction of the user `viewer` to the commented posts and
+        whether it follows their authors, with one query each
+        '''
+        return self.prefetch_related(*viewer_prefetches(viewer, 'post__'))
 
 
 class Profile(models.Model):
@@ -12,28 +120,446 @@ class Profile(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
         related_name='profile')
     follows = models.ManyToManyField(
-        'self', symmetrical=False,
+        'self', symmetrical=False, through='Follow',
         blank=True, related_name='following')
+    follows_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
+
+    objects = ProfileQuerySet.as_manager()
 
     def __str__(self):
         return self.user.username
 
 
+class FollowQuerySet(models.QuerySet):
+    '''Queryset for follow'''
+    def follow(self, profile: Profile,
+               ids: Iterable[int]) -> Tuple[Set[int], Set[int]]:
+        '''
+        Make `profile` follow the profiles of `ids` with a single insert.
+        Counters and caches are updated by the `m2m_changed` receivers,
+        as when following with `Profile.follows.add`.
+        Return the ids of the existing profiles and of the newly followed.
+        '''
+        with transaction.atomic():
+            # Bulk changes of the follows of a profile wait for each other,
+            # so every new row is counted once
+            list(Profile.objects.select_for_update().filter(
+                pk=profile.pk).values_list('pk'))
+            found = set(Profile.objects.filter(pk__in=ids).values_list(
+                'id', flat=True))
+            followed = set(self.filter(
+                from_profile=profile, to_profile__in=found).values_list(
+                'to_profile', flat=True))
+            new = found - followed
+            if new:
+                self.bulk_create(
+                    [Follow(from_profile=profile, to_profile_id=pk)
+                     for pk in new],
+                    ignore_conflicts=True)
+                models.signals.m2m_changed.send(
+                    sender=Follow, instance=profile, action='post_add',
+                    reverse=False, model=Profile, pk_set=new, using=self.db)
+        return found, new
+
+    def unfollow(self, profile: Profile, ids: Iterable[int]) -> Set[int]:
+        '''
+        Make `profile` unfollow the profiles of `ids` with a single delete.
+        Return the ids of the unfollowed profiles.
+        '''
+        with transaction.atomic():
+            list(Profile.objects.select_for_update().filter(
+                pk=profile.pk).values_list('pk'))
+            removed = set(self.filter(
+                from_profile=profile, to_profile__in=ids).values_list(
+                'to_profile', flat=True))
+            if removed:
+                signal = {
+                    'sender': Follow, 'instance': profile, 'reverse': False,
+                    'model': Profile, 'pk_set': removed, 'using': self.db,
+                }
+                models.signals.m2m_changed.send(action='pre_remove', **signal)
+                self.filter(
+                    from_profile=profile, to_profile__in=removed).delete()
+                models.signals.m2m_changed.send(
+                    action='post_remove', **signal)
+        return removed
+
+
+class Follow(models.Model):
+    '''
+    Through model of `Profile.follows`.
+    The unique (from_profile, to_profile) index serves the follows of a
+    profile and the (to_profile, from_profile) index serves its followers.
+    '''
+    from_profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE,
+        related_name='+', db_index=False)
+    to_profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE,
+        related_name='+', db_index=False)
+
+    objects = FollowQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'core_profile_follows'
+        unique_together = [['from_profile', 'to_profile']]
+        indexes = [
+            models.Index(
+                fields=['to_profile', 'from_profile'],
+                name='core_follow_to_from_idx'),
+        ]
+
+
 class Post(models.Model):
     '''Model for post'''
     profile = models.ForeignKey(
-        Profile, on_delete=models.CASCADE, related_name='posts')
+        Profile, on_delete=models.CASCADE,
+        related_name='posts', db_index=False)
     post = models.CharField(max_length=512)
-    likes = models.ManyToManyField(Profile, related_name='likes')
-    dislikes = models.ManyToManyField(Profile, related_name='dislikes')
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'], name='core_post_created_idx'),
+            models.Index(
+                fields=['profile', '-created_at', '-id'],
+                name='core_post_profile_created_idx'),
+        ]
+
+    @property
+    def likes(self):
+        '''Profiles which like the post'''
+        return Profile.objects.filter(
+            reactions__post=self, reactions__kind=Reaction.LIKE)
+
+    @property
+    def dislikes(self):
+        '''Profiles which dislike the post'''
+        return Profile.objects.filter(
+            reactions__post=self, reactions__kind=Reaction.DISLIKE)
+
+
+class ReactionQuerySet(models.QuerySet):
+    '''Queryset for reaction'''
+    def react(self, post: Post, profile: Profile, kind: int) -> bool:
+        '''
+        Like or dislike a post, replacing any earlier reaction of the profile.
+        Return whether the reaction changed.
+        '''
+        return bool(self.react_many([post.pk], profile, kind)[1])
+
+    def react_many(self, ids: Iterable[int], profile: Profile,
+                   kind: int) -> Tuple[Set[int], Set[int]]:
+        '''
+        Like or dislike the posts of `ids`, replacing any earlier reactions
+        of the profile.
+        The reactions are written with a single upsert on the unique
+        (post, profile) constraint, so concurrent reactions of a profile
+        can't leave both a like and a dislike behind. On PostgreSQL, the
+        upsert reports the reactions it changed and counts them in the
+        same statement, see `react_upsert`. Elsewhere the row of the
+        profile is locked first, as a first reaction has no row to lock,
+        so concurrent reactions of a profile read the earlier ones and
+        count each change once.
+        The counters of hot posts are added to their shards rather than
+        to their rows, see `core.counters`.
+        Return the ids of the existing posts and of those whose reaction
+        changed.
+        '''
+        from core import counters
+        if connections[self.db].vendor == 'postgresql':
+            return self.react_upsert(ids, profile, kind)
+        with transaction.atomic():
+            list(Profile.objects.select_for_update().filter(
+                pk=profile.pk).values_list('pk'))
+            found = set(Post.objects.filter(pk__in=ids).values_list(
+                'id', flat=True))
+            previous = dict(self.filter(
+                post__in=found, profile=profile).values_list(
+                'post_id', 'kind'))
+            changed = {pk for pk in found if previous.get(pk) != kind}
+            if not changed:
+                return found, changed
+            self.bulk_create(
+                [Reaction(post_id=pk, profile=profile, kind=kind)
+                 for pk in changed],
+                update_conflicts=True,
+                unique_fields=['post', 'profile'],
+                update_fields=['kind'],
+            )
+            hot = counters.hot(changed)
+            replaced = defaultdict(set)
+            for pk in changed - hot:
+                replaced[previous.get(pk)].add(pk)
+            for old_kind, pks in replaced.items():
+                changes = {COUNTER_OF[kind]: F(COUNTER_OF[kind]) + 1}
+                if old_kind is not None:
+                    changes[COUNTER_OF[old_kind]] = \
+                        F(COUNTER_OF[old_kind]) - 1
+                Post.objects.filter(pk__in=pks).update(**changes)
+            # Hot posts are counted in their shards, sparing their rows
+            for pk in hot:
+                counts = {COUNTER_OF[kind]: 1}
+                if previous.get(pk) is not None:
+                    counts[COUNTER_OF[previous[pk]]] = -1
+                counters.add(pk, counts)
+        return found, changed
+
+    def react_upsert(self, ids: Iterable[int], profile: Profile,
+                     kind: int) -> Tuple[Set[int], Set[int]]:
+        '''
+        Like or dislike the posts of `ids` as `react_many` does, in a
+        single statement of PostgreSQL.
+        The upsert only updates the reactions of another kind, and returns
+        the rows it inserted or updated, which `xmax` tells apart: there
+        are two kinds, so an updated reaction was of the other kind. The
+        upsert waits for the concurrent reactions of the profile to the
+        same posts and sees what they wrote, so each change is counted
+        once without locking the profile.
+        The counters of the changed posts which aren't hot are updated in
+        the same statement.
+        '''
+        from core import counters
+        ids = list(ids)
+        hot = counters.hot_among(ids)
+        other = Reaction.DISLIKE if kind == Reaction.LIKE else Reaction.LIKE
+        counter, other_counter = COUNTER_OF[kind], COUNTER_OF[other]
+        reaction_table = Reaction._meta.db_table
+        post_table = Post._meta.db_table
+        sql = f'''
+            WITH upserted AS (
+                INSERT INTO {reaction_table} (post_id, profile_id, kind)
+                SELECT id, %(profile)s, %(kind)s FROM {post_table}
+                WHERE id = ANY(%(ids)s::bigint[])
+                ON CONFLICT (post_id, profile_id) DO UPDATE
+                SET kind = EXCLUDED.kind
+                WHERE {reaction_table}.kind <> EXCLUDED.kind
+                RETURNING post_id, xmax = 0 AS inserted
+            ), counted AS (
+                UPDATE {post_table}
+                SET {counter} = {counter} + 1,
+                    {other_counter} =
+                        {other_counter} - (NOT upserted.inserted)::int
+                FROM upserted
+                WHERE {post_table}.id = upserted.post_id
+                AND NOT {post_table}.id = ANY(%(hot)s::bigint[])
+            )
+            SELECT {post_table}.id, upserted.inserted FROM {post_table}
+            LEFT JOIN upserted ON upserted.post_id = {post_table}.id
+            WHERE {post_table}.id = ANY(%(ids)s::bigint[])
+        '''
+        with transaction.atomic(using=self.db):
+            with connections[self.db].cursor() as cursor:
+                cursor.execute(sql, {
+                    'profile': profile.pk, 'kind': kind,
+                    'ids': ids, 'hot': list(hot),
+                })
+                rows = cursor.fetchall()
+            found = {pk for pk, _ in rows}
+            # Whether the changed reactions were inserted, by post
+            changed = {
+                pk: inserted for pk, inserted in rows if inserted is not None}
+            # Hot posts are counted in their shards, sparing their rows
+            for pk in hot & changed.keys():
+                counts = {counter: 1}
+                if not changed[pk]:
+                    counts[other_counter] = -1
+                counters.add(pk, counts)
+        counters.count(changed)
+        return found, set(changed)
+
+
+class Reaction(models.Model):
+    '''Model for the like or dislike of a post by a profile'''
+    LIKE = 1
+    DISLIKE = -1
+    KINDS = [
+        (LIKE, 'Like'),
+        (DISLIKE, 'Dislike'),
+    ]
+
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='reactions', db_index=False)
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name='reactions')
+    kind = models.SmallIntegerField(choices=KINDS)
+
+    objects = ReactionQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'profile'], name='core_reaction_unique'),
+        ]
+
+
+COUNTER_OF = {
+    Reaction.LIKE: 'like_count',
+    Reaction.DISLIKE: 'dislike_count',
+}
+
+
+class CounterShard(models.Model):
+    '''
+    Model for a stripe of the reaction counters of a hot post.
+    The reactions of a hot post add to one of its shards at random rather
+    than to its own row, and `core.counters` rolls the shards up into the
+    counters of the post later.
+    '''
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='counter_shards', db_index=False)
+    shard = models.PositiveSmallIntegerField()
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'shard'], name='core_counter_shard_unique'),
+        ]
 
 
 class Comment(models.Model):
     '''Model for comment'''
     profile = models.ForeignKey(Profile, on_delete=models.CASCADE)
     post = models.ForeignKey(
-        Post, on_delete=models.CASCADE, related_name='comments')
+        Post, on_delete=models.CASCADE,
+        related_name='comments', db_index=False)
+    comment = models.CharField(max_length=128)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = CommentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='core_comment_created_idx'),
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                name='core_comment_post_created_idx'),
+        ]
+
+
+class ArchivedPost(models.Model):
+    '''
+    Model for a post moved out of `Post` by `core.archive` once it got old.
+    It keeps the id of the post, and the ids of the profiles which liked
+    and disliked it in place of its reactions.
+    '''
+    id = models.BigIntegerField(primary_key=True)
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE,
+        related_name='archived_posts', db_index=False)
+    post = models.CharField(max_length=512)
+    likes = models.JSONField(default=list)
+    dislikes = models.JSONField(default=list)
+    like_count = models.IntegerField(default=0)
+    dislike_count = models.IntegerField(default=0)
+    comment_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='core_archived_post_time_idx'),
+            models.Index(
+                fields=['profile', '-created_at', '-id'],
+                name='core_archived_post_prof_idx'),
+        ]
+
+
+class ArchivedComment(models.Model):
+    '''Model for a comment moved out of `Comment` along with its post'''
+    id = models.BigIntegerField(primary_key=True)
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name='archived_comments')
+    post = models.ForeignKey(
+        ArchivedPost, on_delete=models.CASCADE,
+        related_name='comments', db_index=False)
     comment = models.CharField(max_length=128)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='core_archived_comment_time_idx'),
+            models.Index(
+                fields=['post', '-created_at', '-id'],
+                name='core_archived_comment_post_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    '''
+    Model for an entry of the home timeline of a profile.
+    Posts are pushed to the timelines of the followers of their author
+    when they are created, so reading a timeline is a range scan of
+    the (profile, post) index.
+    '''
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE,
+        related_name='timeline', db_index=False)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['profile', 'post'], name='core_timeline_entry_unique'),
+        ]
+
+
+class Job(models.Model):
+    '''
+    Model for a background job of `core.jobs`, queued in the transaction
+    of the write it follows up.
+    A pending job with a key keeps other jobs with the same key from
+    being queued until it's taken by a worker.
+    '''
+    PENDING = 0
+    RUNNING = 1
+    FAILED = 2
+    STATUSES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=64)
+    kwargs = models.JSONField(default=dict)
+    key = models.CharField(max_length=255, null=True, blank=True)
+    status = models.SmallIntegerField(choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status=0),  # Pending
+                name='core_job_pending_key_unique'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='core_job_status_run_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
 
 
 @receiver(models.signals.post_save, sender=settings.AUTH_USER_MODEL)
@@ -43,17 +569,70 @@ def create_profile(instance, created, **kwargs) -> None:
         profile = Profile(user=instance)
         profile.save()
 
-@receiver(models.signals.m2m_changed, sender=Post.likes.through)
-@receiver(models.signals.m2m_changed, sender=Post.dislikes.through)
-def validate_like_dislike(sender, instance, action, pk_set, **kwargs) -> None:
-    '''Function for validating likes and dislikes of a post'''
-    if action == 'pre_add':
-        '''pre_add: Sent before one or more objects are added to the relation.'''
-        if sender == Post.dislikes.through and \
-            instance.likes.filter(pk__in=pk_set).exists():
-            '''Like is changed to dislike'''
-            instance.likes.remove(*pk_set)
-        elif sender == Post.likes.through and \
-            instance.dislikes.filter(pk__in=pk_set).exists():
-            '''Dislike is changed to like'''
-            instance.dislikes.remove(*pk_set)
\ No newline at end of file
+
+COUNTERS = {
+    Profile.follows.through: (
+        Profile.follows.field, 'follows_count', 'following_count'),
+}
+
+
+@receiver(models.signals.m2m_changed, sender=Profile.follows.through)
+def update_counters(
+        sender, instance, action, reverse, model, pk_set, **kwargs) -> None:
+    '''
+    Function for keeping the counters of a relation in step with its rows.
+    Only the rows which are really added or removed are counted, and the
+    counters are changed with F-expressions in the transaction of the change.
+    '''
+    if action not in ('post_add', 'pre_remove', 'pre_clear'):
+        return
+    field, source_counter, target_counter = COUNTERS[sender]
+    source = field.m2m_field_name()
+    target = field.m2m_reverse_field_name()
+    if reverse:
+        source, target = target, source
+        source_counter, target_counter = target_counter, source_counter
+
+    if action == 'post_add':
+        # `pk_set` only contains the objects which weren't related yet
+        pks, step = pk_set, 1
+    else:
+        rows = sender.objects.filter(**{source: instance.pk})
+        if action == 'pre_remove':
+            rows = rows.filter(**{f'{target}__in': pk_set})
+        pks, step = set(rows.values_list(target, flat=True)), -1
+    if not pks:
+        return
+
+    if source_counter is not None:
+        type(instance).objects.filter(pk=instance.pk).update(
+            **{source_counter: F(source_counter) + step * len(pks)})
+    if target_counter is not None:
+        model.objects.filter(pk__in=pks).update(
+            **{target_counter: F(target_counter) + step})
+
+
+@receiver(models.signals.post_save, sender=Comment)
+def count_comment(instance, created, **kwargs) -> None:
+    '''Increase the comment count of a post when it's commented'''
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1)
+
+
+def deleted_with_post(origin) -> bool:
+    '''Check whether the `origin` of a deletion of comments is their post'''
+    if isinstance(origin, models.QuerySet):
+        return origin.model is Post
+    return isinstance(origin, Post)
+
+
+@receiver(models.signals.post_delete, sender=Comment)
+def uncount_comment(instance, origin=None, **kwargs) -> None:
+    '''
+    Decrease the comment count of a post when a comment is deleted, unless
+    the post is deleted with it
+    '''
+    if not deleted_with_post(origin):
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') - 1)
@@ -0,0 +1,214 @@
+'''
+Full-text search of posts and comments.
+On PostgreSQL they have a generated `search_vector` column with a GIN
+index, kept up to date by the database on every write, and a search is
+an index lookup ranked by `ts_rank`.
+Other databases fall back on an inverted index held in the memory of the
+process. It's built from the database by the first search, then updated
+as posts and comments are saved and deleted.
+Either way a search returns at most `SEARCH_MAX_RESULTS` hits, best first.
+'''
+import heapq
+import math
+import re
+import threading
+from collections import Counter, defaultdict, namedtuple
+from typing import Iterable, List
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models import BooleanField, CharField, FloatField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+from django.db.utils import OperationalError
+from django.dispatch import receiver
+from core.models import (
+    Post,
+    Comment,
+)
+
+# Text search configuration of the `search_vector` columns
+CONFIG = 'english'
+
+# Searchable models and their text field by kind
+DOCUMENTS = {
+    'post': (Post, 'post'),
+    'comment': (Comment, 'comment'),
+}
+
+Hit = namedtuple('Hit', ['kind', 'id', 'rank'])
+
+TOKEN = re.compile(r'\w+')
+
+
+class SearchTimeout(Exception):
+    '''Raised when a search runs longer than `SEARCH_TIMEOUT`'''
+
+
+def tokenize(text: str) -> List[str]:
+    '''Split a text into lowercase terms'''
+    return TOKEN.findall(text.lower())
+
+
+def search(query: str, kinds: Iterable[str] = tuple(DOCUMENTS),
+           limit: int = None) -> List[Hit]:
+    '''
+    Search the documents of `kinds` containing every term of `query`.
+    Return at most `limit` hits ranked best first, ties going to the newest.
+    '''
+    kinds = set(kinds)
+    if limit is None:
+        limit = getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+    if connection.vendor == 'postgresql':
+        return search_vectors(query, kinds, limit)
+    return index.search(query, kinds, limit)
+
+
+def search_vectors(query: str, kinds: set, limit: int) -> List[Hit]:
+    '''
+    Search the `search_vector` columns with a single union query.
+    The query is cancelled after `SEARCH_TIMEOUT` milliseconds.
+    '''
+    tsquery = f"websearch_to_tsquery('{CONFIG}', %s)"
+    querysets = [
+        model.objects.filter(RawSQL(
+            f'search_vector @@ {tsquery}', [query],
+            output_field=BooleanField())).annotate(
+            kind=Value(kind, output_field=CharField()),
+            rank=RawSQL(
+                f'ts_rank(search_vector, {tsquery})', [query],
+                output_field=FloatField()),
+        ).values_list('kind', 'id', 'rank')
+        for kind, (model, _) in DOCUMENTS.items() if kind in kinds
+    ]
+    if not querysets:
+        return []
+    # The timeout is set on the connection the search is routed to
+    alias = router.db_for_read(Post)
+    union = querysets[0].union(*querysets[1:], all=True).using(alias)
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute(
+                'SET LOCAL statement_timeout = %s',
+                [getattr(settings, 'SEARCH_TIMEOUT', 200)])
+        try:
+            rows = list(union.order_by('-rank', '-id', 'kind')[:limit])
+        except OperationalError as error:
+            # query_canceled
+            if getattr(error.__cause__, 'pgcode', None) == '57014':
+                raise SearchTimeout() from error
+            raise
+    return [Hit(*row) for row in rows]
+
+
+class InvertedIndex:
+    '''
+    Inverted index of the terms of the posts and comments.
+    Every term maps to its frequency in each document of a kind containing
+    it, by id. Hits are ranked by the sum of the tf-idf of the terms of the
+    query. Postings only hold integers, which the garbage collector doesn't
+    track, so a large index doesn't slow down the collections.
+    '''
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        '''Drop the index, which is rebuilt by the next search'''
+        with self.lock:
+            self.loaded = False
+            self.postings = {kind: defaultdict(dict) for kind in DOCUMENTS}
+            self.terms = {kind: {} for kind in DOCUMENTS}
+
+    def load(self) -> None:
+        '''Index every post and comment unless it's done already'''
+        with self.lock:
+            if self.loaded:
+                return
+            for kind, (model, field) in DOCUMENTS.items():
+                rows = model.objects.values_list('id', field)
+                for pk, text in rows.iterator(chunk_size=2000):
+                    self._add(kind, pk, text)
+            self.loaded = True
+
+    def add(self, kind: str, pk: int, text: str) -> None:
+        '''Index or reindex a document'''
+        with self.lock:
+            if self.loaded:
+                self._remove(kind, pk)
+                self._add(kind, pk, text)
+
+    def remove(self, kind: str, pk: int) -> None:
+        '''Drop a document from the index'''
+        with self.lock:
+            if self.loaded:
+                self._remove(kind, pk)
+
+    def _add(self, kind: str, pk: int, text: str) -> None:
+        frequencies = Counter(tokenize(text))
+        postings = self.postings[kind]
+        for term, frequency in frequencies.items():
+            postings[term][pk] = frequency
+        self.terms[kind][pk] = tuple(frequencies)
+
+    def _remove(self, kind: str, pk: int) -> None:
+        postings = self.postings[kind]
+        for term in self.terms[kind].pop(pk, ()):
+            del postings[term][pk]
+            if not postings[term]:
+                del postings[term]
+
+    def search(self, query: str, kinds: set, limit: int) -> List[Hit]:
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        self.load()
+        ranked = []
+        with self.lock:
+            total = sum(map(len, self.terms.values()))
+            idf = {
+                term: math.log(1 + total / max(1, sum(
+                    len(postings.get(term, ())) for postings in
+                    self.postings.values())))
+                for term in terms
+            }
+            for kind in kinds & set(DOCUMENTS):
+                postings = sorted(
+                    ((self.postings[kind].get(term, {}), idf[term])
+                     for term in terms), key=lambda item: len(item[0]))
+                # Walk the rarest term and look the others up
+                (rarest, weight), others = postings[0], postings[1:]
+                for pk, frequency in rarest.items():
+                    score = frequency * weight
+                    for other, other_weight in others:
+                        other_frequency = other.get(pk)
+                        if other_frequency is None:
+                            break
+                        score += other_frequency * other_weight
+                    else:
+                        ranked.append((-score, -pk, kind))
+        return [
+            Hit(kind, -pk, -score)
+            for score, pk, kind in heapq.nsmallest(limit, ranked)
+        ]
+
+
+index = InvertedIndex()
+
+KIND_OF = {model: kind for kind, (model, _) in DOCUMENTS.items()}
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def index_document(sender, instance, using, **kwargs) -> None:
+    '''Reindex a saved post or comment, PostgreSQL does it by itself'''
+    if connections[using].vendor != 'postgresql':
+        kind = KIND_OF[sender]
+        index.add(kind, instance.pk, getattr(instance, DOCUMENTS[kind][1]))
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def unindex_document(sender, instance, using, **kwargs) -> None:
+    '''Drop a deleted post or comment from the index'''
+    if connections[using].vendor != 'postgresql':
+        index.remove(KIND_OF[sender], instance.pk)
@@ -0,0 +1,118 @@
+'''
+Tests for the archive of old posts
+'''
+import datetime
+from io import StringIO
+from typing import Type
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from core import archive, feed
+from core.models import (
+    Post,
+    Reaction,
+    Comment,
+    TimelineEntry,
+    ArchivedPost,
+    ArchivedComment,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating new user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+        }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+def days_ago(days: int) -> datetime.datetime:
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+class ArchiveTests(TestCase):
+    '''Tests for moving old posts and their comments to the archive'''
+    def setUp(self) -> None:
+        self.user = create_user()
+        self.other = create_user(username='test_1')
+        self.post = Post.objects.create(
+            profile=self.user.profile, post='Old', created_at=days_ago(40))
+        self.recent = Post.objects.create(
+            profile=self.user.profile, post='Recent')
+
+    def test_archive(self) -> None:
+        '''Test that old posts are moved with their reactions and comments'''
+        feed.fan_out(self.post)
+        Reaction.objects.react(self.post, self.user.profile, Reaction.LIKE)
+        Reaction.objects.react(self.post, self.other.profile, Reaction.LIKE)
+        comment = Comment.objects.create(
+            profile=self.other.profile, post=self.post, comment='Comment',
+            created_at=days_ago(39))
+        self.assertEqual(archive.archive(30), 1)
+
+        self.assertEqual(list(Post.objects.all()), [self.recent])
+        self.assertFalse(Reaction.objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(TimelineEntry.objects.filter(post=self.post.id))
+        archived = ArchivedPost.objects.get()
+        self.assertEqual(archived.id, self.post.id)
+        self.assertEqual(archived.post, 'Old')
+        self.assertEqual(archived.created_at, self.post.created_at)
+        self.assertEqual(
+            archived.likes, [self.user.profile.id, self.other.profile.id])
+        self.assertEqual(archived.dislikes, [])
+        self.assertEqual(archived.like_count, 2)
+        self.assertEqual(archived.comment_count, 1)
+        archived_comment = ArchivedComment.objects.get()
+        self.assertEqual(archived_comment.id, comment.id)
+        self.assertEqual(archived_comment.post_id, self.post.id)
+        self.assertEqual(archived_comment.created_at, comment.created_at)
+
+    def test_recently_commented_post_kept(self) -> None:
+        '''Test that old posts commented recently stay in the hot tables'''
+        Comment.objects.create(
+            profile=self.other.profile, post=self.post, comment='Comment')
+        self.assertEqual(archive.archive(30), 0)
+        self.assertFalse(ArchivedPost.objects.exists())
+
+    def test_batches(self) -> None:
+        '''Test that posts are moved a batch at a time'''
+        for _ in range(4):
+            Post.objects.create(
+                profile=self.user.profile, post='Old',
+                created_at=days_ago(31))
+        self.assertEqual(archive.archive(30, batch_size=2), 5)
+        self.assertEqual(ArchivedPost.objects.count(), 5)
+        self.assertEqual(list(Post.objects.all()), [self.recent])
+
+    @override_settings(JOBS_EAGER=False, COUNTER_SHARDS=4,
+                       HOT_POST_REACTIONS=0)
+    def test_sharded_counters_rolled_up(self) -> None:
+        '''Test that the shards of a hot post are counted when it's moved'''
+        cache.clear()
+        self.addCleanup(cache.clear)
+        Reaction.objects.react(self.post, self.user.profile, Reaction.LIKE)
+        archive.archive(30)
+        self.assertEqual(ArchivedPost.objects.get().like_count, 1)
+
+    @override_settings(ARCHIVE_AFTER_DAYS=30)
+    def test_command(self) -> None:
+        '''Test for archiving with the management command'''
+        for options in ({}, {'days': 0}):
+            out = StringIO()
+            call_command('archive_posts', stdout=out, **options)
+            self.assertIn('1 posts archived', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+    def test_command_disabled(self) -> None:
+        '''Test that the command asks for the age of archived posts'''
+        with self.assertRaises(CommandError):
+            call_command('archive_posts')
@@ -0,0 +1,86 @@
+'''
+Tests for the management commands
+1. Reconcile counters
+'''
+from io import StringIO
+from typing import Type
+from django.test import TestCase, override_settings
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from core.models import (
+    Profile,
+    Post,
+    Reaction,
+    Comment,
+    CounterShard,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating new user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+        }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class ReconcileCountersTests(TestCase):
+    '''Tests for the `reconcile_counters` command'''
+    def test_reconcile_counters(self) -> None:
+        '''Test for fixing counters which drifted from their rows'''
+        user_1 = create_user()
+        user_2 = create_user(username='test2')
+        user_1.profile.follows.add(user_2.profile)
+        post = Post.objects.create(profile=user_1.profile, post='Post')
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
+        Reaction.objects.react(post, user_2.profile, Reaction.DISLIKE)
+        Comment.objects.create(
+            profile=user_2.profile, post=post, comment='Comment')
+        Post.objects.update(like_count=5, dislike_count=0, comment_count=3)
+        Profile.objects.update(follows_count=0, following_count=7)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Post.like_count: 1 fixed', out.getvalue())
+        self.assertIn('Profile.following_count: 2 fixed', out.getvalue())
+
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.dislike_count, 1)
+        self.assertEqual(post.comment_count, 1)
+        user_1.profile.refresh_from_db()
+        user_2.profile.refresh_from_db()
+        self.assertEqual(user_1.profile.follows_count, 1)
+        self.assertEqual(user_1.profile.following_count, 0)
+        self.assertEqual(user_2.profile.follows_count, 0)
+        self.assertEqual(user_2.profile.following_count, 1)
+
+    def test_reconcile_nothing(self) -> None:
+        '''Test that counters in step with their rows are left alone'''
+        user = create_user()
+        post = Post.objects.create(profile=user.profile, post='Post')
+        Reaction.objects.react(post, user.profile, Reaction.LIKE)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Post.like_count: 0 fixed', out.getvalue())
+
+    @override_settings(JOBS_EAGER=False, COUNTER_SHARDS=4,
+                       HOT_POST_REACTIONS=0)
+    def test_reconcile_sharded_counters(self) -> None:
+        '''Test that the shards of hot posts are rolled up, not recounted'''
+        user = create_user()
+        post = Post.objects.create(profile=user.profile, post='Post')
+        Reaction.objects.react(post, user.profile, Reaction.LIKE)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Post shards: 1 rolled up', out.getvalue())
+        self.assertIn('Post.like_count: 0 fixed', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertFalse(CounterShard.objects.exclude(like_count=0).exists())
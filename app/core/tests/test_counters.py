@@ -0,0 +1,134 @@
+'''
+Tests for the sharded reaction counters of hot posts
+'''
+from typing import Type
+from unittest import mock
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from core import counters, jobs
+from core.models import (
+    Post,
+    Reaction,
+    CounterShard,
+    Job,
+)
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating new user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+        }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+@override_settings(JOBS_EAGER=False, COUNTER_SHARDS=4, HOT_POST_REACTIONS=2,
+                   HOT_POST_WINDOW=10)
+class CounterShardTests(TestCase):
+    '''Tests for counting the reactions of hot posts in shards'''
+    def setUp(self) -> None:
+        cache.clear()
+        self.profiles = [
+            create_user(username=f'test_{i}').profile for i in range(5)]
+        self.post = Post.objects.create(profile=self.profiles[0], post='Post')
+
+    def tearDown(self) -> None:
+        cache.clear()
+
+    def react(self, kind: int = Reaction.LIKE, profiles=None,
+              post: Post = None) -> None:
+        for profile in profiles or self.profiles:
+            Reaction.objects.react(post or self.post, profile, kind)
+
+    def sharded(self, counter: str) -> int:
+        return CounterShard.objects.filter(post=self.post).aggregate(
+            total=Sum(counter))['total'] or 0
+
+    def roll_up(self) -> None:
+        '''Helper method for running the roll-ups once they're due'''
+        Job.objects.update(run_at=timezone.now())
+        jobs.work()
+
+    def test_hot_post_sharded(self) -> None:
+        '''Test that reactions past the threshold are counted in shards'''
+        self.react()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 2)
+        self.assertEqual(self.sharded('like_count'), 3)
+        self.assertEqual(
+            list(Job.objects.values_list('name', flat=True)),
+            ['counters.roll_up'])
+
+    def test_roll_up(self) -> None:
+        '''Test that the roll-up adds the shards to the counters'''
+        self.react()
+        self.react(Reaction.DISLIKE, self.profiles[:2])
+        self.roll_up()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 3)
+        self.assertEqual(self.post.dislike_count, 2)
+        self.assertEqual(self.sharded('like_count'), 0)
+        self.assertEqual(self.sharded('dislike_count'), 0)
+        self.assertFalse(Job.objects.exists())
+
+    def test_roll_up_nothing(self) -> None:
+        '''Test rolling up a post without shards'''
+        self.assertFalse(counters.roll_up(self.post.id))
+
+    def test_roll_up_sends_signal(self) -> None:
+        '''Test that roll-ups tell which post they rolled up'''
+        self.react()
+        receiver = mock.Mock()
+        counters.rolled_up.connect(receiver)
+        self.addCleanup(counters.rolled_up.disconnect, receiver)
+        self.roll_up()
+        receiver.assert_called_once_with(
+            signal=counters.rolled_up, sender=CounterShard,
+            post_id=self.post.id)
+
+    def test_cold_posts_not_sharded(self) -> None:
+        '''Test that other posts are counted in their rows'''
+        self.react()
+        other = Post.objects.create(profile=self.profiles[0], post='Other')
+        self.react(profiles=self.profiles[:2], post=other)
+        other.refresh_from_db()
+        self.assertEqual(other.like_count, 2)
+        self.assertFalse(CounterShard.objects.filter(post=other).exists())
+
+    def test_bulk_reactions(self) -> None:
+        '''Test that bulk reactions shard the hot posts only'''
+        self.react(profiles=self.profiles[:3])
+        other = Post.objects.create(profile=self.profiles[0], post='Other')
+        Reaction.objects.react_many(
+            [self.post.id, other.id], self.profiles[3], Reaction.LIKE)
+        self.assertEqual(self.sharded('like_count'), 2)
+        other.refresh_from_db()
+        self.assertEqual(other.like_count, 1)
+
+    def test_post_cools_down(self) -> None:
+        '''Test that posts are counted in their rows once they cool down'''
+        with mock.patch('core.counters.time.time', return_value=1000.0):
+            self.react(profiles=self.profiles[:3])
+        self.assertEqual(self.sharded('like_count'), 1)
+        cache.delete(counters.hot_key(self.post.id))
+        with mock.patch('core.counters.time.time', return_value=1010.0):
+            self.react(profiles=self.profiles[3:])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 4)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_jobs(self) -> None:
+        '''Test that counters aren't sharded when jobs are eager'''
+        self.react()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 5)
+        self.assertFalse(CounterShard.objects.exists())
@@ -0,0 +1,74 @@
+'''
+Tests for the queries of the follow graph
+'''
+from typing import Type
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from core import graph
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating new user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+        }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class GraphTests(TestCase):
+    '''Tests for mutuals, suggestions and relationships'''
+    def setUp(self) -> None:
+        self.profile = create_user().profile
+        self.a, self.b, self.c, self.d, self.e = [
+            create_user(username=f'test_{name}').profile
+            for name in 'abcde'
+        ]
+        # The profile follows a, b and c, and is followed by a and d
+        self.profile.follows.add(self.a, self.b, self.c)
+        self.a.follows.add(self.profile, self.d, self.e)
+        self.b.follows.add(self.d, self.c)
+        self.c.follows.add(self.d)
+        self.d.follows.add(self.profile)
+
+    def test_mutuals(self) -> None:
+        '''Test getting the profiles following back'''
+        self.assertEqual(list(graph.mutuals(self.profile)), [self.a])
+        self.assertEqual(list(graph.mutuals(self.d)), [])
+
+    def test_suggestions(self) -> None:
+        '''Test ranking the profiles followed by the follows'''
+        self.assertEqual(
+            graph.suggestions(self.profile, 10),
+            [(self.d.id, 3), (self.e.id, 1)])
+        self.assertEqual(
+            graph.suggestions(self.profile, 1), [(self.d.id, 3)])
+
+    @override_settings(GRAPH_SUGGESTION_SOURCES=1)
+    def test_suggestions_sources(self) -> None:
+        '''Test walking only the latest follows'''
+        self.assertEqual(
+            graph.suggestions(self.profile, 10), [(self.d.id, 1)])
+
+    def test_suggestions_exclude_followed(self) -> None:
+        '''Test that followed profiles and the profile aren't suggested'''
+        self.profile.follows.add(self.d)
+        self.assertEqual(
+            graph.suggestions(self.profile, 10), [(self.e.id, 1)])
+
+    def test_relationships(self) -> None:
+        '''Test checking many follows at once'''
+        with self.assertNumQueries(2):
+            relationships = graph.relationships(
+                self.profile, [self.a.id, self.b.id, self.d.id, self.e.id])
+        self.assertEqual(relationships, {
+            self.a.id: {'follows': True, 'followed_by': True},
+            self.b.id: {'follows': True, 'followed_by': False},
+            self.d.id: {'follows': False, 'followed_by': True},
+            self.e.id: {'follows': False, 'followed_by': False},
+        })
@@ -0,0 +1,139 @@
+'''
+Tests for the background jobs
+'''
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from core import jobs
+from core.models import Job
+
+# Calls of the tasks of the tests
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(value) -> None:
+    CALLS.append(value)
+
+
+@jobs.task('tests.fail')
+def fail(value) -> None:
+    raise ValueError(value)
+
+
+@override_settings(JOBS_EAGER=False, JOBS_RETRY_DELAY=0)
+class JobTests(TestCase):
+    '''Tests for queueing and running jobs'''
+    def setUp(self) -> None:
+        CALLS.clear()
+
+    def test_enqueue(self) -> None:
+        '''Test that jobs are only run by the workers'''
+        jobs.enqueue('tests.record', value=[1, 'a'])
+        self.assertEqual(CALLS, [])
+        self.assertEqual(jobs.work(), 1)
+        self.assertEqual(CALLS, [[1, 'a']])
+        self.assertFalse(Job.objects.exists())
+        self.assertEqual(jobs.work(), 0)
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager(self) -> None:
+        '''Test running jobs as soon as they're queued'''
+        jobs.enqueue('tests.record', value=(1, 2))
+        self.assertEqual(CALLS, [[1, 2]])
+        self.assertFalse(Job.objects.exists())
+
+    def test_unserializable_arguments(self) -> None:
+        '''Test that arguments must be JSON'''
+        with self.assertRaises(TypeError):
+            jobs.enqueue('tests.record', value=object())
+
+    def test_unknown_task(self) -> None:
+        '''Test queueing a task which isn't registered'''
+        with self.assertRaises(KeyError):
+            jobs.enqueue('tests.unknown')
+
+    def test_idempotency_key(self) -> None:
+        '''Test that a pending job keeps jobs with its key from queueing'''
+        jobs.enqueue('tests.record', key='a', value=1)
+        jobs.enqueue('tests.record', key='a', value=2)
+        jobs.enqueue('tests.record', key='b', value=3)
+        jobs.enqueue('tests.record', value=4)
+        jobs.enqueue('tests.record', value=5)
+        jobs.work()
+        self.assertEqual(CALLS, [1, 3, 4, 5])
+
+    def test_key_queued_while_running(self) -> None:
+        '''Test that a key can be queued again once its job is taken'''
+        jobs.enqueue('tests.record', key='a', value=1)
+        taken = jobs.claim(10)
+        jobs.enqueue('tests.record', key='a', value=2)
+        for job in taken:
+            jobs.run(job)
+        jobs.work()
+        self.assertEqual(CALLS, [1, 2])
+
+    def test_batches(self) -> None:
+        '''Test that workers take due jobs in order, a batch at a time'''
+        for value in range(5):
+            jobs.enqueue('tests.record', value=value)
+        self.assertEqual(jobs.work(2), 2)
+        self.assertEqual(CALLS, [0, 1])
+        self.assertEqual(jobs.work(10), 3)
+        self.assertEqual(CALLS, [0, 1, 2, 3, 4])
+
+    @override_settings(JOBS_MAX_ATTEMPTS=3)
+    def test_retries(self) -> None:
+        '''Test that failed jobs are retried, then given up on'''
+        jobs.enqueue('tests.fail', value='boom')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            for _ in range(3):
+                self.assertEqual(jobs.work(), 1)
+        self.assertEqual(jobs.work(), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+        self.assertIn('ValueError: boom', job.error)
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_retry_delay(self) -> None:
+        '''Test that failed jobs wait before being retried'''
+        jobs.enqueue('tests.fail', value='boom')
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.work()
+        self.assertEqual(jobs.work(), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertGreater(job.run_at, timezone.now())
+
+    def test_failed_job_effects_rolled_back(self) -> None:
+        '''Test that the writes of a failed job are rolled back'''
+        def write_and_fail(value) -> None:
+            Job.objects.create(name='tests.record', run_at=timezone.now())
+            raise ValueError(value)
+
+        with mock.patch.dict(jobs.TASKS, {'tests.fail': write_and_fail}):
+            jobs.enqueue('tests.fail', value='boom')
+            with self.assertLogs('core.jobs', 'ERROR'):
+                jobs.work()
+        self.assertEqual(Job.objects.count(), 1)
+
+    @override_settings(JOBS_LEASE=-1)
+    def test_abandoned_job_taken_again(self) -> None:
+        '''Test that jobs of workers which died are taken again'''
+        jobs.enqueue('tests.record', value=1)
+        jobs.claim(10)
+        self.assertEqual(jobs.work(), 1)
+        self.assertEqual(CALLS, [1])
+
+    def test_runjobs(self) -> None:
+        '''Test the worker command running the due jobs'''
+        for value in range(3):
+            jobs.enqueue('tests.record', value=value)
+        out = StringIO()
+        call_command('runjobs', once=True, batch_size=2, verbosity=2,
+                     stdout=out)
+        self.assertEqual(CALLS, [0, 1, 2])
+        self.assertEqual(out.getvalue(), '2 jobs taken\n1 jobs taken\n')
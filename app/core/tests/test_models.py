@@ -9,14 +9,23 @@ Tests which are done to the models include
     b. Delete post
     c. Like/Unlike post
     d. Comment on post
+
+3. Counters
+    a. Like/Dislike counts
+    b. Comment count
+    c. Follow counts
 '''
 from typing import Type
+from unittest import mock, skipIf, skipUnless
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AbstractBaseUser
 from core.models import (
     Profile,
     Post,
+    Reaction,
     Comment
 )
 
@@ -110,8 +119,8 @@ class PostModelTests(TestCase):
         user_1 = create_user(username='user1')
         user_2 = create_user(username='user2')
         post = create_post()
-        post.likes.add(user_1.profile)
-        post.likes.add(user_2.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
+        Reaction.objects.react(post, user_2.profile, Reaction.LIKE)
         self.assertEqual(post.likes.count(), 2)
         self.assertIn(user_1.profile, post.likes.all())
         self.assertIn(user_2.profile, post.likes.all())
@@ -121,8 +130,8 @@ class PostModelTests(TestCase):
         user_1 = create_user(username='user1')
         user_2 = create_user(username='user2')
         post = create_post()
-        post.dislikes.add(user_1.profile)
-        post.dislikes.add(user_2.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.DISLIKE)
+        Reaction.objects.react(post, user_2.profile, Reaction.DISLIKE)
         self.assertEqual(post.dislikes.count(), 2)
         self.assertIn(user_1.profile, post.dislikes.all())
         self.assertIn(user_2.profile, post.dislikes.all())
@@ -131,9 +140,9 @@ class PostModelTests(TestCase):
         '''Test for liking then unliking a post'''
         user_1 = create_user(username='user')
         post = create_post()
-        post.likes.add(user_1.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
         self.assertEqual(post.likes.count(), 1)
-        post.dislikes.add(user_1.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.DISLIKE)
         self.assertEqual(post.dislikes.count(), 1)
         self.assertEqual(post.likes.count(), 0)
 
@@ -141,9 +150,9 @@ class PostModelTests(TestCase):
         '''Test for unliking the liking a post'''
         user_1 = create_user(username='user1')
         post = create_post()
-        post.dislikes.add(user_1.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.DISLIKE)
         self.assertEqual(post.dislikes.count(), 1)
-        post.likes.add(user_1.profile)
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
         self.assertEqual(post.likes.count(), 1)
         self.assertEqual(post.dislikes.count(), 0)
 
@@ -158,4 +167,130 @@ class PostModelTests(TestCase):
         )
         self.assertEqual(post.comments.count(), 1)
         self.assertIn(comment, post.comments.all())
-        self.assertEqual(user_1.username, comment.profile.user.username)
\ No newline at end of file
+        self.assertEqual(user_1.username, comment.profile.user.username)
+
+
+class CounterTests(TestCase):
+    '''Tests for the denormalized counters'''
+    def test_like_dislike_counts(self) -> None:
+        '''Test for counting likes and dislikes of a post'''
+        user_1 = create_user(username='user1')
+        user_2 = create_user(username='user2')
+        post = create_post()
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
+        Reaction.objects.react(post, user_2.profile, Reaction.LIKE)
+        Reaction.objects.react(post, user_1.profile, Reaction.LIKE)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 2)
+        self.assertEqual(post.dislike_count, 0)
+
+        Reaction.objects.react(post, user_1.profile, Reaction.DISLIKE)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(post.dislike_count, 1)
+
+        Reaction.objects.react(post, user_2.profile, Reaction.DISLIKE)
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 0)
+        self.assertEqual(post.dislike_count, 2)
+
+    def test_react_twice(self) -> None:
+        '''Test that reacting twice the same way changes nothing'''
+        user = create_user(username='user1')
+        post = create_post()
+        self.assertTrue(
+            Reaction.objects.react(post, user.profile, Reaction.LIKE))
+        self.assertFalse(
+            Reaction.objects.react(post, user.profile, Reaction.LIKE))
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+        self.assertEqual(Reaction.objects.filter(post=post).count(), 1)
+
+    @skipIf(connection.vendor == 'postgresql',
+            'PostgreSQL reacts with a single upsert')
+    def test_react_locks_profile(self) -> None:
+        '''
+        Test that reactions lock the profile, which concurrent first
+        reactions of the profile to a post wait on
+        '''
+        user = create_user(username='user1')
+        post = create_post()
+        with mock.patch.object(
+                Profile.objects, 'select_for_update',
+                wraps=Profile.objects.select_for_update) as lock:
+            Reaction.objects.react(post, user.profile, Reaction.LIKE)
+        lock.assert_called_once_with()
+        post.refresh_from_db()
+        self.assertEqual(post.like_count, 1)
+
+    @skipUnless(connection.vendor == 'postgresql',
+                'The single upsert is PostgreSQL only')
+    def test_react_in_one_statement(self) -> None:
+        '''Test that reactions are written and counted in one statement'''
+        user = create_user(username='user1')
+        posts = [create_post(user), create_post(user)]
+        Reaction.objects.react(posts[0], user.profile, Reaction.DISLIKE)
+        for kind, changed in ((Reaction.LIKE, {posts[0].pk, posts[1].pk}),
+                              (Reaction.LIKE, set())):
+            with CaptureQueriesContext(connection) as queries:
+                found, result = Reaction.objects.react_many(
+                    [post.pk for post in posts] + [0], user.profile, kind)
+            self.assertEqual(found, {post.pk for post in posts})
+            self.assertEqual(result, changed)
+            self.assertEqual(len([
+                query for query in queries.captured_queries
+                if 'SAVEPOINT' not in query['sql']]), 1)
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.like_count, 1)
+            self.assertEqual(post.dislike_count, 0)
+
+    def test_comment_count(self) -> None:
+        '''Test for counting comments of a post'''
+        user = create_user(username='user1')
+        post = create_post()
+        comment = Comment.objects.create(
+            profile=user.profile, post=post, comment='Test Comment')
+        Comment.objects.create(
+            profile=user.profile, post=post, comment='Test Comment')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 2)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+
+    def test_delete_commented_post(self) -> None:
+        '''Test that comments deleted with their post aren't uncounted'''
+        user = create_user(username='user1')
+        posts = [create_post(user), create_post(user)]
+        for post in posts:
+            for _ in range(3):
+                Comment.objects.create(
+                    profile=user.profile, post=post, comment='Test Comment')
+        for deletion in (posts[0].delete, Post.objects.all().delete):
+            with CaptureQueriesContext(connection) as queries:
+                deletion()
+            self.assertFalse([
+                query for query in queries.captured_queries
+                if query['sql'].startswith('UPDATE "core_post"')])
+        self.assertFalse(Comment.objects.exists())
+
+    def test_follow_counts(self) -> None:
+        '''Test for counting follows and followers of a profile'''
+        user_1 = create_user()
+        user_2 = create_user(username='test2')
+        user_3 = create_user(username='test3')
+        user_1.profile.follows.add(user_2.profile, user_3.profile)
+        user_3.profile.following.add(user_2.profile)
+        user_1.profile.refresh_from_db()
+        user_3.profile.refresh_from_db()
+        self.assertEqual(user_1.profile.follows_count, 2)
+        self.assertEqual(user_1.profile.following_count, 0)
+        self.assertEqual(user_3.profile.following_count, 2)
+
+        user_1.profile.follows.remove(user_3.profile)
+        user_1.profile.follows.remove(user_3.profile)
+        user_1.profile.refresh_from_db()
+        user_3.profile.refresh_from_db()
+        self.assertEqual(user_1.profile.follows_count, 1)
+        self.assertEqual(user_3.profile.following_count, 1)
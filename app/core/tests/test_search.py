@@ -0,0 +1,86 @@
+'''
+Tests for the full-text search of posts and comments
+'''
+from typing import Type
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AbstractBaseUser
+from core import search
+from core.models import Post, Comment
+
+
+def create_user(**kwargs) -> Type[AbstractBaseUser]:
+    '''Helper function for creating new user'''
+    user_details = {
+        'username': 'test',
+        'password': 'testpass123',
+        'first_name': 'John',
+        'last_name': 'Doe',
+        'email': 'test@example.com',
+        }
+    user_details.update(kwargs)
+    return get_user_model().objects.create(**user_details)
+
+
+class SearchTests(TestCase):
+    '''Tests for searching posts and comments'''
+    def setUp(self) -> None:
+        # The in-memory index outlives the rolled back rows of other tests
+        search.index.clear()
+        self.profile = create_user().profile
+        self.once = Post.objects.create(
+            profile=self.profile, post='Python and Django')
+        self.twice = Post.objects.create(
+            profile=self.profile, post='Python python python')
+        self.other = Post.objects.create(
+            profile=self.profile, post='Rust only')
+        self.comment = Comment.objects.create(
+            profile=self.profile, post=self.other,
+            comment='Django in production')
+
+    def assertHits(self, hits: list, expected: list) -> None:
+        '''Assert the kinds and ids of `hits` in order'''
+        self.assertEqual([(hit.kind, hit.id) for hit in hits], expected)
+
+    def test_search_ranked(self) -> None:
+        '''Test that documents repeating a term rank first'''
+        self.assertHits(search.search('python'), [
+            ('post', self.twice.id), ('post', self.once.id)])
+
+    def test_search_every_term(self) -> None:
+        '''Test that documents must contain every term'''
+        self.assertHits(
+            search.search('python django'), [('post', self.once.id)])
+        self.assertHits(search.search('python rust'), [])
+
+    def test_search_posts_and_comments(self) -> None:
+        '''Test searching posts and comments together and apart'''
+        hits = search.search('django')
+        self.assertCountEqual(
+            [(hit.kind, hit.id) for hit in hits],
+            [('post', self.once.id), ('comment', self.comment.id)])
+        self.assertHits(
+            search.search('django', ['comment']),
+            [('comment', self.comment.id)])
+
+    def test_search_case_insensitive(self) -> None:
+        '''Test that terms are matched whatever their case'''
+        self.assertHits(search.search('RUST'), [('post', self.other.id)])
+
+    def test_search_updated(self) -> None:
+        '''Test that created, edited and deleted documents are searched'''
+        self.assertHits(search.search('rust'), [('post', self.other.id)])
+        post = Post.objects.create(profile=self.profile, post='Rust again')
+        self.assertHits(search.search('rust'), [
+            ('post', post.id), ('post', self.other.id)])
+        post.post = 'Go'
+        post.save()
+        self.assertHits(search.search('rust'), [('post', self.other.id)])
+        self.other.delete()
+        self.assertHits(search.search('rust'), [])
+        self.assertHits(search.search('production'), [])
+
+    @override_settings(SEARCH_MAX_RESULTS=1)
+    def test_search_limit(self) -> None:
+        '''Test that the number of hits is capped'''
+        self.assertHits(search.search('python'), [('post', self.twice.id)])